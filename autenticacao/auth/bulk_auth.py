@@ -0,0 +1,122 @@
+"""
+Cadastro em lote de usuários (onboarding de clínicas).
+
+O corpo chega em JSON lines (`{"nome", "email", "senha"}` por linha) ou
+CSV com cabeçalho `nome,email,senha`. As linhas são processadas em lotes
+de `BULK_REGISTER_BATCH_SIZE`: validação, deduplicação (no próprio
+arquivo e contra o banco, numa única consulta IN), hashing em paralelo
+no executor de hashing e um INSERT multi-linha por lote. O resultado de
+cada linha é devolvido em NDJSON assim que o lote termina.
+"""
+import csv
+import json
+from collections.abc import AsyncIterator, Iterator
+
+from pydantic import ValidationError
+from sqlalchemy.orm import Session
+from starlette.concurrency import run_in_threadpool
+
+from auth.controller_auth import (
+    get_existing_emails, hash_password, insert_users_batch,
+)
+from auth.schemas_auth import UserCreate
+from config.hashing import HashingQueueFull, hashing_executor
+
+CSV_CONTENT_TYPES = ("text/csv", "application/csv")
+
+
+def parse_rows(body: bytes, content_type: str) -> Iterator[tuple[int, dict]]:
+    """Gera `(número da linha, campos)`; linhas ilegíveis geram `{}`."""
+    linhas = body.decode("utf-8-sig").splitlines()
+    if content_type.split(";")[0].strip() in CSV_CONTENT_TYPES:
+        leitor = csv.DictReader(linhas)
+        for registro in leitor:
+            yield leitor.line_num, {
+                chave.strip(): (valor or "").strip()
+                for chave, valor in registro.items() if chave
+            }
+        return
+    for numero, linha in enumerate(linhas, start=1):
+        if not linha.strip():
+            continue
+        try:
+            registro = json.loads(linha)
+        except json.JSONDecodeError:
+            registro = {}
+        yield numero, registro if isinstance(registro, dict) else {}
+
+
+def _erro_validacao(exc: ValidationError) -> str:
+    erro = exc.errors()[0]
+    campo = ".".join(str(parte) for parte in erro["loc"])
+    return f"{campo}: {erro['msg']}" if campo else erro["msg"]
+
+
+async def _process_batch(db: Session, lote: list[tuple[int, dict]],
+                         vistos: set[str]) -> list[dict]:
+    resultados: dict[int, dict] = {}
+    validos: list[tuple[int, UserCreate]] = []
+    for numero, campos in lote:
+        try:
+            user = UserCreate.model_validate(campos)
+        except ValidationError as exc:
+            resultados[numero] = {"linha": numero, "email": campos.get("email"),
+                                  "status": "invalido",
+                                  "erro": _erro_validacao(exc)}
+            continue
+        chave = user.email.lower()
+        if chave in vistos:
+            resultados[numero] = {"linha": numero, "email": user.email,
+                                  "status": "duplicado"}
+            continue
+        vistos.add(chave)
+        validos.append((numero, user))
+
+    existentes = await run_in_threadpool(
+        get_existing_emails, db, [user.email for _, user in validos])
+    novos = [(n, u) for n, u in validos if u.email.lower() not in existentes]
+    for numero, user in validos:
+        if user.email.lower() in existentes:
+            resultados[numero] = {"linha": numero, "email": user.email,
+                                  "status": "existente"}
+
+    try:
+        hashes = await hashing_executor.map(
+            hash_password, [user.senha for _, user in novos])
+    except HashingQueueFull:
+        for numero, user in novos:
+            resultados[numero] = {"linha": numero, "email": user.email,
+                                  "status": "erro",
+                                  "erro": "fila de hashing cheia"}
+        novos, hashes = [], []
+
+    ids = await run_in_threadpool(insert_users_batch, db, [
+        {"nome": user.nome, "email": user.email, "senha_hash": senha_hash}
+        for (_, user), senha_hash in zip(novos, hashes)
+    ])
+    ids = {email.lower(): id_ for email, id_ in ids.items()}
+    for numero, user in novos:
+        id_ = ids.get(user.email.lower())
+        resultados[numero] = (
+            {"linha": numero, "email": user.email, "status": "criado",
+             "id": id_}
+            if id_ is not None else
+            {"linha": numero, "email": user.email, "status": "existente"}
+        )
+    return [resultados[numero] for numero, _ in lote]
+
+
+async def bulk_register(db: Session, rows: Iterator[tuple[int, dict]],
+                        batch_size: int) -> AsyncIterator[str]:
+    """Processa as linhas em lotes e gera o resultado de cada uma (NDJSON)."""
+    vistos: set[str] = set()
+    lote: list[tuple[int, dict]] = []
+    for row in rows:
+        lote.append(row)
+        if len(lote) >= batch_size:
+            for resultado in await _process_batch(db, lote, vistos):
+                yield json.dumps(resultado, ensure_ascii=False) + "\n"
+            lote = []
+    if lote:
+        for resultado in await _process_batch(db, lote, vistos):
+            yield json.dumps(resultado, ensure_ascii=False) + "\n"
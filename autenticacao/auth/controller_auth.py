@@ -1,14 +1,18 @@
+import uuid
 from datetime import datetime, timedelta
 
+from sqlalchemy import insert, select, update
+from sqlalchemy.exc import IntegrityError
 from sqlalchemy.orm import Session
-from passlib.context import CryptContext
-from jose import jwt
+from jose import jwt, JWTError
+from starlette.concurrency import run_in_threadpool
 
 # imports absolutos (quando o pacote é carregado como top-level)
-from auth.model_auth import Usuario
+from auth.model_auth import Usuario, RefreshToken, TokenRevogado
+from config.hashing import LazyCryptContext, hashing_executor
 from config.settings import settings
 
-pwd_context = CryptContext(schemes=["argon2"], deprecated="auto")
+pwd_context = LazyCryptContext()
 MAX_PASSWORD_LENGTH = 72
 
 
@@ -24,12 +28,25 @@ def verify_password(senha: str, senha_hash: str) -> bool:
     return pwd_context.verify(senha_truncada, senha_hash)
 
 
+async def hash_password_async(senha: str) -> str:
+    """`hash_password` executado no executor de hashing."""
+    return await hashing_executor.run(hash_password, senha)
+
+
+async def verify_password_async(senha: str, senha_hash: str) -> bool:
+    """`verify_password` executado no executor de hashing."""
+    return await hashing_executor.run(verify_password, senha, senha_hash)
+
+
 def get_user_by_email(db: Session, email: str):
     return db.query(Usuario).filter(Usuario.email == email).first()
 
 
 def create_user(db: Session, nome: str, email: str, senha: str):
-    senha_hash = hash_password(senha)
+    return save_user(db, nome, email, hash_password(senha))
+
+
+def save_user(db: Session, nome: str, email: str, senha_hash: str):
     db_user = Usuario(nome=nome, email=email, senha_hash=senha_hash)
     db.add(db_user)
     db.commit()
@@ -37,13 +54,93 @@ def create_user(db: Session, nome: str, email: str, senha: str):
     return db_user
 
 
+def get_existing_emails(db: Session, emails: list[str]) -> set[str]:
+    """Emails (em minúsculas) já cadastrados, numa única consulta IN."""
+    if not emails:
+        return set()
+    return {
+        email.lower() for email in db.scalars(
+            select(Usuario.email).where(Usuario.email.in_(emails)))
+    }
+
+
+def insert_users_batch(db: Session, rows: list[dict]) -> dict[str, int]:
+    """
+    Insere um lote de usuários num único INSERT multi-linha.
+
+    `rows` traz `nome`, `email` e `senha_hash`. Devolve `email -> id` dos
+    usuários criados; se cadastros concorrentes ocuparem emails do lote,
+    ele é refeito sem esses emails (que ficam de fora do resultado) até o
+    INSERT passar.
+    """
+    while rows:
+        try:
+            db.execute(insert(Usuario.__table__).values(rows))
+            break
+        except IntegrityError:
+            db.rollback()
+            existentes = get_existing_emails(
+                db, [row["email"] for row in rows])
+            restantes = [row for row in rows
+                         if row["email"].lower() not in existentes]
+            if len(restantes) == len(rows):
+                raise  # a violação não é de email: repetir não resolve
+            rows = restantes
+    if not rows:
+        return {}
+    ids = dict(db.execute(
+        select(Usuario.email, Usuario.id)
+        .where(Usuario.email.in_([row["email"] for row in rows]))
+    ).all())
+    db.commit()
+    return ids
+
+
 def authenticate_user(db: Session, email: str, senha: str):
     user = get_user_by_email(db, email)
     if user and verify_password(senha, user.senha_hash):
+        if pwd_context.needs_update(user.senha_hash):
+            update_password_hash(db, user, hash_password(senha))
         return user
     return None
 
 
+def update_password_hash(db: Session, user: Usuario, senha_hash: str):
+    """Grava o hash refeito com os custos atuais do Argon2."""
+    user.senha_hash = senha_hash
+    db.commit()
+
+
+async def authenticate_user_async(db: Session, email: str, senha: str):
+    """Versão de `authenticate_user` que verifica a senha fora do handler."""
+    user = await run_in_threadpool(get_user_by_email, db, email)
+    if user and await verify_password_async(senha, user.senha_hash):
+        # Custos mudaram desde o cadastro: refaz o hash com a senha em mãos
+        if pwd_context.needs_update(user.senha_hash):
+            senha_hash = await hash_password_async(senha)
+            await run_in_threadpool(update_password_hash, db, user, senha_hash)
+        return user
+    return None
+
+
+def build_token_claims(user: Usuario) -> dict:
+    """
+    Claims do access token: `jti`, `uid` e `gen` permitem ao backend
+    checar revogações em memória. Com `STATELESS_TOKENS` o token também
+    carrega o nome, para que o backend monte o usuário sem consultar a
+    tabela `usuarios`.
+    """
+    claims = {
+        "sub": user.email,
+        "uid": user.id,
+        "gen": user.token_geracao or 0,
+        "jti": uuid.uuid4().hex,
+    }
+    if settings.STATELESS_TOKENS:
+        claims["nome"] = user.nome
+    return claims
+
+
 def create_access_token(data: dict, expires_delta: timedelta = None):
     to_encode = data.copy()
     expire = datetime.utcnow() + (expires_delta or timedelta(
@@ -54,3 +151,125 @@ def create_access_token(data: dict, expires_delta: timedelta = None):
         settings.SECRET_KEY,
         algorithm=settings.ALGORITHM,
     )
+
+
+def create_refresh_token(db: Session, user: Usuario) -> str:
+    """Emite um refresh token e registra seu `jti` para rotação."""
+    jti = uuid.uuid4().hex
+    expira_em = datetime.utcnow() + timedelta(
+        days=settings.REFRESH_TOKEN_EXPIRE_DAYS)
+    db.add(RefreshToken(jti=jti, usuario_id=user.id, expira_em=expira_em))
+    db.commit()
+    return jwt.encode(
+        {"sub": user.email, "uid": user.id, "jti": jti, "type": "refresh",
+         "exp": expira_em},
+        settings.SECRET_KEY,
+        algorithm=settings.ALGORITHM,
+    )
+
+
+def rotate_refresh_token(db: Session, token: str):
+    """
+    Troca um refresh token válido por um novo (o antigo é revogado).
+
+    Devolve `(usuario, novo_refresh_token)` ou None. O token é consumido
+    por um UPDATE condicional (`revogado = 0` no WHERE): de dois `/refresh`
+    simultâneos com o mesmo token só um altera a linha. Reapresentar um
+    token já usado (rowcount 0 num token ainda dentro da validade) indica
+    vazamento: todos os refresh tokens do usuário caem.
+    """
+    payload = _refresh_payload(token)
+    if payload is None:
+        return None
+    agora = datetime.utcnow()
+    consumido = db.execute(
+        update(RefreshToken)
+        .where(RefreshToken.jti == payload.get("jti"),
+               RefreshToken.revogado.is_(False),
+               RefreshToken.expira_em >= agora)
+        .values(revogado=True)
+        .execution_options(synchronize_session=False)
+    ).rowcount
+    if not consumido:
+        registro = db.get(RefreshToken, payload.get("jti"))
+        if registro is not None and registro.expira_em >= agora:
+            db.query(RefreshToken).filter(
+                RefreshToken.usuario_id == registro.usuario_id
+            ).update({"revogado": True}, synchronize_session=False)
+            db.commit()
+        else:
+            db.rollback()
+        return None
+
+    user = db.get(Usuario, payload.get("uid"))
+    if user is None:
+        db.rollback()
+        return None
+    # O commit do novo token grava também a revogação do antigo
+    return user, create_refresh_token(db, user)
+
+
+def _refresh_payload(token: str) -> dict | None:
+    """Claims de um refresh token com assinatura e tipo verificados."""
+    try:
+        payload = jwt.decode(token, settings.SECRET_KEY,
+                             algorithms=[settings.ALGORITHM])
+    except JWTError:
+        return None
+    if payload.get("type") != "refresh":
+        return None
+    return payload
+
+
+def get_refresh_record(db: Session, token: str):
+    """Registro do refresh token (assinatura e tipo verificados) ou None."""
+    payload = _refresh_payload(token)
+    if payload is None:
+        return None
+    return db.get(RefreshToken, payload.get("jti"))
+
+
+def revoke_refresh_token(db: Session, token: str) -> None:
+    registro = get_refresh_record(db, token)
+    if registro is not None:
+        registro.revogado = True
+        db.commit()
+
+
+def revoke_access_token(db: Session, payload: dict) -> None:
+    """Registra o `jti` de um access token como revogado (logout)."""
+    if not payload.get("jti") or not payload.get("uid"):
+        return
+    db.add(TokenRevogado(
+        usuario_id=payload["uid"],
+        jti=payload["jti"],
+        expira_em=datetime.utcfromtimestamp(payload["exp"]),
+    ))
+    db.commit()
+
+
+def revoke_user_tokens(db: Session, user: Usuario) -> None:
+    """
+    Invalida todos os tokens do usuário: nova geração de access tokens
+    (publicada em `tokens_revogados` para o backend) e refresh tokens
+    revogados. A sessão é commitada pelo chamador.
+    """
+    user.token_geracao = (user.token_geracao or 0) + 1
+    db.add(TokenRevogado(
+        usuario_id=user.id,
+        token_geracao=user.token_geracao,
+        expira_em=datetime.utcnow() + timedelta(
+            minutes=settings.ACCESS_TOKEN_EXPIRE_MINUTES),
+    ))
+    db.query(RefreshToken).filter(
+        RefreshToken.usuario_id == user.id
+    ).update({"revogado": True}, synchronize_session=False)
+
+
+def is_access_token_revoked(db: Session, user: Usuario, payload: dict):
+    """Checagem exata (com banco) usada pelo próprio serviço de auth."""
+    if payload.get("gen", 0) < (user.token_geracao or 0):
+        return True
+    jti = payload.get("jti")
+    return bool(jti) and db.query(TokenRevogado.id).filter(
+        TokenRevogado.jti == jti).first() is not None
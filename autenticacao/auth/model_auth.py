@@ -1,4 +1,5 @@
-from sqlalchemy import Column, Integer, String, DateTime, text
+from sqlalchemy import (Column, Integer, String, DateTime, Boolean,
+                        ForeignKey, text)
 from config.database import Base
 
 # pylint: disable=too-few-public-methods
@@ -15,3 +16,43 @@ class Usuario(Base):
     # Use server_default with SQL CURRENT_TIMESTAMP to avoid calling SQLAlchemy
     # function objects in Python (fixes lint E1102).
     data_cadastro = Column(DateTime, server_default=text("CURRENT_TIMESTAMP"))
+    # Incrementado a cada troca de senha; vai no token como claim `gen`
+    token_geracao = Column(Integer, nullable=False, default=0,
+                           server_default=text("0"))
+
+
+class RefreshToken(Base):
+    """Refresh token emitido; cada uso o revoga e emite um substituto."""
+    __tablename__ = "refresh_tokens"
+
+    jti = Column(String(32), primary_key=True)
+    usuario_id = Column(
+        Integer,
+        ForeignKey("usuarios.id", ondelete="CASCADE"),
+        nullable=False,
+        index=True,
+    )
+    expira_em = Column(DateTime, nullable=False)
+    revogado = Column(Boolean, nullable=False, default=False,
+                      server_default=text("0"))
+    data_criacao = Column(DateTime, server_default=text("CURRENT_TIMESTAMP"))
+
+
+class TokenRevogado(Base):
+    """
+    Log de revogações lido pelo backend: um access token específico
+    (`jti`) ou todos os tokens abaixo de uma geração (`token_geracao`).
+    """
+    __tablename__ = "tokens_revogados"
+
+    id = Column(Integer, primary_key=True, autoincrement=True)
+    usuario_id = Column(
+        Integer,
+        ForeignKey("usuarios.id", ondelete="CASCADE"),
+        nullable=False,
+        index=True,
+    )
+    jti = Column(String(32), nullable=True, unique=True)
+    token_geracao = Column(Integer, nullable=True)
+    expira_em = Column(DateTime, nullable=False)
+    data_criacao = Column(DateTime, server_default=text("CURRENT_TIMESTAMP"))
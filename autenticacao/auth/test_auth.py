@@ -22,6 +22,7 @@ from auth.controller_auth import (
     create_user,
     authenticate_user,
     get_user_by_email,
+    build_token_claims,
 )
 
 
@@ -110,3 +111,136 @@ def test_duplicate_user_raises_integrity_error(db):
     assert user1 is not None
     with pytest.raises(IntegrityError):
         create_user(db, "Dup", "dup@test.local", "Senha1")
+
+
+def test_build_token_claims_stateless(db, monkeypatch):
+    from config.settings import settings
+
+    user = create_user(db, "Claims User", "claims@test.local", "SenhaSegura1")
+    claims = build_token_claims(user)
+    assert len(claims.pop("jti")) == 32
+    assert claims == {"sub": "claims@test.local", "uid": user.id, "gen": 0}
+
+    monkeypatch.setattr(settings, "STATELESS_TOKENS", True)
+    claims = build_token_claims(user)
+    claims.pop("jti")
+    assert claims == {
+        "sub": "claims@test.local",
+        "uid": user.id,
+        "gen": 0,
+        "nome": "Claims User",
+    }
+
+
+def test_authenticate_user_refaz_hash_com_novos_custos(db, monkeypatch):
+    from passlib.context import CryptContext
+    import auth.controller_auth as controller
+
+    user = create_user(db, "Rehash", "rehash@test.local", "SenhaSegura1")
+    hash_antigo = user.senha_hash
+
+    novos_custos = CryptContext(schemes=["argon2"], deprecated="auto",
+                                argon2__rounds=1, argon2__memory_cost=1024)
+    monkeypatch.setattr(controller, "pwd_context", novos_custos)
+    assert authenticate_user(db, "rehash@test.local", "SenhaSegura1")
+
+    db.refresh(user)
+    assert user.senha_hash != hash_antigo
+    assert "m=1024,t=1" in user.senha_hash
+    assert not novos_custos.needs_update(user.senha_hash)
+
+
+def test_parse_rows_csv_e_json_lines():
+    from auth.bulk_auth import parse_rows
+
+    csv_body = b"nome,email,senha\nAna Lima,ana@x.com,senha12345\n"
+    assert list(parse_rows(csv_body, "text/csv; charset=utf-8")) == [
+        (2, {"nome": "Ana Lima", "email": "ana@x.com", "senha": "senha12345"}),
+    ]
+
+    ndjson = b'{"nome": "Bia", "email": "bia@x.com"}\n\nnao-e-json\n'
+    assert list(parse_rows(ndjson, "application/x-ndjson")) == [
+        (1, {"nome": "Bia", "email": "bia@x.com"}),
+        (3, {}),
+    ]
+
+
+def test_insert_users_batch_devolve_ids(db):
+    from auth.controller_auth import get_existing_emails, insert_users_batch
+
+    create_user(db, "Existente", "existe@x.com", "senha12345")
+    ids = insert_users_batch(db, [
+        {"nome": "Novo Um", "email": "um@x.com", "senha_hash": "h1"},
+        {"nome": "Novo Dois", "email": "dois@x.com", "senha_hash": "h2"},
+    ])
+    assert set(ids) == {"um@x.com", "dois@x.com"}
+    assert get_existing_emails(db, ["um@x.com", "existe@x.com", "nao@x.com"]) \
+        == {"um@x.com", "existe@x.com"}
+
+
+def test_insert_users_batch_refaz_ate_passar(tmp_path, monkeypatch):
+    from sqlalchemy import create_engine as criar_engine
+    from sqlalchemy.sql import Insert
+    from config.database import Base
+    from auth.controller_auth import insert_users_batch
+
+    arquivo = criar_engine(f"sqlite:///{tmp_path}/bulk.db")
+    Base.metadata.create_all(bind=arquivo)
+    lote_db, outro_db = (sessionmaker(bind=arquivo)() for _ in range(2))
+    concorrentes = ["b@x.com", "c@x.com"]
+    executar = lote_db.execute
+
+    def execute(statement, *args, **kwargs):
+        # Um cadastro concorrente ocupa um email antes de cada tentativa
+        if isinstance(statement, Insert) and concorrentes:
+            create_user(outro_db, "Concorrente", concorrentes.pop(0),
+                        "senha12345")
+        return executar(statement, *args, **kwargs)
+
+    monkeypatch.setattr(lote_db, "execute", execute)
+    ids = insert_users_batch(lote_db, [
+        {"nome": "Lote", "email": f"{letra}@x.com", "senha_hash": "h"}
+        for letra in "abcd"
+    ])
+    assert set(ids) == {"a@x.com", "d@x.com"}
+    lote_db.close()
+    outro_db.close()
+
+
+def test_main_importa_dependencias_sob_demanda():
+    import subprocess
+    import sys
+
+    # Importar a aplicação não carrega passlib, aiosmtplib nem o pool
+    resultado = subprocess.run(
+        [sys.executable, "-c",
+         "import sys, main; print(sorted({'passlib', 'aiosmtplib', "
+         "'concurrent.futures.process'} & set(sys.modules)))"],
+        capture_output=True, text=True, check=True,
+    )
+    assert resultado.stdout.strip() == "[]"
+
+
+def test_refresh_concorrente_so_um_rotaciona(db):
+    from auth.controller_auth import (
+        create_refresh_token, get_refresh_record, rotate_refresh_token,
+        save_user,
+    )
+    from auth.model_auth import RefreshToken
+
+    user = save_user(db, "Refresh", "refresh@test.local", "hash")
+    token = create_refresh_token(db, user)
+    # A segunda requisição já leu o registro antes de a primeira gravar
+    outra = TestingSessionLocal()
+    try:
+        lido = get_refresh_record(outra, token)
+        assert lido.revogado is False
+        assert rotate_refresh_token(db, token) is not None
+        assert rotate_refresh_token(outra, token) is None
+    finally:
+        outra.close()
+
+    # Tratada como reuso: a família inteira, inclusive o novo, cai
+    db.expire_all()
+    assert all(r.revogado for r in db.query(RefreshToken).all())
+
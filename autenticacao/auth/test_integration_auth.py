@@ -165,3 +165,146 @@ def test_forgot_password_nonexistent_user(client):
     assert resp.status_code == 200
     # Mesmo para usuário inexistente, retorna mensagem genérica
     assert "instruções foram enviadas" in resp.json()["message"].lower()
+
+
+@pytest.mark.integration
+def test_hashing_metrics_after_login(client, admin_header):
+    """Registro e login passam pelo executor de hashing."""
+    client.post("/api/auth/register", json={
+        "nome": "Hash Metrics",
+        "email": "hashmetrics@example.com",
+        "senha": "senhaValida123",
+    })
+    resp = client.post("/api/auth/login", json={
+        "email": "hashmetrics@example.com",
+        "senha": "senhaValida123",
+    })
+    assert resp.status_code == 200
+
+    assert client.get("/metrics/hashing").status_code == 403
+    stats = client.get("/metrics/hashing", headers=admin_header).json()
+    assert stats["completed"] >= 2
+    assert stats["pending"] == 0
+
+
+@pytest.mark.integration
+def test_login_rate_limited_por_email(client, monkeypatch):
+    """Excedido o limite por email, responde 429 sem calcular hash."""
+    from config.hashing import hashing_executor
+    from config.rate_limit import email_limiter
+
+    monkeypatch.setattr(email_limiter, "per_minute", 2)
+    payload = {"email": "alvo@example.com", "senha": "senhaErrada1"}
+    for _ in range(2):
+        assert client.post("/api/auth/login", json=payload).status_code == 401
+
+    hashes_antes = hashing_executor.stats()["completed"]
+    resp = client.post("/api/auth/login", json=payload)
+    assert resp.status_code == 429
+    assert int(resp.headers["Retry-After"]) >= 1
+    assert hashing_executor.stats()["completed"] == hashes_antes
+
+
+def _login(client, email, senha):
+    resp = client.post("/api/auth/login", json={"email": email, "senha": senha})
+    assert resp.status_code == 200
+    return resp.json()
+
+
+@pytest.mark.integration
+def test_refresh_rotaciona_e_detecta_reuso(client):
+    client.post("/api/auth/register", json={
+        "nome": "Refresh User",
+        "email": "refresh@example.com",
+        "senha": "senhaValida123",
+    })
+    tokens = _login(client, "refresh@example.com", "senhaValida123")
+    assert tokens["refresh_token"]
+
+    resp = client.post("/api/auth/refresh",
+                       json={"refresh_token": tokens["refresh_token"]})
+    assert resp.status_code == 200
+    novos = resp.json()
+    assert novos["refresh_token"] != tokens["refresh_token"]
+    headers = {"Authorization": f"Bearer {novos['access_token']}"}
+    assert client.get("/api/auth/me", headers=headers).status_code == 200
+
+    # Refresh token não serve como access token
+    headers_refresh = {"Authorization": f"Bearer {novos['refresh_token']}"}
+    assert client.get("/api/auth/me", headers=headers_refresh).status_code == 401
+
+    # Reuso do token antigo revoga toda a família
+    resp = client.post("/api/auth/refresh",
+                       json={"refresh_token": tokens["refresh_token"]})
+    assert resp.status_code == 401
+    resp = client.post("/api/auth/refresh",
+                       json={"refresh_token": novos["refresh_token"]})
+    assert resp.status_code == 401
+
+
+@pytest.mark.integration
+def test_logout_e_troca_de_senha_revogam_tokens(client):
+    client.post("/api/auth/register", json={
+        "nome": "Revoke User",
+        "email": "revoke@example.com",
+        "senha": "senhaValida123",
+    })
+    tokens = _login(client, "revoke@example.com", "senhaValida123")
+    headers = {"Authorization": f"Bearer {tokens['access_token']}"}
+    resp = client.post("/api/auth/logout", headers=headers,
+                       json={"refresh_token": tokens["refresh_token"]})
+    assert resp.status_code == 204
+    assert client.get("/api/auth/me", headers=headers).status_code == 401
+    resp = client.post("/api/auth/refresh",
+                       json={"refresh_token": tokens["refresh_token"]})
+    assert resp.status_code == 401
+
+    tokens = _login(client, "revoke@example.com", "senhaValida123")
+    headers = {"Authorization": f"Bearer {tokens['access_token']}"}
+    resp = client.post("/api/auth/change-password", headers=headers, json={
+        "current_password": "senhaValida123",
+        "new_password": "senhaNova4567",
+    })
+    assert resp.status_code == 200
+    # Token emitido antes da troca pertence a uma geração antiga
+    assert client.get("/api/auth/me", headers=headers).status_code == 401
+
+
+@pytest.mark.integration
+def test_register_bulk_csv_e_json_lines(client, monkeypatch):
+    """Cadastro em lote informa o resultado de cada linha."""
+    import json
+    from config.settings import settings
+
+    corpo = "nome,email,senha\nAna Lima,ana@x.com,senha12345\n"
+    assert client.post("/api/auth/admin/register-bulk", content=corpo,
+                       headers={"Content-Type": "text/csv"}).status_code == 403
+
+    monkeypatch.setattr(settings, "ADMIN_API_KEY", "chave-admin")
+    monkeypatch.setattr(settings, "BULK_REGISTER_BATCH_SIZE", 2)
+    admin = {"X-Admin-Key": "chave-admin"}
+    resp = client.post("/api/auth/admin/register-bulk", content=corpo,
+                       headers={**admin, "Content-Type": "text/csv"})
+    assert resp.status_code == 200
+    assert [json.loads(l)["status"] for l in resp.text.splitlines()] == ["criado"]
+
+    linhas = [
+        {"nome": "Bruno Dias", "email": "bruno@x.com", "senha": "senha12345"},
+        {"nome": "Ana Lima", "email": "ana@x.com", "senha": "senha12345"},
+        {"nome": "Caio Reis", "email": "caio@x.com", "senha": "curta"},
+        {"nome": "Bruno Dias", "email": "Bruno@x.com", "senha": "senha12345"},
+        {"nome": "Dora Melo", "email": "dora@x.com", "senha": "senha12345"},
+    ]
+    resp = client.post(
+        "/api/auth/admin/register-bulk",
+        content="\n".join(json.dumps(linha) for linha in linhas),
+        headers={**admin, "Content-Type": "application/x-ndjson"},
+    )
+    resultados = [json.loads(l) for l in resp.text.splitlines()]
+    assert [r["status"] for r in resultados] == [
+        "criado", "existente", "invalido", "duplicado", "criado"]
+    assert resultados[2]["erro"].startswith("senha")
+
+    resp = client.post("/api/auth/login", json={
+        "email": "dora@x.com", "senha": "senha12345"})
+    assert resp.status_code == 200
@@ -1,114 +1,222 @@
 from datetime import datetime, timedelta
 
 # third-party
-from fastapi import APIRouter, Depends, HTTPException, status, BackgroundTasks
+import math
+
+from fastapi import APIRouter, Depends, HTTPException, status, Request
+from fastapi.responses import StreamingResponse
 from fastapi.security import OAuth2PasswordBearer
-from fastapi_mail import FastMail, MessageSchema, ConnectionConfig
 from jose import JWTError, jwt
 from pydantic import BaseModel, EmailStr
 from sqlalchemy.orm import Session
+from starlette.concurrency import run_in_threadpool
 
 # imports absolutos (quando a app é carregada como top-level)
-from config.database import get_db
+from config.admin import require_admin
+from config.database import get_db, get_session_factory
+from config.deadline import bind_deadline
+from config.mail import build_message, mail_dispatcher
+from config.rate_limit import ip_limiter, email_limiter
 from config.settings import settings
+from auth.bulk_auth import bulk_register, parse_rows
 from auth.controller_auth import (
-    get_user_by_email, create_user, authenticate_user,
-    verify_password, hash_password, create_access_token,
+    get_user_by_email, save_user, authenticate_user_async,
+    verify_password_async, hash_password_async, create_access_token,
+    build_token_claims, create_refresh_token, rotate_refresh_token,
+    revoke_access_token, revoke_refresh_token, revoke_user_tokens,
+    is_access_token_revoked,
 )
 from auth.schemas_auth import (
     UserCreate, UserLogin, UserOut, Token, ChangePasswordRequest,
+    RefreshRequest,
 )
 
 router = APIRouter()
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="/api/auth/login")
 
-# Configuração do FastMail para envio de email
-conf = ConnectionConfig(
-    MAIL_USERNAME=settings.MAIL_USERNAME,  # ex: "seu_email@exemplo.com"
-    MAIL_PASSWORD=settings.MAIL_PASSWORD,  # ex: "sua_senha_de_app"
-    MAIL_FROM=settings.MAIL_FROM,          # ex: "seu_email@exemplo.com"
-    MAIL_PORT=settings.MAIL_PORT,          # ex: 587
-    MAIL_SERVER=settings.MAIL_SERVER,      # ex: "smtp.gmail.com"
-    MAIL_STARTTLS=settings.MAIL_STARTTLS,
-    MAIL_SSL_TLS=settings.MAIL_SSL_TLS,
-    USE_CREDENTIALS=True,
-    VALIDATE_CERTS=True,
-    TIMEOUT=120,  # Timeout de 120 segundos para ambientes cloud
+
+CREDENTIALS_EXCEPTION = HTTPException(
+    status_code=status.HTTP_401_UNAUTHORIZED,
+    detail="Credenciais inválidas ou token expirado",
+    headers={"WWW-Authenticate": "Bearer"},
 )
 
 
+def client_ip(request: Request) -> str:
+    """IP de origem; o X-Forwarded-For só é usado atrás de proxy confiável."""
+    if settings.RATE_LIMIT_TRUST_PROXY:
+        forwarded = request.headers.get("x-forwarded-for")
+        if forwarded:
+            return forwarded.split(",")[0].strip()
+    return request.client.host if request.client else "desconhecido"
+
+
+async def enforce_rate_limit(request: Request, email: str | None = None):
+    """
+    Aplica os limites por IP e por email antes de qualquer hash.
+
+    O store pode bloquear (lock, arquivo SQLite), então roda no
+    threadpool. Responde 429 com Retry-After quando um dos baldes está
+    vazio.
+    """
+    retry_after = await run_in_threadpool(
+        ip_limiter.hit, f"ip:{client_ip(request)}")
+    if not retry_after and email:
+        retry_after = await run_in_threadpool(
+            email_limiter.hit, f"email:{email.lower()}")
+    if retry_after:
+        raise HTTPException(
+            status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+            detail="Muitas tentativas, aguarde e tente novamente",
+            headers={"Retry-After": str(math.ceil(retry_after))},
+        )
+
+
 def get_current_user(db: Session = Depends(get_db),
                      token: str = Depends(oauth2_scheme)):
     """
     Dependency para obter usuário autenticado a partir do token JWT.
     """
-    credentials_exception = HTTPException(
-        status_code=status.HTTP_401_UNAUTHORIZED,
-        detail="Credenciais inválidas ou token expirado",
-        headers={"WWW-Authenticate": "Bearer"},
-    )
+    payload = get_token_payload(token)
+    user = get_user_by_email(db, payload["sub"])
+    if user is None or is_access_token_revoked(db, user, payload):
+        raise CREDENTIALS_EXCEPTION
+    return user
+
 
+def get_token_payload(token: str = Depends(oauth2_scheme)) -> dict:
+    """Decodifica e valida um access token (refresh/reset são recusados)."""
     try:
         payload = jwt.decode(
             token,
             settings.SECRET_KEY,
             algorithms=[settings.ALGORITHM],
         )
-        email: str = payload.get("sub")
-        if email is None:
-            raise credentials_exception
     except JWTError as exc:
-        raise credentials_exception from exc
-
-    user = get_user_by_email(db, email)
-    if user is None:
-        raise credentials_exception
-    return user
+        raise CREDENTIALS_EXCEPTION from exc
+    if payload.get("sub") is None or payload.get("type") is not None:
+        raise CREDENTIALS_EXCEPTION
+    return payload
 
 
 @router.post("/register", response_model=UserOut,
              status_code=status.HTTP_201_CREATED, tags=["auth"])
-def register(user: UserCreate, db: Session = Depends(get_db)):
-    if get_user_by_email(db, user.email):
+async def register(user: UserCreate, request: Request,
+                   db: Session = Depends(get_db)):
+    await enforce_rate_limit(request, user.email)
+    # Handlers async: consultas ao banco vão para o threadpool e o Argon2
+    # para o executor de hashing, sem ocupar uma thread durante o hash.
+    if await run_in_threadpool(get_user_by_email, db, user.email):
         raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST,
                             detail="E-mail já cadastrado")
-    return create_user(db, user.nome, user.email, user.senha)
+    senha_hash = await hash_password_async(user.senha)
+    return await run_in_threadpool(
+        save_user, db, user.nome, user.email, senha_hash)
+
+
+@router.post("/admin/register-bulk", tags=["admin"],
+             dependencies=[Depends(require_admin)])
+async def register_bulk(request: Request,
+                        session_factory=Depends(get_session_factory)):
+    """
+    Cadastra usuários em lote a partir de JSON lines ou CSV
+    (`Content-Type: text/csv`, cabeçalho `nome,email,senha`).
+
+    A resposta é NDJSON, uma linha por registro de entrada com `status`
+    `criado`, `existente`, `duplicado`, `invalido` ou `erro`, emitida à
+    medida que cada lote é gravado.
+    """
+    # O corpo é lido antes do streaming: durante a resposta o Starlette
+    # passa a consumir o canal de recebimento para detectar desconexão.
+    body = await request.body()
+    rows = parse_rows(body, request.headers.get("content-type", ""))
+
+    async def resultados():
+        # Sessão do próprio gerador: a de get_db já teria sido fechada
+        # quando o corpo começa a ser enviado
+        db = session_factory()
+        try:
+            bind_deadline(db)
+            async for linha in bulk_register(
+                    db, rows, settings.BULK_REGISTER_BATCH_SIZE):
+                yield linha
+        finally:
+            await run_in_threadpool(db.close)
+
+    return StreamingResponse(resultados(),
+                             media_type="application/x-ndjson")
 
 
 @router.post("/login", response_model=Token, tags=["auth"])
-def login(form_data: UserLogin, db: Session = Depends(get_db)):
-    user = authenticate_user(db, form_data.email, form_data.senha)
+async def login(form_data: UserLogin, request: Request,
+                db: Session = Depends(get_db)):
+    await enforce_rate_limit(request, form_data.email)
+    user = await authenticate_user_async(db, form_data.email, form_data.senha)
     if user is None:
         raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED,
                             detail="E-mail ou senha incorretos")
     access_token_expires = timedelta(
         minutes=settings.ACCESS_TOKEN_EXPIRE_MINUTES)
-    token = create_access_token(data={"sub": user.email},
+    token = create_access_token(data=build_token_claims(user),
                                 expires_delta=access_token_expires)
-    return {"access_token": token, "token_type": "bearer"}
+    refresh_token = await run_in_threadpool(create_refresh_token, db, user)
+    return {"access_token": token, "token_type": "bearer",
+            "refresh_token": refresh_token}
+
+
+@router.post("/refresh", response_model=Token, tags=["auth"])
+def refresh(payload: RefreshRequest, db: Session = Depends(get_db)):
+    """
+    Troca um refresh token por um novo par access/refresh.
+
+    Cada refresh token vale uma única vez (rotação); reutilizá-lo revoga
+    todos os refresh tokens do usuário.
+    """
+    rotacao = rotate_refresh_token(db, payload.refresh_token)
+    if rotacao is None:
+        raise CREDENTIALS_EXCEPTION
+    user, refresh_token = rotacao
+    token = create_access_token(data=build_token_claims(user))
+    return {"access_token": token, "token_type": "bearer",
+            "refresh_token": refresh_token}
+
+
+@router.post("/logout", status_code=status.HTTP_204_NO_CONTENT,
+             tags=["auth"])
+def logout(body: RefreshRequest | None = None,
+           token_payload: dict = Depends(get_token_payload),
+           db: Session = Depends(get_db)):
+    """Revoga o access token atual e, se enviado, o refresh token."""
+    revoke_access_token(db, token_payload)
+    if body is not None:
+        revoke_refresh_token(db, body.refresh_token)
 
 
 @router.post("/change-password", status_code=status.HTTP_200_OK,
              tags=["auth"])
-def change_password(
+async def change_password(
     payload: ChangePasswordRequest,
+    request: Request,
     current_user=Depends(get_current_user),
     db: Session = Depends(get_db)
 ):
+    await enforce_rate_limit(request, current_user.email)
     # Verifica se a senha atual está correta
-    if not verify_password(payload.current_password, current_user.senha_hash):
+    if not await verify_password_async(payload.current_password,
+                                       current_user.senha_hash):
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
             detail="Senha atual incorreta"
         )
 
     # Atualiza a senha com hash
-    new_hashed_password = hash_password(payload.new_password)
+    new_hashed_password = await hash_password_async(payload.new_password)
     current_user.senha_hash = new_hashed_password
+    # Nova geração: tokens emitidos antes da troca deixam de valer
+    await run_in_threadpool(revoke_user_tokens, db, current_user)
 
     db.add(current_user)
-    db.commit()
-    db.refresh(current_user)
+    await run_in_threadpool(db.commit)
 
     return {"message": "Senha alterada com sucesso"}
 
@@ -132,7 +240,7 @@ def create_reset_token(email: str):
     expire = datetime.utcnow() + timedelta(
         minutes=RESET_PASSWORD_EXPIRE_MINUTES,
     )
-    to_encode = {"sub": email, "exp": expire}
+    to_encode = {"sub": email, "exp": expire, "type": "reset"}
     return jwt.encode(
         to_encode,
         settings.SECRET_KEY,
@@ -141,37 +249,33 @@ def create_reset_token(email: str):
 
 
 async def send_reset_email(email_to: EmailStr, token: str):
-    """Envia email de recuperação de senha com tratamento de erro robusto."""
-    try:
-        reset_url = f"{settings.FRONTEND_URL}/reset-password?token={token}"
-        message = MessageSchema(
-            subject="Recuperação de senha - Diário de Enxaqueca",
-            recipients=[email_to],
-            body="Olá,\n\nPara redefinir sua senha, clique no link abaixo:\n"
-                 + f"{reset_url}\n\n"
-                 + "Este link expira em 30 minutos.\n\n"
-                 + "Se você não solicitou essa alteração, ignore este email.",
-            subtype="plain"
-        )
-        fm = FastMail(conf)
-        await fm.send_message(message)
-    except Exception as e:
-        # Log do erro mas não falha a requisição (email em background)
-        print(f"[ERRO] Falha ao enviar email para {email_to}: {str(e)}")
-        # Em produção, use logging adequado ou serviço de monitoramento
-        raise  # Re-raise para que o erro seja visível nos logs do container
+    """
+    Agenda o email de recuperação de senha no despachante de emails.
+
+    O envio (com retry e dead-letter) acontece na tarefa do despachante,
+    sobre a conexão SMTP já aberta; a requisição não espera o SMTP.
+    """
+    reset_url = f"{settings.FRONTEND_URL}/reset-password?token={token}"
+    message = build_message(
+        to=email_to,
+        subject="Recuperação de senha - Diário de Enxaqueca",
+        body="Olá,\n\nPara redefinir sua senha, clique no link abaixo:\n"
+             + f"{reset_url}\n\n"
+             + "Este link expira em 30 minutos.\n\n"
+             + "Se você não solicitou essa alteração, ignore este email.",
+    )
+    mail_dispatcher.enqueue(message)
 
 
 @router.post("/forgot-password", status_code=status.HTTP_200_OK,
              tags=["auth"])
 async def forgot_password(request: ForgotPasswordRequest,
-                          background_tasks: BackgroundTasks,
                           db: Session = Depends(get_db)):
-    user = get_user_by_email(db, request.email)
+    user = await run_in_threadpool(get_user_by_email, db, request.email)
     if not user:
         return {"message": "Se o email existir, instruções foram enviadas."}
 
     token = create_reset_token(user.email)
-    background_tasks.add_task(send_reset_email, user.email, token)
+    await send_reset_email(user.email, token)
 
     return {"message": "Se o email existir, instruções foram enviadas."}
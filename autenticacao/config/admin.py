@@ -0,0 +1,30 @@
+"""
+Acesso administrativo por `ADMIN_API_KEY` (cadastro em lote e métricas).
+
+A chave vai no cabeçalho `X-Admin-Key` ou como `Authorization: Bearer`,
+que é o que o Prometheus envia com `authorization` no scrape. Sem
+`ADMIN_API_KEY` configurada, tudo o que depende dela responde 403.
+"""
+import secrets
+
+from fastapi import Header, HTTPException, status
+
+from config.settings import settings
+
+
+def _chave_enviada(x_admin_key: str | None,
+                   authorization: str | None) -> str | None:
+    if x_admin_key:
+        return x_admin_key
+    esquema, _, credencial = (authorization or "").partition(" ")
+    return credencial.strip() if esquema.lower() == "bearer" else None
+
+
+def require_admin(x_admin_key: str | None = Header(default=None),
+                  authorization: str | None = Header(default=None)):
+    """Exige `X-Admin-Key` (ou Bearer) igual a `ADMIN_API_KEY`."""
+    chave = _chave_enviada(x_admin_key, authorization)
+    if not settings.ADMIN_API_KEY or not chave or \
+            not secrets.compare_digest(chave, settings.ADMIN_API_KEY):
+        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN,
+                            detail="Acesso administrativo negado")
@@ -0,0 +1,160 @@
+"""
+Calibra os custos do Argon2 para a CPU do host atual.
+
+Mede o tempo de hash no próprio container e escolhe `memory_cost` e
+`time_cost` que fiquem o mais perto possível (sem passar) da latência
+alvo. Sem `--parallelism`, também escolhe o `parallelism`: mede 1, 2, 4...
+até os núcleos que sobram para cada hash quando todos os processos de
+hashing do host trabalham juntos (núcleos disponíveis divididos por
+`WEB_WORKERS` x `HASH_POOL_WORKERS`), e fica com o que permite mais
+memória x passes dentro do alvo. Acima disso as lanes do Argon2 só
+disputariam núcleos com os outros hashes. O resultado sai no formato do
+`.env`:
+
+    python -m config.calibrate_argon2 --target-ms 250
+    python -m config.calibrate_argon2 --target-ms 250 --write .env
+
+Hashes existentes continuam válidos; com os novos custos, cada usuário
+tem o hash refeito no próximo login bem-sucedido (`needs_update`).
+"""
+import argparse
+import statistics
+import time
+
+from argon2 import PasswordHasher
+
+from config.server import available_cpus, worker_count
+
+SENHA_AMOSTRA = "calibracao-argon2-senha"
+MIN_MEMORY_KIB = 8 * 1024
+MAX_TIME_COST = 20
+
+
+def measure_ms(time_cost: int, memory_cost: int, parallelism: int,
+               samples: int) -> float:
+    """Mediana, em ms, de `samples` hashes com os parâmetros dados."""
+    hasher = PasswordHasher(time_cost=time_cost, memory_cost=memory_cost,
+                            parallelism=parallelism)
+    tempos = []
+    for _ in range(samples):
+        inicio = time.perf_counter()
+        hasher.hash(SENHA_AMOSTRA)
+        tempos.append((time.perf_counter() - inicio) * 1000)
+    return statistics.median(tempos)
+
+
+def calibrate(target_ms: float, parallelism: int, max_memory_kib: int,
+              samples: int = 3) -> dict:
+    """
+    Reduz a memória à metade até um hash com time_cost=1 caber no alvo e
+    depois aumenta o time_cost enquanto a latência continuar abaixo dele.
+    """
+    memory_cost = max_memory_kib
+    medido = measure_ms(1, memory_cost, parallelism, samples)
+    while medido > target_ms and memory_cost // 2 >= MIN_MEMORY_KIB:
+        memory_cost //= 2
+        medido = measure_ms(1, memory_cost, parallelism, samples)
+
+    time_cost = 1
+    while time_cost < MAX_TIME_COST:
+        proximo = measure_ms(time_cost + 1, memory_cost, parallelism, samples)
+        if proximo > target_ms:
+            break
+        time_cost, medido = time_cost + 1, proximo
+
+    return {
+        "ARGON2_TIME_COST": time_cost,
+        "ARGON2_MEMORY_COST": memory_cost,
+        "ARGON2_PARALLELISM": parallelism,
+        "latency_ms": round(medido, 1),
+    }
+
+
+def max_parallelism(cpus: int, hash_processes: int) -> int:
+    """Núcleos por hash com todos os `hash_processes` ocupados (>= 1)."""
+    return max(1, cpus // max(hash_processes, 1))
+
+
+def calibrate_parallelism(target_ms: float, limite: int, max_memory_kib: int,
+                          samples: int = 3) -> dict:
+    """
+    Calibra com parallelism 1, 2, 4... até `limite` e devolve o resultado
+    de maior custo (memory_cost x time_cost); no empate, o de menos lanes.
+    """
+    melhor = None
+    parallelism = 1
+    while parallelism <= limite:
+        resultado = calibrate(target_ms, parallelism, max_memory_kib,
+                              samples)
+        custo = resultado["ARGON2_MEMORY_COST"] * resultado["ARGON2_TIME_COST"]
+        if melhor is None or custo > melhor[0]:
+            melhor = (custo, resultado)
+        parallelism *= 2
+    return melhor[1]
+
+
+def hash_processes_default() -> int:
+    """Processos de hashing do host: workers web x pool de hashing."""
+    # pylint: disable=import-outside-toplevel
+    from config.settings import settings
+    workers = worker_count(settings.WEB_WORKERS)
+    return workers * max(settings.HASH_POOL_WORKERS, 1)
+
+
+def write_env(path: str, values: dict) -> None:
+    """Atualiza (ou acrescenta) as chaves ARGON2_* no arquivo .env."""
+    try:
+        with open(path, encoding="utf-8") as arquivo:
+            linhas = arquivo.read().splitlines()
+    except FileNotFoundError:
+        linhas = []
+
+    pendentes = dict(values)
+    for i, linha in enumerate(linhas):
+        chave = linha.split("=", 1)[0].strip()
+        if chave in pendentes:
+            linhas[i] = f"{chave}={pendentes.pop(chave)}"
+    linhas.extend(f"{chave}={valor}" for chave, valor in pendentes.items())
+
+    with open(path, "w", encoding="utf-8") as arquivo:
+        arquivo.write("\n".join(linhas) + "\n")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[1])
+    parser.add_argument("--target-ms", type=float, default=250.0,
+                        help="latência alvo por hash (ms)")
+    parser.add_argument("--parallelism", type=int, default=None,
+                        help="fixa o parallelism (padrão: calibrar)")
+    parser.add_argument("--hash-processes", type=int, default=None,
+                        help="hashes simultâneos no host (padrão: "
+                             "WEB_WORKERS x HASH_POOL_WORKERS)")
+    parser.add_argument("--max-memory-kib", type=int, default=64 * 1024)
+    parser.add_argument("--samples", type=int, default=3)
+    parser.add_argument("--write", metavar="ENV_FILE",
+                        help="grava os valores neste arquivo .env")
+    args = parser.parse_args(argv)
+
+    if args.parallelism:
+        resultado = calibrate(args.target_ms, args.parallelism,
+                              args.max_memory_kib, args.samples)
+    else:
+        processos = args.hash_processes or hash_processes_default()
+        cpus = available_cpus()
+        limite = max_parallelism(cpus, processos)
+        print(f"# {cpus} núcleos, {processos} processos de "
+              f"hashing: parallelism até {limite}")
+        resultado = calibrate_parallelism(args.target_ms, limite,
+                                          args.max_memory_kib, args.samples)
+    latencia = resultado.pop("latency_ms")
+    for chave, valor in resultado.items():
+        print(f"{chave}={valor}")
+    print(f"# latência medida: {latencia} ms (alvo {args.target_ms} ms)")
+
+    if args.write:
+        write_env(args.write, resultado)
+        print(f"# valores gravados em {args.write}")
+
+
+if __name__ == "__main__":
+    main()
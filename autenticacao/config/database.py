@@ -10,6 +10,9 @@ from sqlalchemy.orm import sessionmaker
 
 # import relativo para o pacote local de config
 from config.settings import settings
+from config.pool import InstrumentedQueuePool, PoolHealthChecker, pool_options
+from config.sql_timing import instrument_engine
+from config.deadline import bind_deadline, instrument_deadlines
 
 
 # URL de conexão do banco
@@ -27,15 +30,22 @@ if settings.MYSQL_USE_SSL:
         "ca": settings.MYSQL_SSL_CA
     }
 
-# Engine do SQLAlchemy
+# Engine do SQLAlchemy (tamanho, timeout e pre-ping do pool vêm do .env)
 engine = create_engine(
     DATABASE_URL,
-    pool_pre_ping=True,  # Verifica conexão antes de usar
-    pool_recycle=3600,   # Recicla conexões a cada hora
-    echo=settings.DEBUG,  # Log SQL queries em modo debug
-    connect_args=connect_args
+    poolclass=InstrumentedQueuePool,
+    echo=settings.SQL_ECHO,  # Loga todos os statements (verboso)
+    connect_args=connect_args,
+    **pool_options(),
 )
 
+instrument_engine(engine)
+instrument_deadlines(engine)
+
+# Alternativa ao pre-ping: verificação das conexões ociosas em segundo plano
+pool_health_checker = PoolHealthChecker(
+    engine, settings.DB_HEALTH_CHECK_SECONDS)
+
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 Base = declarative_base()
 
@@ -43,6 +53,18 @@ Base = declarative_base()
 def get_db():
     db = SessionLocal()
     try:
+        # Prazo da requisição vira max_execution_time no MySQL
+        bind_deadline(db)
         yield db
     finally:
         db.close()
+
+
+def get_session_factory():
+    """
+    Fábrica de sessões para respostas em streaming: o corpo de uma
+    `StreamingResponse` é gerado depois que as dependências com yield
+    (como `get_db`) já saíram, então o gerador abre e fecha a própria
+    sessão.
+    """
+    return SessionLocal
@@ -0,0 +1,237 @@
+"""
+Despachante de emails com conexão SMTP persistente.
+
+Os emails (ex.: recuperação de senha) entram numa fila assíncrona e são
+enviados por uma única tarefa em background, que reaproveita a mesma
+conexão SMTP/TLS entre mensagens e reconecta quando o servidor a fecha.
+Falhas são tentadas de novo com backoff exponencial; o que esgotar as
+tentativas (ou não couber na fila) vai para o log de dead-letter. Um erro
+inesperado numa mensagem também a manda para o dead-letter, sem derrubar a
+tarefa de envio. O arquivo de dead-letter é escrito numa thread, fora do
+event loop.
+
+O aiosmtplib só é importado quando o primeiro email sai.
+"""
+from __future__ import annotations
+
+import asyncio
+import json
+import logging
+import threading
+from datetime import datetime, timezone
+from email.message import EmailMessage
+from typing import TYPE_CHECKING
+
+from config.settings import settings
+
+if TYPE_CHECKING:
+    import aiosmtplib
+
+logger = logging.getLogger("uvicorn")
+dead_letter_logger = logging.getLogger("mail.dead_letter")
+
+
+def _smtp_lib():
+    # pylint: disable=import-outside-toplevel,redefined-outer-name
+    import aiosmtplib
+    return aiosmtplib
+
+
+class MailDispatcher:
+    """Fila de envio com conexão SMTP reutilizada, retry e dead-letter."""
+
+    # pylint: disable=too-many-instance-attributes,too-many-arguments
+    def __init__(self, hostname: str, port: int, *,
+                 username: str | None = None, password: str | None = None,
+                 start_tls: bool = False, use_tls: bool = False,
+                 timeout: float = 30, batch_size: int = 20,
+                 max_retries: int = 3, backoff_seconds: float = 1.0,
+                 queue_max: int = 1000, dead_letter_path: str | None = None):
+        self.hostname = hostname
+        self.port = port
+        self.username = username
+        self.password = password
+        self.start_tls = start_tls
+        self.use_tls = use_tls
+        self.timeout = timeout
+        self.batch_size = batch_size
+        self.max_retries = max_retries
+        self.backoff_seconds = backoff_seconds
+        self.queue_max = queue_max
+        self.dead_letter_path = dead_letter_path
+        self._queue: asyncio.Queue | None = None
+        self._task: asyncio.Task | None = None
+        self._smtp: aiosmtplib.SMTP | None = None
+        self._escritas: set[asyncio.Future] = set()
+        self._arquivo_lock = threading.Lock()
+        self._stats = {"sent": 0, "retries": 0, "dead_letter": 0,
+                       "connections": 0, "batches": 0}
+
+    async def start(self) -> None:
+        if self._task is None:
+            self._queue = asyncio.Queue(maxsize=self.queue_max)
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self, drain_timeout: float = 10) -> None:
+        """Aguarda a fila esvaziar (até `drain_timeout`) e fecha a conexão."""
+        if self._task is None:
+            return
+        try:
+            await asyncio.wait_for(self._queue.join(), drain_timeout)
+        except asyncio.TimeoutError:
+            logger.warning("Fila de emails não esvaziou; %d pendentes",
+                           self._queue.qsize())
+        self._task.cancel()
+        try:
+            await self._task
+        except asyncio.CancelledError:
+            pass
+        self._task = None
+        await self._disconnect()
+        if self._escritas:
+            await asyncio.gather(*self._escritas)
+
+    def enqueue(self, message: EmailMessage) -> bool:
+        """Agenda o envio; devolve False se a fila estiver cheia."""
+        if self._queue is None:
+            self._dead_letter(message, "despachante não iniciado")
+            return False
+        try:
+            self._queue.put_nowait(message)
+            return True
+        except asyncio.QueueFull:
+            self._dead_letter(message, "fila de emails cheia")
+            return False
+
+    def stats(self) -> dict:
+        return {
+            **self._stats,
+            "queued": self._queue.qsize() if self._queue else 0,
+            "connected": bool(self._smtp and self._smtp.is_connected),
+        }
+
+    async def _run(self) -> None:
+        while True:
+            lote = [await self._queue.get()]
+            while len(lote) < self.batch_size and not self._queue.empty():
+                lote.append(self._queue.get_nowait())
+            self._stats["batches"] += 1
+            for message in lote:
+                try:
+                    await self._send_with_retry(message)
+                except Exception as exc:  # pylint: disable=broad-except
+                    # Uma mensagem ruim não pode parar a fila inteira
+                    logger.exception("Erro inesperado ao enviar email")
+                    await self._dead_letter_async(
+                        message, f"erro inesperado: {exc!r}")
+                finally:
+                    self._queue.task_done()
+
+    async def _send_with_retry(self, message: EmailMessage) -> None:
+        smtp_lib = _smtp_lib()
+        for tentativa in range(self.max_retries + 1):
+            try:
+                smtp = await self._connection()
+                await smtp.send_message(message)
+                self._stats["sent"] += 1
+                return
+            except (smtp_lib.SMTPException, OSError) as exc:
+                await self._disconnect()
+                if tentativa == self.max_retries:
+                    await self._dead_letter_async(message, str(exc))
+                    return
+                self._stats["retries"] += 1
+                await asyncio.sleep(self.backoff_seconds * 2 ** tentativa)
+
+    async def _connection(self) -> aiosmtplib.SMTP:
+        if self._smtp is not None and self._smtp.is_connected:
+            return self._smtp
+        smtp = _smtp_lib().SMTP(
+            hostname=self.hostname,
+            port=self.port,
+            use_tls=self.use_tls,
+            start_tls=self.start_tls,
+            timeout=self.timeout,
+        )
+        await smtp.connect()
+        if self.username:
+            await smtp.login(self.username, self.password)
+        self._smtp = smtp
+        self._stats["connections"] += 1
+        return smtp
+
+    async def _disconnect(self) -> None:
+        if self._smtp is None:
+            return
+        try:
+            if self._smtp.is_connected:
+                await self._smtp.quit()
+        except (_smtp_lib().SMTPException, OSError):
+            self._smtp.close()
+        self._smtp = None
+
+    def _dead_letter(self, message: EmailMessage,
+                     motivo: str) -> asyncio.Future | None:
+        """
+        Registra a mensagem perdida; devolve a escrita do arquivo em
+        andamento (numa thread), ou None se não houver o que aguardar.
+        """
+        self._stats["dead_letter"] += 1
+        registro = {
+            "timestamp": datetime.now(timezone.utc).isoformat(),
+            "to": message["To"],
+            "subject": message["Subject"],
+            "error": motivo,
+        }
+        dead_letter_logger.error("Email não enviado: %s", registro)
+        if not self.dead_letter_path:
+            return None
+        linha = json.dumps(registro, ensure_ascii=False) + "\n"
+        try:
+            loop = asyncio.get_running_loop()
+        except RuntimeError:  # fora do event loop: pode bloquear
+            self._gravar_dead_letter(linha)
+            return None
+        escrita = loop.run_in_executor(None, self._gravar_dead_letter, linha)
+        self._escritas.add(escrita)
+        escrita.add_done_callback(self._escritas.discard)
+        return escrita
+
+    async def _dead_letter_async(self, message: EmailMessage,
+                                 motivo: str) -> None:
+        escrita = self._dead_letter(message, motivo)
+        if escrita is not None:
+            await escrita
+
+    def _gravar_dead_letter(self, linha: str) -> None:
+        try:
+            with self._arquivo_lock, open(self.dead_letter_path, "a",
+                                          encoding="utf-8") as arquivo:
+                arquivo.write(linha)
+        except OSError as erro:
+            logger.error("Falha ao gravar o dead-letter de email: %s", erro)
+
+
+def build_message(to: str, subject: str, body: str) -> EmailMessage:
+    message = EmailMessage()
+    message["From"] = settings.MAIL_FROM
+    message["To"] = to
+    message["Subject"] = subject
+    message.set_content(body)
+    return message
+
+
+mail_dispatcher = MailDispatcher(
+    settings.MAIL_SERVER,
+    settings.MAIL_PORT,
+    username=settings.MAIL_USERNAME,
+    password=settings.MAIL_PASSWORD,
+    start_tls=settings.MAIL_STARTTLS,
+    use_tls=settings.MAIL_SSL_TLS,
+    timeout=settings.MAIL_TIMEOUT,
+    batch_size=settings.MAIL_BATCH_SIZE,
+    max_retries=settings.MAIL_MAX_RETRIES,
+    backoff_seconds=settings.MAIL_RETRY_BACKOFF_SECONDS,
+    queue_max=settings.MAIL_QUEUE_MAX,
+    dead_letter_path=settings.MAIL_DEAD_LETTER_PATH,
+)
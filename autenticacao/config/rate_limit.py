@@ -0,0 +1,160 @@
+"""
+Limitação de taxa (token bucket) para os endpoints de autenticação.
+
+Cada chave (IP de origem ou email) tem um balde com `capacidade` fichas
+repostas continuamente a `capacidade / 60` fichas por segundo. O estado
+fica num store plugável: `MemoryBucketStore` (por processo) ou
+`SQLiteBucketStore`, um arquivo local compartilhado pelos workers do
+mesmo host que faz as vezes de um store externo. As chamadas ao store
+bloqueiam (lock, arquivo), então os handlers async as fazem no threadpool.
+
+Se o arquivo SQLite ficar travado além de `LOCK_TIMEOUT_SECONDS`, a
+tentativa passa sem consumir ficha (falha aberta): uma contenção
+passageira do store não deve derrubar o login, e o limite volta a valer na
+requisição seguinte.
+"""
+import logging
+import sqlite3
+import threading
+import time
+
+from config.settings import settings
+
+logger = logging.getLogger("uvicorn")
+
+# Espera máxima pelo lock de escrita do arquivo SQLite
+LOCK_TIMEOUT_SECONDS = 1.0
+
+
+class MemoryBucketStore:
+    """
+    Baldes em memória, protegidos por lock (um store por processo).
+
+    O dicionário fica em ordem de última atualização (cada `take` remove e
+    reinsere a chave), então os baldes ociosos estão sempre no início e o
+    descarte só percorre os que já encheram de novo.
+    """
+
+    def __init__(self):
+        self._buckets: dict = {}
+        self._lock = threading.Lock()
+
+    def take(self, key: str, capacity: int, rate: float, now: float) -> float:
+        """Consome uma ficha; devolve 0 ou os segundos até a próxima."""
+        with self._lock:
+            self._prune(capacity / rate, now)
+            tokens, updated = self._buckets.pop(key, (capacity, now))
+            tokens = min(capacity, tokens + (now - updated) * rate)
+            if tokens >= 1:
+                self._buckets[key] = (tokens - 1, now)
+                return 0.0
+            self._buckets[key] = (tokens, now)
+            return (1 - tokens) / rate
+
+    def _prune(self, ocioso: float, now: float) -> None:
+        """Descarta os baldes sem uso há `ocioso` segundos (já cheios)."""
+        ociosos = []
+        for key, (_, updated) in self._buckets.items():
+            if now - updated < ocioso:
+                break  # daqui em diante todos foram usados depois
+            ociosos.append(key)
+        for key in ociosos:
+            del self._buckets[key]
+
+    def reset(self) -> None:
+        with self._lock:
+            self._buckets.clear()
+
+
+class SQLiteBucketStore:
+    """Baldes num arquivo SQLite compartilhado entre processos."""
+
+    def __init__(self, path: str):
+        self.path = path
+        self._local = threading.local()
+        # Conexão própria: o store é criado no mestre do gunicorn
+        # (preload), e uma conexão SQLite não pode atravessar o fork
+        conn = sqlite3.connect(path, timeout=5, isolation_level=None)
+        try:
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS rate_buckets ("
+                "key TEXT PRIMARY KEY, tokens REAL NOT NULL, "
+                "updated REAL NOT NULL)"
+            )
+        finally:
+            conn.close()
+
+    def _connect(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=LOCK_TIMEOUT_SECONDS,
+                                   isolation_level=None)
+            self._local.conn = conn
+        return conn
+
+    def take(self, key: str, capacity: int, rate: float, now: float) -> float:
+        conn = self._connect()
+        try:
+            # BEGIN IMMEDIATE serializa leitura+escrita entre os processos
+            conn.execute("BEGIN IMMEDIATE")
+            row = conn.execute(
+                "SELECT tokens, updated FROM rate_buckets WHERE key = ?",
+                (key,),
+            ).fetchone()
+            tokens, updated = row if row else (capacity, now)
+            tokens = min(capacity, tokens + (now - updated) * rate)
+            retry_after = 0.0
+            if tokens >= 1:
+                tokens -= 1
+            else:
+                retry_after = (1 - tokens) / rate
+            conn.execute(
+                "INSERT OR REPLACE INTO rate_buckets (key, tokens, updated) "
+                "VALUES (?, ?, ?)",
+                (key, tokens, now),
+            )
+            conn.execute("COMMIT")
+            return retry_after
+        except sqlite3.OperationalError as erro:
+            if conn.in_transaction:
+                conn.execute("ROLLBACK")
+            # "database is locked": falha aberta em vez de um 500
+            logger.warning("Rate limit ignorado, store indisponível: %s",
+                           erro)
+            return 0.0
+        except sqlite3.Error:
+            if conn.in_transaction:
+                conn.execute("ROLLBACK")
+            raise
+
+    def reset(self) -> None:
+        conn = self._connect()
+        conn.execute("DELETE FROM rate_buckets")
+
+
+class RateLimiter:
+    """Aplica um limite de `per_minute` requisições por chave."""
+
+    def __init__(self, store, per_minute: int):
+        self.store = store
+        self.per_minute = per_minute
+
+    def hit(self, key: str) -> float:
+        """Registra uma tentativa; devolve 0 ou o Retry-After em segundos."""
+        if self.per_minute <= 0:
+            return 0.0
+        return self.store.take(
+            key, self.per_minute, self.per_minute / 60.0, time.time()
+        )
+
+
+def build_store():
+    if settings.RATE_LIMIT_STORE_PATH:
+        return SQLiteBucketStore(settings.RATE_LIMIT_STORE_PATH)
+    return MemoryBucketStore()
+
+
+rate_limit_store = build_store()
+ip_limiter = RateLimiter(rate_limit_store, settings.RATE_LIMIT_IP_PER_MINUTE)
+email_limiter = RateLimiter(rate_limit_store,
+                            settings.RATE_LIMIT_EMAIL_PER_MINUTE)
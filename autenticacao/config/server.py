@@ -0,0 +1,89 @@
+"""
+Modo de produção: gunicorn com workers uvicorn (ver `gunicorn.conf.py`).
+
+O gunicorn importa a aplicação uma vez no processo mestre
+(`preload_app`) e cria os workers por fork, que compartilham o código já
+carregado. O que não pode atravessar o fork fica aqui:
+
+- `reset_after_fork` descarta, em cada worker, os pools herdados do
+  mestre (`engine.dispose(close=False)`): os sockets do MySQL não podem
+  ser usados por dois processos, e o worker abre as próprias conexões.
+- `prepare_multiproc_dir` esvazia `PROMETHEUS_MULTIPROC_DIR` antes de os
+  workers nascerem, e `mark_worker_dead` tira dele os gauges de um worker
+  que saiu (reciclado após `WEB_MAX_REQUESTS` ou encerrado).
+- `worker_count` usa todos os núcleos disponíveis para o container,
+  respeitando a cota de CPU do cgroup, quando `WEB_WORKERS` é 0.
+
+Ao receber SIGTERM, cada worker para de aceitar conexões, espera as
+requisições em andamento por até `WEB_GRACEFUL_TIMEOUT` segundos e então
+roda os hooks de shutdown da aplicação (fila de emails, hashing, pools).
+"""
+import math
+import os
+import shutil
+
+CGROUP_V2_CPU_MAX = "/sys/fs/cgroup/cpu.max"
+CGROUP_V1_QUOTA = "/sys/fs/cgroup/cpu/cpu.cfs_quota_us"
+CGROUP_V1_PERIOD = "/sys/fs/cgroup/cpu/cpu.cfs_period_us"
+
+
+def _cgroup_quota() -> float | None:
+    """Cota de CPU do cgroup em núcleos, ou None sem limite."""
+    try:
+        with open(CGROUP_V2_CPU_MAX, encoding="ascii") as arquivo:
+            quota, period = arquivo.read().split()
+        if quota == "max":
+            return None
+        return int(quota) / int(period)
+    except (OSError, ValueError):
+        pass
+    try:
+        with open(CGROUP_V1_QUOTA, encoding="ascii") as arquivo:
+            quota = int(arquivo.read())
+        with open(CGROUP_V1_PERIOD, encoding="ascii") as arquivo:
+            period = int(arquivo.read())
+        return quota / period if quota > 0 else None
+    except (OSError, ValueError):
+        return None
+
+
+def available_cpus() -> int:
+    """Núcleos que o processo pode usar (afinidade e cota do cgroup)."""
+    try:
+        cpus = len(os.sched_getaffinity(0))
+    except AttributeError:
+        cpus = os.cpu_count() or 1
+    quota = _cgroup_quota()
+    if quota is not None:
+        cpus = min(cpus, math.ceil(quota))
+    return max(cpus, 1)
+
+
+def worker_count(configurado: int) -> int:
+    """`WEB_WORKERS` quando definido; senão um worker por núcleo."""
+    return configurado if configurado > 0 else available_cpus()
+
+
+def prepare_multiproc_dir(path: str | None) -> None:
+    """Esvazia o diretório das métricas multiprocesso (antes dos workers)."""
+    if not path:
+        return
+    shutil.rmtree(path, ignore_errors=True)
+    os.makedirs(path, exist_ok=True)
+
+
+def reset_after_fork(engines) -> None:
+    """Troca, no worker recém-criado, os pools herdados do mestre."""
+    for engine in engines:
+        # close=False: as conexões pertencem ao mestre, que segue com elas
+        engine.dispose(close=False)
+
+
+def mark_worker_dead(pid: int) -> None:
+    """Remove os gauges `live*` de um worker que saiu."""
+    if not os.environ.get("PROMETHEUS_MULTIPROC_DIR"):
+        return
+    # pylint: disable=import-outside-toplevel
+    from prometheus_client import multiprocess
+
+    multiprocess.mark_process_dead(pid)
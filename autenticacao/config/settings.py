@@ -17,13 +17,83 @@ class Settings(BaseSettings):
     MYSQL_PORT: int = 3306
     MYSQL_USE_SSL: bool = False
     MYSQL_SSL_CA: str | None = None
+    # Pool de conexões; com DB_HEALTH_CHECK_SECONDS > 0 uma thread testa as
+    # conexões ociosas e DB_POOL_PRE_PING pode ser desligado
+    DB_POOL_SIZE: int = 5
+    DB_MAX_OVERFLOW: int = 10
+    DB_POOL_TIMEOUT: float = 30.0
+    DB_POOL_RECYCLE: int = 3600
+    DB_POOL_PRE_PING: bool = True
+    DB_HEALTH_CHECK_SECONDS: int = 0
+    # Tempo de banco por requisição (Server-Timing e log JSON em
+    # `uvicorn.sql`) e queries lentas com EXPLAIN (0 desliga)
+    SQL_ECHO: bool = False
+    SQL_REQUEST_LOG: bool = True
+    SQL_SLOW_QUERY_MS: float = 200
+    SQL_EXPLAIN_SLOW: bool = True
 
     # Aplicação
     APP_HOST: str = "0.0.0.0"
     APP_PORT: int = 8001
     SECRET_KEY: str
     ALGORITHM: str = "HS256"
-    ACCESS_TOKEN_EXPIRE_MINUTES: int = 1440
+    # Access tokens curtos; a sessão é mantida via /refresh
+    ACCESS_TOKEN_EXPIRE_MINUTES: int = 15
+    REFRESH_TOKEN_EXPIRE_DAYS: int = 30
+    # Tokens com id, geração e nome do usuário (backend dispensa o banco)
+    STATELESS_TOKENS: bool = False
+
+    # Hashing de senhas (0 workers = hashing no threadpool)
+    HASH_POOL_WORKERS: int = 2
+    HASH_QUEUE_MAX: int = 64
+    # Custos do Argon2 (None = padrão do argon2-cffi); ajuste com
+    # `python -m config.calibrate_argon2` no serviço de autenticação
+    ARGON2_TIME_COST: int | None = None
+    ARGON2_MEMORY_COST: int | None = None  # KiB
+    ARGON2_PARALLELISM: int | None = None
+
+    # Limite de tentativas em /login, /register e /change-password
+    # (requisições por minuto; 0 desabilita). Com RATE_LIMIT_STORE_PATH os
+    # workers compartilham o estado num arquivo SQLite local (no gunicorn
+    # com mais de um worker, /tmp/rate-limit-auth.db quando não definido).
+    RATE_LIMIT_IP_PER_MINUTE: int = 30
+    RATE_LIMIT_EMAIL_PER_MINUTE: int = 10
+    RATE_LIMIT_STORE_PATH: str | None = None
+    RATE_LIMIT_TRUST_PROXY: bool = False
+
+    # API administrativa (cadastro em lote e /metrics, com X-Admin-Key ou
+    # Bearer); sem chave ela fica desligada
+    ADMIN_API_KEY: str | None = None
+    BULK_REGISTER_BATCH_SIZE: int = 500
+
+    # Threads do AnyIO para handlers síncronos; FAST_LANE_TOKENS > 0 dá aos
+    # GETs em FAST_LANE_PATHS um limiter próprio
+    THREADPOOL_TOKENS: int = 40
+    FAST_LANE_TOKENS: int = 0
+    FAST_LANE_PATHS: str = "/health,/api/auth/me"
+
+    # Descarte de carga (0 desliga cada limite) e prazo por requisição em
+    # ms (0 = sem prazo); REQUEST_DEADLINE_ROUTES: "prefixo=ms,..."
+    SHED_MAX_IN_FLIGHT: int = 0
+    SHED_MAX_QUEUED: int = 0
+    SHED_RETRY_AFTER_SECONDS: int = 1
+    SHED_EXEMPT_PATHS: str = "/health,/metrics"
+    REQUEST_DEADLINE_MS: int = 0
+    REQUEST_DEADLINE_ROUTES: str = ""
+
+    # Modo de produção (gunicorn.conf.py): WEB_WORKERS=0 usa um worker por
+    # núcleo; cada worker é reciclado após ~WEB_MAX_REQUESTS requisições
+    WEB_WORKERS: int = 0
+    WEB_MAX_REQUESTS: int = 10000
+    WEB_MAX_REQUESTS_JITTER: int = 1000
+    WEB_GRACEFUL_TIMEOUT: int = 30
+    WEB_TIMEOUT: int = 60
+
+    # Amostragem de event loop, threadpool e pools para /metrics (0 desliga)
+    METRICS_SAMPLE_SECONDS: float = 5.0
+
+    # Startup: contagem de linhas no log (none | estimate | exact)
+    STARTUP_ROW_COUNTS: str = "estimate"
 
     # Ambiente
     ENVIRONMENT: str = "development"
@@ -38,6 +108,13 @@ class Settings(BaseSettings):
     MAIL_SERVER: str
     MAIL_STARTTLS: bool = True
     MAIL_SSL_TLS: bool = False
+    # Despachante de emails (conexão SMTP persistente)
+    MAIL_TIMEOUT: int = 120  # conexões SMTP em cloud podem demorar
+    MAIL_BATCH_SIZE: int = 20
+    MAIL_MAX_RETRIES: int = 3
+    MAIL_RETRY_BACKOFF_SECONDS: float = 1.0
+    MAIL_QUEUE_MAX: int = 1000
+    MAIL_DEAD_LETTER_PATH: str | None = None
 
     model_config = SettingsConfigDict(
         env_file=os.getenv("ENV_FILE", ".env"),
@@ -0,0 +1,113 @@
+"""
+Utilitários para um startup rápido e barato.
+
+- `BootTimer` mede cada fase do boot e registra um resumo no log.
+- `schema_is_current` / `mark_schema` guardam, na tabela `schema_versao`,
+  a versão de schema já verificada por cada serviço; as checagens (DDL,
+  colunas novas) só rodam quando a versão do código é mais nova.
+- `log_table_counts` registra o tamanho das tabelas conforme
+  `STARTUP_ROW_COUNTS`: `none`, `estimate` (estimativa do
+  `information_schema`, sem varrer índices) ou `exact` (`COUNT(*)`).
+"""
+import logging
+import time
+from contextlib import contextmanager
+
+from sqlalchemy import (Column, DateTime, Integer, MetaData, String, Table,
+                        bindparam, select, text)
+from sqlalchemy.engine import Connection
+from sqlalchemy.exc import SQLAlchemyError
+
+from config.settings import settings
+
+logger = logging.getLogger("uvicorn")
+
+_metadata = MetaData()
+schema_versao = Table(
+    "schema_versao",
+    _metadata,
+    Column("servico", String(50), primary_key=True),
+    Column("versao", Integer, nullable=False),
+    Column("atualizado_em", DateTime,
+           server_default=text("CURRENT_TIMESTAMP")),
+)
+
+
+class BootTimer:
+    """Acumula a duração de cada fase do boot."""
+
+    def __init__(self, servico: str):
+        self.servico = servico
+        self.fases: dict[str, float] = {}
+        self._inicio = time.perf_counter()
+
+    @contextmanager
+    def phase(self, nome: str):
+        inicio = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.fases[nome] = (time.perf_counter() - inicio) * 1000
+
+    def report(self) -> dict:
+        """Registra e devolve as durações (ms) por fase e o total."""
+        resumo = {nome: round(ms, 1) for nome, ms in self.fases.items()}
+        resumo["total"] = round((time.perf_counter() - self._inicio) * 1000, 1)
+        logger.info("Boot %s (ms): %s", self.servico, " ".join(
+            f"{nome}={ms}" for nome, ms in resumo.items()))
+        return resumo
+
+
+def schema_is_current(conn: Connection, servico: str, versao: int) -> bool:
+    """True se o serviço já verificou o schema nesta versão (ou mais nova)."""
+    try:
+        atual = conn.execute(
+            select(schema_versao.c.versao)
+            .where(schema_versao.c.servico == servico)
+        ).scalar()
+    except SQLAlchemyError:
+        # Tabela de versão ainda não existe
+        conn.rollback()
+        return False
+    return atual is not None and atual >= versao
+
+
+def mark_schema(conn: Connection, servico: str, versao: int) -> None:
+    """Grava a versão de schema verificada pelo serviço."""
+    schema_versao.create(conn, checkfirst=True)
+    conn.execute(schema_versao.delete()
+                 .where(schema_versao.c.servico == servico))
+    conn.execute(schema_versao.insert()
+                 .values(servico=servico, versao=versao))
+    conn.commit()
+
+
+def log_table_counts(conn: Connection, tabelas: list[str]) -> dict:
+    """Registra a quantidade de linhas por tabela conforme o modo."""
+    modo = settings.STARTUP_ROW_COUNTS
+    if modo == "none":
+        return {}
+    try:
+        if modo == "exact":
+            contagens = {
+                tabela: conn.execute(
+                    text(f"SELECT COUNT(*) FROM {tabela}")).scalar()
+                for tabela in tabelas
+            }
+        else:
+            # `table_rows` é a estimativa mantida pelo InnoDB (sem scan)
+            contagens = dict(conn.execute(
+                text(
+                    "SELECT table_name, table_rows "
+                    "FROM information_schema.tables "
+                    "WHERE table_schema = :db AND table_name IN :tabelas"
+                ).bindparams(bindparam("tabelas", expanding=True)),
+                {"db": settings.MYSQL_DB, "tabelas": tabelas},
+            ).all())
+    except SQLAlchemyError as exc:
+        conn.rollback()
+        logger.warning("Falha ao contar registros: %s", exc)
+        return {}
+    for tabela, total in contagens.items():
+        logger.info("Tabela %s possui %s registros (%s)", tabela, total, modo)
+    return contagens
@@ -0,0 +1,36 @@
+"""
+Testes da calibração dos custos do Argon2 (`config.calibrate_argon2`).
+"""
+# pylint: disable=redefined-outer-name,import-outside-toplevel,invalid-name
+
+
+def test_calibrate_argon2_grava_env(tmp_path):
+    from config.calibrate_argon2 import calibrate, write_env
+
+    resultado = calibrate(target_ms=1, parallelism=1,
+                          max_memory_kib=8 * 1024, samples=1)
+    assert resultado["ARGON2_TIME_COST"] == 1
+    assert resultado["ARGON2_MEMORY_COST"] == 8 * 1024
+
+    env = tmp_path / ".env"
+    env.write_text("SECRET_KEY=x\nARGON2_TIME_COST=9\n", encoding="utf-8")
+    resultado.pop("latency_ms")
+    write_env(str(env), resultado)
+    assert env.read_text(encoding="utf-8").splitlines() == [
+        "SECRET_KEY=x",
+        "ARGON2_TIME_COST=1",
+        "ARGON2_MEMORY_COST=8192",
+        "ARGON2_PARALLELISM=1",
+    ]
+
+
+def test_calibrate_argon2_parallelism_limitado_pelos_nucleos():
+    from config.calibrate_argon2 import calibrate_parallelism, max_parallelism
+
+    # 8 núcleos e 4 processos de hashing: no máximo 2 lanes por hash
+    assert max_parallelism(8, 4) == 2
+    assert max_parallelism(4, 8) == 1
+    resultado = calibrate_parallelism(target_ms=1, limite=2,
+                                      max_memory_kib=8 * 1024, samples=1)
+    assert resultado["ARGON2_PARALLELISM"] in (1, 2)
+    assert resultado["ARGON2_MEMORY_COST"] == 8 * 1024
@@ -0,0 +1,41 @@
+"""
+Testes do prazo por requisição (`config.deadline`): escolha do prazo
+por rota e cabeçalho e o `max_execution_time` enviado ao MySQL.
+"""
+import time
+from types import SimpleNamespace
+
+import pytest
+
+from config import deadline
+
+
+def test_prazo_da_requisicao_e_max_execution_time(monkeypatch):
+    monkeypatch.setattr(deadline, "ROUTE_DEADLINES",
+                        deadline.parse_routes("/api=5000,/api/lento=500"))
+    monkeypatch.setattr(deadline.settings, "REQUEST_DEADLINE_MS", 0)
+    assert deadline.deadline_ms("/api/lento", None) == 500
+    assert deadline.deadline_ms("/api/rapido", "20000") == 5000
+    assert deadline.deadline_ms("/api/rapido", "100") == 100
+    assert deadline.deadline_ms("/health", "abc") == 0
+
+    session = SimpleNamespace(info={})
+    token = deadline._deadline.set(time.monotonic() - 1)
+    try:
+        with pytest.raises(deadline.DeadlineExceeded):
+            deadline.bind_deadline(session)
+    finally:
+        deadline._deadline.reset(token)
+
+    # No MySQL o tempo restante vai para a conexão; só reenvia se mudar
+    executados = []
+    conexao = SimpleNamespace(dialect=SimpleNamespace(name="mysql"), info={},
+                              exec_driver_sql=executados.append)
+    session.info["deadline"] = time.monotonic() + 2
+    deadline._apply_max_execution_time(session, None, conexao)
+    assert executados[0].startswith("SET SESSION max_execution_time = ")
+    assert 1000 < conexao.info["max_execution_time"] <= 2000
+    session.info.clear()
+    deadline._apply_max_execution_time(session, None, conexao)
+    deadline._apply_max_execution_time(session, None, conexao)
+    assert executados[1:] == ["SET SESSION max_execution_time = 0"]
@@ -0,0 +1,40 @@
+"""
+Testes do executor de hashing (`config.hashing`): fila limitada e
+reserva das vagas de um lote inteiro antes de enviar os blocos.
+"""
+import asyncio
+import time
+
+import pytest
+
+from config.hashing import HashingExecutor, HashingQueueFull
+
+
+async def test_hashing_executor_rejeita_com_fila_cheia():
+    executor = HashingExecutor(workers=0, queue_max=1)
+    primeiro = asyncio.create_task(executor.run(time.sleep, 0.2))
+    await asyncio.sleep(0.05)
+    with pytest.raises(HashingQueueFull):
+        await executor.run(time.sleep, 0)
+    await primeiro
+
+    stats = executor.stats()
+    assert stats["completed"] == 1
+    assert stats["rejected"] == 1
+    assert stats["pending"] == 0
+    assert stats["latency_max_ms"] >= 200
+
+
+async def test_hashing_map_reserva_todos_os_blocos_antes():
+    # Sem start(): dois blocos no threadpool, uma vaga ocupada
+    executor = HashingExecutor(workers=2, queue_max=2)
+    calculados = []
+    ocupado = asyncio.create_task(executor.run(time.sleep, 0.2))
+    await asyncio.sleep(0.05)
+    with pytest.raises(HashingQueueFull):
+        await executor.map(calculados.append, [1, 2, 3, 4])
+    await ocupado
+    assert calculados == []  # nenhum bloco foi enviado e descartado
+    assert executor.stats()["pending"] == 0
+
+    assert await executor.map(str, [1, 2, 3]) == ["1", "2", "3"]
@@ -0,0 +1,14 @@
+"""
+Testes do relatório de tempo de import (`config.importtime`).
+"""
+from config.importtime import parse_importtime
+
+
+def test_parse_importtime():
+    saida = (
+        "import time: self [us] | cumulative | imported package\n"
+        "import time:       120 |        120 |   jose.jwt\n"
+        "import time:      2500 |       2620 | main\n"
+    )
+    assert parse_importtime(saida) == {
+        "jose.jwt": (120, 120), "main": (2500, 2620)}
@@ -0,0 +1,109 @@
+"""
+Testes do envio de emails em segundo plano (`config.mail`) contra um
+servidor SMTP local: reuso da conexão, retries e dead letter.
+"""
+import pytest
+
+
+# pylint: disable=redefined-outer-name,import-outside-toplevel,invalid-name
+
+
+def _porta_livre() -> int:
+    import socket
+
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+@pytest.fixture
+def smtp_local():
+    """Servidor SMTP local (aiosmtpd) que guarda as mensagens recebidas."""
+    from aiosmtpd.controller import Controller
+
+    class Handler:
+        def __init__(self):
+            self.mensagens = []
+
+        async def handle_DATA(self, server, session, envelope):  # noqa: N802
+            # pylint: disable=unused-argument,invalid-name
+            self.mensagens.append(envelope)
+            return "250 OK"
+
+    handler = Handler()
+    controller = Controller(handler, hostname="127.0.0.1", port=_porta_livre())
+    controller.start()
+    try:
+        yield controller, handler
+    finally:
+        controller.stop()
+
+
+async def test_mail_dispatcher_reusa_conexao(smtp_local):
+    import asyncio
+    from config.mail import MailDispatcher, build_message
+
+    controller, handler = smtp_local
+    dispatcher = MailDispatcher(controller.hostname, controller.port,
+                                start_tls=False)
+    await dispatcher.start()
+    for i in range(3):
+        assert dispatcher.enqueue(build_message(f"u{i}@x.com", "Oi", "corpo"))
+    await asyncio.wait_for(dispatcher._queue.join(), 5)  # pylint: disable=protected-access
+    await dispatcher.stop()
+
+    assert len(handler.mensagens) == 3
+    assert dispatcher.stats()["sent"] == 3
+    assert dispatcher.stats()["connections"] == 1
+
+
+async def test_mail_dispatcher_dead_letter_apos_retries(tmp_path):
+    import json
+    from config.mail import MailDispatcher, build_message
+
+    porta = _porta_livre()  # nenhum servidor escutando
+    dead_letter = tmp_path / "dead.jsonl"
+    dispatcher = MailDispatcher("127.0.0.1", porta, start_tls=False,
+                                timeout=1, max_retries=2,
+                                backoff_seconds=0.01,
+                                dead_letter_path=str(dead_letter))
+    await dispatcher.start()
+    dispatcher.enqueue(build_message("perdido@x.com", "Oi", "corpo"))
+    await dispatcher.stop()
+
+    assert dispatcher.stats()["retries"] == 2
+    assert dispatcher.stats()["dead_letter"] == 1
+    registro = json.loads(dead_letter.read_text(encoding="utf-8"))
+    assert registro["to"] == "perdido@x.com"
+
+
+async def test_mail_dispatcher_segue_apos_erro_inesperado(smtp_local,
+                                                          tmp_path):
+    import asyncio
+    import json
+    from config.mail import MailDispatcher, build_message
+
+    controller, handler = smtp_local
+    dead_letter = tmp_path / "dead.jsonl"
+    dispatcher = MailDispatcher(controller.hostname, controller.port,
+                                start_tls=False,
+                                dead_letter_path=str(dead_letter))
+    enviar = dispatcher._send_with_retry  # pylint: disable=protected-access
+
+    async def falha_na_primeira(message):
+        if message["To"] == "ruim@x.com":
+            raise ValueError("cabeçalho inválido")
+        await enviar(message)
+
+    dispatcher._send_with_retry = falha_na_primeira  # pylint: disable=protected-access
+    await dispatcher.start()
+    dispatcher.enqueue(build_message("ruim@x.com", "Oi", "corpo"))
+    dispatcher.enqueue(build_message("bom@x.com", "Oi", "corpo"))
+    await asyncio.wait_for(dispatcher._queue.join(), 5)  # pylint: disable=protected-access
+    await dispatcher.stop()
+
+    assert len(handler.mensagens) == 1
+    assert dispatcher.stats()["dead_letter"] == 1
+    registro = json.loads(dead_letter.read_text(encoding="utf-8"))
+    assert registro["to"] == "ruim@x.com"
+    assert "cabeçalho inválido" in registro["error"]
@@ -0,0 +1,52 @@
+"""
+Testes do pool instrumentado (`config.pool`): contadores de espera e
+timeout e a verificação periódica das conexões ociosas.
+"""
+import pytest
+from sqlalchemy import create_engine
+from sqlalchemy.exc import TimeoutError as PoolTimeout
+
+from config.pool import InstrumentedQueuePool, PoolHealthChecker, pool_stats
+
+
+def test_pool_instrumentado_e_verificacao_de_ociosas(tmp_path):
+    eng = create_engine(f"sqlite:///{tmp_path}/pool.db",
+                        poolclass=InstrumentedQueuePool, pool_size=1,
+                        max_overflow=0, pool_timeout=0.05)
+    with eng.connect():
+        with pytest.raises(PoolTimeout):
+            eng.connect()
+        assert pool_stats(eng.pool)["checked_out"] == 1
+
+    stats = pool_stats(eng.pool)
+    assert stats["checkouts"] == 1
+    assert stats["timeouts"] == 1
+    assert stats["wait_max_ms"] >= 50
+
+    assert PoolHealthChecker(eng, 30).check_idle() == (1, 0)
+    assert pool_stats(eng.pool)["checkouts"] == 1  # verificação não conta
+    eng.dispose()  # o pool recriado mantém os contadores
+    assert pool_stats(eng.pool)["health_checks"] == 1
+
+
+def test_verificacao_do_pool_retira_uma_conexao_por_vez(tmp_path):
+    eng = create_engine(f"sqlite:///{tmp_path}/pool.db",
+                        poolclass=InstrumentedQueuePool, pool_size=3,
+                        max_overflow=0)
+    conexoes = [eng.connect() for _ in range(3)]
+    vistas = set()
+    for conexao in conexoes:
+        vistas.add(id(conexao.connection.dbapi_connection))
+        conexao.close()
+
+    em_uso, pingadas = [], set()
+
+    def ping(dbapi_connection):
+        em_uso.append(eng.pool.checkedout())
+        pingadas.add(id(dbapi_connection))
+        return True
+
+    eng.dialect.do_ping = ping
+    assert PoolHealthChecker(eng, 30).check_idle() == (3, 0)
+    assert em_uso == [1, 1, 1]
+    assert pingadas == vistas  # cada ociosa testada uma vez
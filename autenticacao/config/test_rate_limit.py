@@ -0,0 +1,67 @@
+"""
+Testes do rate limit por token bucket (`config.rate_limit`): reposição
+das fichas, estado compartilhado entre workers no SQLite e limpeza dos
+baldes ociosos em memória.
+"""
+import pytest
+
+
+# pylint: disable=redefined-outer-name,import-outside-toplevel,invalid-name
+
+
+@pytest.mark.parametrize("store_factory", ["memory", "sqlite"])
+def test_token_bucket_limita_e_repoe(store_factory, tmp_path):
+    from config.rate_limit import MemoryBucketStore, SQLiteBucketStore
+
+    if store_factory == "memory":
+        store = MemoryBucketStore()
+    else:
+        store = SQLiteBucketStore(str(tmp_path / "buckets.db"))
+
+    # capacidade 2, repõe 1 ficha/s
+    assert store.take("ip:1", 2, 1.0, now=100.0) == 0
+    assert store.take("ip:1", 2, 1.0, now=100.0) == 0
+    assert store.take("ip:1", 2, 1.0, now=100.0) == pytest.approx(1.0)
+    assert store.take("ip:2", 2, 1.0, now=100.0) == 0  # chave independente
+    assert store.take("ip:1", 2, 1.0, now=101.5) == 0
+
+
+def test_sqlite_store_compartilhado_entre_instancias(tmp_path):
+    from config.rate_limit import SQLiteBucketStore
+
+    path = str(tmp_path / "buckets.db")
+    worker_a, worker_b = SQLiteBucketStore(path), SQLiteBucketStore(path)
+    assert worker_a.take("email:x", 1, 0.1, now=50.0) == 0
+    assert worker_b.take("email:x", 1, 0.1, now=50.0) > 0
+
+
+def test_sqlite_store_travado_falha_aberto(tmp_path, monkeypatch):
+    import sqlite3
+    import config.rate_limit as rate_limit
+
+    monkeypatch.setattr(rate_limit, "LOCK_TIMEOUT_SECONDS", 0.05)
+    path = str(tmp_path / "buckets.db")
+    store = rate_limit.SQLiteBucketStore(path)
+    outro = sqlite3.connect(path, isolation_level=None)
+    outro.execute("BEGIN IMMEDIATE")  # outro worker segura o lock
+    try:
+        assert store.take("ip:1", 1, 0.1, now=10.0) == 0
+        assert not store._connect().in_transaction
+    finally:
+        outro.execute("ROLLBACK")
+        outro.close()
+    assert store.take("ip:1", 1, 0.1, now=10.0) == 0
+    assert store.take("ip:1", 1, 0.1, now=10.0) > 0
+
+
+def test_memory_store_descarta_so_baldes_ociosos():
+    from config.rate_limit import MemoryBucketStore
+
+    store = MemoryBucketStore()
+    for i in range(100):
+        store.take(f"ip:{i}", 2, 1.0, now=float(i))
+    # ocioso = capacidade / taxa = 2 s: sobra só o usado em t = 99
+    store.take("ip:novo", 2, 1.0, now=100.0)
+    assert list(store._buckets) == ["ip:99", "ip:novo"]
+    store.take("ip:99", 2, 1.0, now=100.5)
+    assert list(store._buckets) == ["ip:novo", "ip:99"]
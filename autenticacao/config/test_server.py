@@ -0,0 +1,30 @@
+"""
+Testes do modo de produção (`config.server`): número de workers pela
+cota de CPU do cgroup e o que é refeito depois do fork.
+"""
+from sqlalchemy import create_engine
+
+from config import server
+
+
+def test_modo_producao_workers_e_fork(tmp_path, monkeypatch):
+    cpu_max = tmp_path / "cpu.max"
+    cpu_max.write_text("150000 100000\n")
+    monkeypatch.setattr(server, "CGROUP_V2_CPU_MAX", str(cpu_max))
+    monkeypatch.setattr(server.os, "sched_getaffinity", lambda _pid: {0, 1, 2, 3})
+    # Cota de 1,5 núcleo num host de 4: dois workers
+    assert server.worker_count(0) == 2
+    assert server.worker_count(5) == 5
+    cpu_max.write_text("max 100000\n")
+    assert server.available_cpus() == 4
+
+    diretorio = tmp_path / "prometheus"
+    diretorio.mkdir()
+    (diretorio / "counter_123.db").write_bytes(b"")
+    server.prepare_multiproc_dir(str(diretorio))
+    assert list(diretorio.iterdir()) == []
+
+    herdado = create_engine("sqlite:///:memory:")
+    pool_do_mestre = herdado.pool
+    server.reset_after_fork([herdado])
+    assert herdado.pool is not pool_do_mestre
@@ -12,7 +12,7 @@ from sqlalchemy import create_engine
 from sqlalchemy.orm import sessionmaker
 from sqlalchemy.pool import StaticPool
 
-from config.database import Base, get_db
+from config.database import Base, get_db, get_session_factory
 from main import app
 
 # URL do banco de testes (SQLite em memória)
@@ -56,6 +56,10 @@ def client(db):
             pass
 
     app.dependency_overrides[get_db] = override_get_db
+    app.dependency_overrides[get_session_factory] = lambda: TestingSessionLocal
+    # Baldes do rate limit são globais ao processo; zera entre testes
+    from config.rate_limit import rate_limit_store
+    rate_limit_store.reset()
 
     # Mock para envio de email (evita conexão SMTP real nos testes)
     with patch('auth.view_auth.send_reset_email',
@@ -67,3 +71,12 @@ def client(db):
 
     # Limpa override após uso
     app.dependency_overrides.clear()
+
+
+@pytest.fixture
+def admin_header(monkeypatch):
+    """Cabeçalho dos endpoints administrativos (`/metrics` e afins)."""
+    from config.settings import settings
+
+    monkeypatch.setattr(settings, "ADMIN_API_KEY", "chave-admin-teste")
+    return {"X-Admin-Key": "chave-admin-teste"}
@@ -1,14 +1,28 @@
 import logging
-from fastapi import FastAPI
+from fastapi import Depends, FastAPI, Request, status
 from fastapi.middleware.cors import CORSMiddleware
-from sqlalchemy.exc import OperationalError, SQLAlchemyError
+from fastapi.responses import JSONResponse, Response
+from sqlalchemy.exc import OperationalError
 from sqlalchemy import text
 
 # Import router do pacote auth (imports absolutos necessários para execução
 # quando `main.py` é carregado como módulo top-level por uvicorn)
 from auth.view_auth import router as auth_router
+from config.admin import require_admin
 from config.settings import settings
-from config.database import Base, engine
+from config.database import Base, engine, pool_health_checker
+from config.pool import pool_stats
+from config.metrics import MetricsMiddleware, MetricsSampler, render_metrics
+from config.sql_timing import SqlTimingMiddleware
+from config.threadpool import ThreadLaneMiddleware, thread_lanes
+from config.deadline import DeadlineExceeded, DeadlineMiddleware
+from config.shedding import LoadSheddingMiddleware, load_shedder
+from auth.model_auth import RefreshToken, TokenRevogado
+from config.hashing import HashingQueueFull, hashing_executor
+from config.mail import mail_dispatcher
+from config.startup import (
+    BootTimer, log_table_counts, mark_schema, schema_is_current,
+)
 
 logger = logging.getLogger("uvicorn")
 
@@ -35,6 +49,17 @@ if settings.ENVIRONMENT == "production":
         "https://*.vercel.app",
     ])
 
+# Tempo de banco por requisição (Server-Timing e log)
+app.add_middleware(SqlTimingMiddleware)
+# Contagem e latência por rota para /metrics
+app.add_middleware(MetricsMiddleware)
+# Faixa do threadpool (rápida para FAST_LANE_PATHS)
+app.add_middleware(ThreadLaneMiddleware)
+# Prazo por requisição (max_execution_time no MySQL)
+app.add_middleware(DeadlineMiddleware)
+# Recusa com 503 acima das marcas d'água, antes de qualquer trabalho
+app.add_middleware(LoadSheddingMiddleware)
+
 app.add_middleware(
     CORSMiddleware,
     allow_origins=origins if settings.ENVIRONMENT != "production" else ["*"],
@@ -46,35 +71,182 @@ app.add_middleware(
 app.include_router(auth_router, prefix="/api/auth", tags=["auth"])
 
 
+@app.exception_handler(HashingQueueFull)
+async def hashing_queue_full_handler(_request: Request, _exc: HashingQueueFull):
+    """Fila de hashing cheia: pede para o cliente tentar novamente."""
+    return JSONResponse(
+        status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+        content={"detail": "Serviço sobrecarregado, tente novamente"},
+        headers={"Retry-After": "1"},
+    )
+
+
+@app.exception_handler(DeadlineExceeded)
+async def deadline_exceeded_handler(_request: Request, exc: DeadlineExceeded):
+    """Prazo da requisição esgotado (na fila ou no banco)."""
+    return JSONResponse(
+        status_code=status.HTTP_504_GATEWAY_TIMEOUT,
+        content={"detail": str(exc)},
+    )
+
+
+def ensure_token_geracao(conn):
+    """Adiciona `usuarios.token_geracao` em bancos criados antes da coluna."""
+    existe = conn.execute(
+        text(
+            "SELECT COUNT(*) FROM information_schema.columns "
+            "WHERE table_schema = :db AND table_name = 'usuarios' "
+            "AND column_name = 'token_geracao'"
+        ),
+        {"db": settings.MYSQL_DB},
+    ).scalar()
+    if existe == 0:
+        conn.execute(text(
+            "ALTER TABLE usuarios "
+            "ADD COLUMN token_geracao INT NOT NULL DEFAULT 0"
+        ))
+        conn.commit()
+        logger.info("Coluna usuarios.token_geracao adicionada")
+
+
+# Incrementar quando o startup passar a verificar algo novo no schema
+SCHEMA_VERSION = 1
+
+
+def check_schema(conn):
+    """Cria as tabelas ausentes e aplica as migrações de colunas."""
+    result = conn.execute(
+        text(
+            "SELECT COUNT(*) FROM information_schema.tables "
+            "WHERE table_schema = :db AND table_name = 'usuarios'"
+        ),
+        {"db": settings.MYSQL_DB},
+    ).scalar()
+    if result == 0:
+        Base.metadata.create_all(bind=conn)
+        conn.commit()
+        logger.info("Tabela usuarios criada (ausente)")
+    else:
+        logger.info("Tabela usuarios já existe; pulando create_all")
+        ensure_token_geracao(conn)
+        # Tabelas de tokens surgiram depois de `usuarios`
+        Base.metadata.create_all(bind=conn, tables=[
+            RefreshToken.__table__, TokenRevogado.__table__,
+        ])
+        conn.commit()
+
+
 @app.on_event("startup")
 def startup_event():
-    """Cria apenas se ausente e loga contagem de registros."""
+    """Verifica o schema (uma vez por versão) e inicia o pool de hashing.
+
+    A contagem de usuários segue `STARTUP_ROW_COUNTS` e a duração de
+    cada fase vai para o log e para `/metrics/boot`.
+    """
+    boot = BootTimer("autenticacao")
     try:
         with engine.connect() as conn:
-            result = conn.execute(
-                text(
-                    "SELECT COUNT(*) FROM information_schema.tables "
-                    "WHERE table_schema = :db AND table_name = 'usuarios'"
-                ),
-                {"db": settings.MYSQL_DB},
-            ).scalar()
-            if result == 0:
-                Base.metadata.create_all(bind=conn)
-                logger.info("Tabela usuarios criada (ausente)")
-            else:
-                logger.info("Tabela usuarios já existe; pulando create_all")
-
-            try:
-                count = conn.execute(
-                    text("SELECT COUNT(*) FROM usuarios")
-                ).scalar()
-                logger.info("usuarios possui %d registros", count)
-            except SQLAlchemyError as inner_exc:
-                logger.warning("Falha ao contar usuarios: %s", inner_exc)
+            with boot.phase("schema"):
+                if not schema_is_current(conn, "autenticacao",
+                                         SCHEMA_VERSION):
+                    check_schema(conn)
+                    mark_schema(conn, "autenticacao", SCHEMA_VERSION)
+            with boot.phase("contagens"):
+                log_table_counts(conn, ["usuarios"])
     except OperationalError as exc:
         logger.error("Erro ao verificar/criar tabelas: %s", exc)
 
+    with boot.phase("hashing"):
+        hashing_executor.start()
+    pool_health_checker.start()
+    app.state.boot = boot.report()
+
+
+metrics_sampler = MetricsSampler(lambda: {"sync": engine.pool},
+                                 settings.METRICS_SAMPLE_SECONDS)
+
+
+@app.on_event("startup")
+async def install_thread_lanes():
+    """Troca o limiter padrão do AnyIO pelo instrumentado (por faixa)."""
+    thread_lanes.install()
+
+
+@app.on_event("startup")
+async def start_metrics_sampler():
+    """Amostra event loop, threadpool e pool do banco periodicamente."""
+    await metrics_sampler.start()
+
+
+@app.on_event("startup")
+async def start_mail_dispatcher():
+    """Inicia a tarefa que envia os emails enfileirados."""
+    await mail_dispatcher.start()
+
+
+@app.on_event("shutdown")
+def shutdown_event():
+    """Encerra o pool de hashing e fecha as conexões com o banco."""
+    hashing_executor.shutdown()
+    pool_health_checker.stop()
+    engine.dispose()
+
+
+@app.on_event("shutdown")
+async def stop_metrics_sampler():
+    """Cancela a amostragem periódica de métricas."""
+    await metrics_sampler.stop()
+
+
+@app.on_event("shutdown")
+async def stop_mail_dispatcher():
+    """Envia o que restou na fila e fecha a conexão SMTP."""
+    await mail_dispatcher.stop()
+
 
 @app.get("/health")
 def health():
     return {"status": "healthy"}
+
+
+@app.get("/metrics", include_in_schema=False,
+         dependencies=[Depends(require_admin)])
+def prometheus_metrics():
+    """Métricas no formato texto do Prometheus (todos os workers)."""
+    corpo, content_type = render_metrics()
+    return Response(corpo, media_type=content_type)
+
+
+@app.get("/metrics/threadpool", include_in_schema=False,
+         dependencies=[Depends(require_admin)])
+async def threadpool_metrics():
+    """Threads, fila e espera de cada faixa do threadpool do AnyIO."""
+    return thread_lanes.stats()
+
+
+@app.get("/metrics/shedding", include_in_schema=False,
+         dependencies=[Depends(require_admin)])
+async def shedding_metrics():
+    """Requisições em andamento, fila do threadpool e recusas por motivo."""
+    return load_shedder.stats()
+
+
+@app.get("/metrics/boot", include_in_schema=False,
+         dependencies=[Depends(require_admin)])
+def boot_metrics():
+    """Duração (ms) de cada fase do último startup deste worker."""
+    return getattr(app.state, "boot", {})
+
+
+@app.get("/metrics/pool", include_in_schema=False,
+         dependencies=[Depends(require_admin)])
+def pool_metrics():
+    """Conexões em uso, overflow, espera e timeouts do pool do banco."""
+    return {"sync": pool_stats(engine.pool)}
+
+
+@app.get("/metrics/hashing", include_in_schema=False,
+         dependencies=[Depends(require_admin)])
+def hashing_metrics():
+    """Fila, rejeições e latência do executor de hashing."""
+    return hashing_executor.stats()
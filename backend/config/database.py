@@ -1,10 +1,19 @@
 """
 Configuração do banco de dados usando SQLAlchemy.
+
+Com `DB_ASYNC` a API usa também um engine assíncrono (aiomysql) e
+`AsyncSession`; o engine síncrono continua servindo o startup e as
+tarefas administrativas.
 """
+import ssl
+
 from sqlalchemy import create_engine
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker
 from config.settings import settings
+from config.pool import InstrumentedQueuePool, PoolHealthChecker, pool_options
+from config.sql_timing import instrument_engine
+from config.deadline import bind_deadline, instrument_deadlines
 
 # URL de conexão do banco
 DATABASE_URL = (
@@ -21,22 +30,65 @@ if settings.MYSQL_USE_SSL:
         "ca": settings.MYSQL_SSL_CA
     }
 
-# Engine do SQLAlchemy
+# Engine do SQLAlchemy (tamanho, timeout e pre-ping do pool vêm do .env)
 engine = create_engine(
     DATABASE_URL,
-    pool_pre_ping=True,  # Verifica conexão antes de usar
-    pool_recycle=3600,   # Recicla conexões a cada hora
-    echo=settings.DEBUG,  # Log SQL queries em modo debug
-    connect_args=connect_args
+    poolclass=InstrumentedQueuePool,
+    echo=settings.SQL_ECHO,  # Loga todos os statements (verboso)
+    connect_args=connect_args,
+    **pool_options(),
 )
 
-# SessionLocal para criar sessões do banco
+instrument_engine(engine)
+instrument_deadlines(engine)
+
+# Alternativa ao pre-ping: verificação das conexões ociosas em segundo plano
+pool_health_checker = PoolHealthChecker(
+    engine, settings.DB_HEALTH_CHECK_SECONDS)
+
+# SessionLocal para criar sessões do banco. expire_on_commit=False: como no
+# engine assíncrono, o objeto gravado segue legível após o commit sem um
+# SELECT de refresh (quem precisa de valores do servidor chama refresh)
 # pylint: disable=invalid-name
-SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine,
+                            expire_on_commit=False)
 
 # Base para os models
 Base = declarative_base()
 
+# Engine assíncrono (criado só com DB_ASYNC, para não importar o driver)
+ASYNC_DATABASE_URL = (
+    f"mysql+aiomysql://{settings.MYSQL_USER}:{settings.MYSQL_PASSWORD}"
+    f"@{settings.MYSQL_HOST}:{settings.MYSQL_PORT}/{settings.MYSQL_DB}"
+)
+async_engine = None
+AsyncSessionLocal = None
+
+if settings.DB_ASYNC:
+    # pylint: disable=ungrouped-imports
+    from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+    from config.pool import InstrumentedAsyncQueuePool
+
+    async_connect_args = {}
+    if settings.MYSQL_USE_SSL:
+        # aiomysql espera um SSLContext em vez do dicionário do PyMySQL
+        async_connect_args["ssl"] = ssl.create_default_context(
+            cafile=settings.MYSQL_SSL_CA)
+
+    async_engine = create_async_engine(
+        ASYNC_DATABASE_URL,
+        poolclass=InstrumentedAsyncQueuePool,
+        echo=settings.SQL_ECHO,
+        connect_args=async_connect_args,
+        **pool_options(),
+    )
+    instrument_engine(async_engine.sync_engine)
+    instrument_deadlines(async_engine.sync_engine)
+    # expire_on_commit=False: atributos continuam legíveis após o commit
+    # (um refresh implícito exigiria I/O fora de um await)
+    AsyncSessionLocal = async_sessionmaker(
+        async_engine, autoflush=False, expire_on_commit=False)
+
 
 def get_db():
     """
@@ -45,6 +97,32 @@ def get_db():
     """
     db = SessionLocal()
     try:
+        # Prazo da requisição vira max_execution_time no MySQL
+        bind_deadline(db)
         yield db
     finally:
         db.close()
+
+
+async def get_async_db():
+    """
+    Dependency assíncrona: `db: AsyncSession = Depends(get_async_db)`.
+    """
+    async with AsyncSessionLocal() as db:
+        bind_deadline(db)
+        yield db
+
+
+def get_session_factory():
+    """
+    Fábrica de sessões para respostas em streaming: o corpo de uma
+    `StreamingResponse` é gerado depois que as dependências com yield
+    (como `get_db`) já saíram, então o gerador abre e fecha a própria
+    sessão.
+    """
+    return SessionLocal
+
+
+def get_async_session_factory():
+    """Como `get_session_factory`, para o engine assíncrono."""
+    return AsyncSessionLocal
@@ -0,0 +1,131 @@
+"""
+Prazo por requisição, propagado ao MySQL como `max_execution_time`.
+
+`DeadlineMiddleware` calcula o prazo de cada requisição: o cabeçalho
+`X-Request-Timeout-Ms` do cliente, limitado pelo padrão da rota
+(`REQUEST_DEADLINE_ROUTES`, prefixo=ms) ou pelo global
+(`REQUEST_DEADLINE_MS`); 0 deixa a requisição sem prazo.
+
+`bind_deadline` (chamado por `get_db`) recusa com 504 a requisição cujo
+prazo já venceu esperando uma thread ou uma conexão, e marca a sessão.
+Quando a sessão abre sua transação, o tempo restante vai para a conexão
+como `SET SESSION max_execution_time`: o MySQL interrompe SELECTs que o
+cliente já abandonou em vez de gastar CPU até o fim, e o erro vira
+`DeadlineExceeded` (504).
+"""
+import time
+from contextvars import ContextVar
+
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+
+from config.metrics import DEADLINE_EXCEEDED
+from config.settings import settings
+
+HEADER = b"x-request-timeout-ms"
+# ER_QUERY_TIMEOUT: "maximum statement execution time exceeded"
+MYSQL_QUERY_TIMEOUT = 3024
+
+_deadline: ContextVar[float | None] = ContextVar(
+    "request_deadline", default=None)
+
+
+class DeadlineExceeded(Exception):
+    """O prazo da requisição venceu antes de a resposta ficar pronta."""
+
+
+def parse_routes(valor: str) -> list[tuple[str, int]]:
+    """`"/api/episodios=10000,..."` -> [(prefixo, ms)], o mais longo antes."""
+    rotas = []
+    for item in valor.split(","):
+        if "=" in item:
+            prefixo, ms = item.split("=", 1)
+            rotas.append((prefixo.strip(), int(ms)))
+    return sorted(rotas, key=lambda rota: len(rota[0]), reverse=True)
+
+
+ROUTE_DEADLINES = parse_routes(settings.REQUEST_DEADLINE_ROUTES)
+
+
+def deadline_ms(path: str, header: str | None) -> int:
+    """Prazo (ms) da requisição; 0 quando não há prazo."""
+    padrao = next((ms for prefixo, ms in ROUTE_DEADLINES
+                   if path.startswith(prefixo)),
+                  settings.REQUEST_DEADLINE_MS)
+    try:
+        pedido = int(header) if header else 0
+    except ValueError:
+        pedido = 0
+    if pedido > 0 and padrao > 0:
+        # O cliente pode encurtar o prazo da rota, não estendê-lo
+        return min(pedido, padrao)
+    return max(pedido, padrao, 0)
+
+
+def remaining_ms() -> int | None:
+    """Milissegundos até o prazo corrente (None sem prazo)."""
+    prazo = _deadline.get()
+    if prazo is None:
+        return None
+    return int((prazo - time.monotonic()) * 1000)
+
+
+def bind_deadline(session) -> None:
+    """Associa o prazo corrente à sessão; levanta se ele já venceu."""
+    restante = remaining_ms()
+    if restante is None:
+        return
+    if restante <= 0:
+        DEADLINE_EXCEEDED.labels("queue").inc()
+        raise DeadlineExceeded("Prazo da requisição esgotado")
+    session.info["deadline"] = _deadline.get()
+
+
+@event.listens_for(Session, "after_begin")
+def _apply_max_execution_time(session, _transaction, connection):
+    if connection.dialect.name != "mysql":
+        return
+    prazo = session.info.get("deadline")
+    limite = (max(int((prazo - time.monotonic()) * 1000), 1)
+              if prazo is not None else 0)
+    # A variável fica na conexão do pool: só reenvia quando muda, e uma
+    # sessão sem prazo zera o que a requisição anterior deixou
+    if connection.info.get("max_execution_time", 0) != limite:
+        connection.exec_driver_sql(
+            f"SET SESSION max_execution_time = {limite}")
+        connection.info["max_execution_time"] = limite
+
+
+def _translate_timeout(context):
+    erro = context.original_exception
+    if getattr(erro, "args", None) and erro.args[0] == MYSQL_QUERY_TIMEOUT:
+        DEADLINE_EXCEEDED.labels("database").inc()
+        raise DeadlineExceeded("Prazo da requisição esgotado no banco") \
+            from erro
+
+
+def instrument_deadlines(engine) -> None:
+    """Converte o timeout do MySQL em `DeadlineExceeded` (idempotente)."""
+    if not event.contains(engine, "handle_error", _translate_timeout):
+        event.listen(engine, "handle_error", _translate_timeout)
+
+
+class DeadlineMiddleware:
+    """Fixa o prazo da requisição na ContextVar (ASGI puro)."""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        header = next((valor.decode() for nome, valor in scope["headers"]
+                       if nome == HEADER), None)
+        prazo = deadline_ms(scope["path"], header)
+        token = _deadline.set(time.monotonic() + prazo / 1000
+                              if prazo > 0 else None)
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            _deadline.reset(token)
@@ -0,0 +1,175 @@
+"""
+Executor dedicado para hashing de senhas (Argon2).
+
+O Argon2 é intencionalmente caro em CPU; rodá-lo dentro dos handlers
+prende uma thread do AnyIO durante todo o hash. Aqui o trabalho vai para
+um pool de processos com fila limitada: quando a fila enche, a chamada
+falha rápido com `HashingQueueFull` (respondida como 503) em vez de
+enfileirar indefinidamente e atrasar os demais endpoints.
+
+O passlib e o pool de processos só são importados no primeiro uso, para
+que workers que nunca calculam hash não paguem esse custo no boot.
+"""
+import asyncio
+import math
+import threading
+import time
+
+from starlette.concurrency import run_in_threadpool
+
+from config.metrics import HASH_DURATION, HASH_REJECTED
+from config.settings import settings
+
+
+def build_pwd_context():
+    """CryptContext Argon2 com os custos configurados em `settings`."""
+    # pylint: disable=import-outside-toplevel
+    from passlib.context import CryptContext
+
+    custos = {
+        "argon2__rounds": settings.ARGON2_TIME_COST,
+        "argon2__memory_cost": settings.ARGON2_MEMORY_COST,
+        "argon2__parallelism": settings.ARGON2_PARALLELISM,
+    }
+    return CryptContext(
+        schemes=["argon2"],
+        deprecated="auto",
+        **{chave: valor for chave, valor in custos.items() if valor},
+    )
+
+
+def _apply_all(func, items: list) -> list:
+    """Aplica `func` a um bloco de itens dentro de um worker do pool."""
+    return [func(item) for item in items]
+
+
+class LazyCryptContext:
+    """Proxy que cria o CryptContext (e importa o passlib) no primeiro uso."""
+
+    def __init__(self):
+        self._context = None
+
+    def __getattr__(self, nome):
+        if self._context is None:
+            self._context = build_pwd_context()
+        return getattr(self._context, nome)
+
+
+class HashingQueueFull(Exception):
+    """Fila do executor de hashing está cheia."""
+
+
+class HashingExecutor:
+    """Pool de processos para hashing com fila limitada e métricas."""
+
+    def __init__(self, workers: int, queue_max: int):
+        self.workers = workers
+        self.queue_max = queue_max
+        self._pool = None
+        self._started = False
+        self._lock = threading.Lock()
+        self._pending = 0
+        self._completed = 0
+        self._rejected = 0
+        self._latency_total = 0.0
+        self._latency_max = 0.0
+
+    def start(self) -> None:
+        """
+        Habilita o pool (workers=0 mantém o hashing no threadpool); os
+        processos só são criados no primeiro hash.
+        """
+        self._started = self.workers > 0
+
+    def _get_pool(self):
+        if not self._started:
+            return None
+        with self._lock:
+            if self._pool is None:
+                # pylint: disable=import-outside-toplevel
+                import multiprocessing
+                from concurrent.futures import ProcessPoolExecutor
+
+                # `spawn` evita herdar locks/threads do processo do servidor
+                self._pool = ProcessPoolExecutor(
+                    max_workers=self.workers,
+                    mp_context=multiprocessing.get_context("spawn"),
+                )
+            return self._pool
+
+    def shutdown(self) -> None:
+        self._started = False
+        if self._pool is not None:
+            self._pool.shutdown(wait=True, cancel_futures=True)
+            self._pool = None
+
+    def _reservar(self, vagas: int) -> None:
+        """Ocupa `vagas` na fila de uma vez, ou recusa sem ocupar nenhuma."""
+        with self._lock:
+            if self._pending + vagas > self.queue_max:
+                self._rejected += 1
+                HASH_REJECTED.inc()
+                raise HashingQueueFull()
+            self._pending += vagas
+
+    async def run(self, func, *args):
+        """Executa `func(*args)` no pool e aguarda o resultado."""
+        self._reservar(1)
+        return await self._executar(func, *args)
+
+    async def _executar(self, func, *args):
+        """Roda uma tarefa cuja vaga na fila já foi reservada."""
+        inicio = time.perf_counter()
+        try:
+            pool = self._get_pool()
+            if pool is None:
+                return await run_in_threadpool(func, *args)
+            loop = asyncio.get_running_loop()
+            return await loop.run_in_executor(pool, func, *args)
+        finally:
+            duracao = time.perf_counter() - inicio
+            HASH_DURATION.observe(duracao)
+            with self._lock:
+                self._pending -= 1
+                self._completed += 1
+                self._latency_total += duracao
+                self._latency_max = max(self._latency_max, duracao)
+
+    async def map(self, func, items: list) -> list:
+        """
+        Aplica `func` a cada item, em paralelo entre os workers.
+
+        O lote é dividido em um bloco por worker, então cada processo
+        recebe uma única tarefa (e ocupa uma vaga da fila) por chamada.
+        As vagas de todos os blocos são reservadas antes de qualquer envio:
+        com a fila cheia, nada é calculado e descartado.
+        """
+        if not items:
+            return []
+        tamanho = math.ceil(len(items) / max(self.workers, 1))
+        blocos = [items[i:i + tamanho] for i in range(0, len(items), tamanho)]
+        self._reservar(len(blocos))
+        resultados = await asyncio.gather(
+            *(self._executar(_apply_all, func, bloco) for bloco in blocos))
+        return [item for bloco in resultados for item in bloco]
+
+    def stats(self) -> dict:
+        with self._lock:
+            media = (self._latency_total / self._completed
+                     if self._completed else 0.0)
+            return {
+                "workers": self.workers,
+                "queue_max": self.queue_max,
+                "pending": self._pending,
+                "queue_depth": max(0, self._pending - max(self.workers, 1)),
+                "completed": self._completed,
+                "rejected": self._rejected,
+                "latency_avg_ms": round(media * 1000, 3),
+                "latency_max_ms": round(self._latency_max * 1000, 3),
+            }
+
+
+hashing_executor = HashingExecutor(
+    workers=settings.HASH_POOL_WORKERS,
+    queue_max=settings.HASH_QUEUE_MAX,
+)
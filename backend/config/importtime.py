@@ -0,0 +1,112 @@
+"""
+Relatório de tempo de import e memória de um worker.
+
+Importa o módulo da aplicação (`main` por padrão) em subprocessos novos
+com `python -X importtime`, repete a medição e usa a mediana de cada
+valor, para que relatórios de commits diferentes sejam comparáveis:
+
+    python -m config.importtime
+    python -m config.importtime --runs 7 --top 15 --json > importtime.json
+
+Mostra o tempo total de import, o RSS máximo do processo após o import e
+os pacotes e módulos mais caros.
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+from collections import defaultdict
+
+# Executado no subprocesso: importa o módulo e informa o RSS máximo (KiB).
+# Um `import` explícito (e não importlib) para o módulo aparecer no relatório.
+SCRIPT = (
+    "import resource; import {module}; "
+    "print(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss)"
+)
+
+
+def parse_importtime(stderr: str) -> dict[str, tuple[int, int]]:
+    """Converte a saída do `-X importtime` em `módulo -> (self, cumulativo)`."""
+    modulos = {}
+    for linha in stderr.splitlines():
+        if not linha.startswith("import time:") or "|" not in linha:
+            continue
+        proprio, cumulativo, nome = linha[len("import time:"):].split("|")
+        if not proprio.strip().isdigit():
+            continue  # cabeçalho
+        modulos[nome.strip()] = (int(proprio), int(cumulativo))
+    return modulos
+
+
+def measure(module: str) -> tuple[dict[str, tuple[int, int]], int]:
+    """Uma medição em processo limpo: tempos por módulo (us) e RSS (KiB)."""
+    resultado = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c",
+         SCRIPT.format(module=module)],
+        capture_output=True, text=True, check=True, env=os.environ.copy(),
+    )
+    return (parse_importtime(resultado.stderr),
+            int(resultado.stdout.strip().splitlines()[-1]))
+
+
+def build_report(module: str, runs: int, top: int) -> dict:
+    medicoes = [measure(module) for _ in range(runs)]
+    tempos: dict[str, list] = defaultdict(list)
+    for modulos, _ in medicoes:
+        for nome, valores in modulos.items():
+            tempos[nome].append(valores)
+
+    proprio = {nome: statistics.median(v[0] for v in valores)
+               for nome, valores in tempos.items()}
+    cumulativo = {nome: statistics.median(v[1] for v in valores)
+                  for nome, valores in tempos.items()}
+    pacotes: dict[str, float] = defaultdict(float)
+    for nome, micros in proprio.items():
+        pacotes[nome.split(".")[0]] += micros
+
+    def maiores(valores: dict) -> list:
+        ordenados = sorted(valores.items(), key=lambda item: -item[1])
+        return [[nome, round(micros / 1000, 1)]
+                for nome, micros in ordenados[:top]]
+
+    return {
+        "module": module,
+        "runs": runs,
+        "import_ms": round(cumulativo.get(module, 0) / 1000, 1),
+        "total_ms": round(sum(proprio.values()) / 1000, 1),
+        "max_rss_mib": round(
+            statistics.median(rss for _, rss in medicoes) / 1024, 1),
+        "top_packages_ms": maiores(pacotes),
+        "top_modules_cumulative_ms": maiores(cumulativo),
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[1])
+    parser.add_argument("--module", default="main")
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--top", type=int, default=20)
+    parser.add_argument("--json", action="store_true",
+                        help="imprime o relatório em JSON")
+    args = parser.parse_args(argv)
+
+    relatorio = build_report(args.module, args.runs, args.top)
+    if args.json:
+        print(json.dumps(relatorio, indent=2))
+        return
+
+    print(f"{relatorio['module']}: import {relatorio['import_ms']} ms "
+          f"(total {relatorio['total_ms']} ms), RSS máximo "
+          f"{relatorio['max_rss_mib']} MiB — mediana de {args.runs} execuções")
+    print("\nPacotes (tempo próprio, ms):")
+    for nome, ms in relatorio["top_packages_ms"]:
+        print(f"  {ms:>8}  {nome}")
+    print("\nMódulos (tempo cumulativo, ms):")
+    for nome, ms in relatorio["top_modules_cumulative_ms"]:
+        print(f"  {ms:>8}  {nome}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,184 @@
+"""
+Métricas Prometheus do serviço (`GET /metrics`, formato texto).
+
+- `MetricsMiddleware` (ASGI puro) conta requisições por rota e status,
+  mede a latência num histograma e mantém o gauge de requisições em
+  andamento. A rota é o template (`/api/episodios/{episodio_id}`), para
+  a cardinalidade não crescer com ids.
+- `MetricsSampler` roda no event loop de cada worker e, a cada
+  `METRICS_SAMPLE_SECONDS`, registra o atraso do loop, a ocupação e a
+  fila de cada faixa do threadpool do AnyIO e o estado dos pools do
+  banco (a espera por thread vem de `config.threadpool`).
+- O executor de hashing observa a duração de cada hash Argon2.
+
+Com vários workers, defina `PROMETHEUS_MULTIPROC_DIR` (diretório vazio a
+cada deploy): cada processo grava seus valores ali e `/metrics` agrega
+todos, independentemente de qual worker atendeu o scrape.
+"""
+import asyncio
+import os
+import time
+
+from prometheus_client import (
+    CONTENT_TYPE_LATEST, REGISTRY, CollectorRegistry, Counter, Gauge,
+    Histogram, generate_latest,
+)
+from prometheus_client import multiprocess
+
+from config.pool import pool_stats
+from config.settings import settings
+
+REQUESTS = Counter(
+    "http_requests_total", "Requisições HTTP atendidas",
+    ["method", "route", "status"])
+LATENCY = Histogram(
+    "http_request_duration_seconds", "Latência das requisições HTTP",
+    ["method", "route"],
+    buckets=(0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10))
+IN_FLIGHT = Gauge(
+    "http_requests_in_flight", "Requisições em andamento",
+    multiprocess_mode="livesum")
+
+THREADPOOL_TOKENS = Gauge(
+    "threadpool_tokens", "Tamanho do limiter do AnyIO", ["lane"],
+    multiprocess_mode="livesum")
+THREADPOOL_IN_USE = Gauge(
+    "threadpool_in_use", "Threads do AnyIO ocupadas", ["lane"],
+    multiprocess_mode="livesum")
+THREADPOOL_WAITING = Gauge(
+    "threadpool_waiting", "Tarefas esperando uma thread", ["lane"],
+    multiprocess_mode="livesum")
+THREADPOOL_WAIT = Histogram(
+    "threadpool_wait_seconds", "Espera por uma thread do AnyIO", ["lane"],
+    buckets=(0.0005, 0.001, 0.005, 0.01, 0.05, 0.1, 0.5, 1, 5))
+LOOP_LAG = Gauge(
+    "event_loop_lag_seconds", "Atraso do event loop na última amostra",
+    multiprocess_mode="livemax")
+
+POOL_SIZE = Gauge(
+    "db_pool_size", "Tamanho configurado do pool", ["pool"],
+    multiprocess_mode="livesum")
+POOL_CHECKED_OUT = Gauge(
+    "db_pool_checked_out", "Conexões em uso", ["pool"],
+    multiprocess_mode="livesum")
+POOL_OVERFLOW = Gauge(
+    "db_pool_overflow", "Conexões além de pool_size", ["pool"],
+    multiprocess_mode="livesum")
+POOL_CHECKOUTS = Counter(
+    "db_pool_checkouts_total", "Checkouts do pool", ["pool"])
+POOL_TIMEOUTS = Counter(
+    "db_pool_timeouts_total", "Checkouts que estouraram o timeout", ["pool"])
+
+SHED_REJECTED = Counter(
+    "http_requests_shed_total", "Requisições recusadas por sobrecarga",
+    ["reason"])
+DEADLINE_EXCEEDED = Counter(
+    "http_deadline_exceeded_total", "Requisições que estouraram o prazo",
+    ["stage"])
+
+HASH_DURATION = Histogram(
+    "password_hash_duration_seconds", "Duração de cada hash Argon2",
+    buckets=(0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5))
+HASH_REJECTED = Counter(
+    "password_hash_rejected_total", "Hashes recusados por fila cheia")
+
+
+def render_metrics() -> tuple[bytes, str]:
+    """Corpo e content-type do scrape (agregado entre processos)."""
+    if os.environ.get("PROMETHEUS_MULTIPROC_DIR"):
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+    else:
+        registry = REGISTRY
+    return generate_latest(registry), CONTENT_TYPE_LATEST
+
+
+class MetricsMiddleware:
+    """Conta e mede as requisições HTTP com custo de poucos microssegundos."""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        inicio = time.perf_counter()
+        status_code = 500
+
+        async def send_with_status(message):
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+            await send(message)
+
+        IN_FLIGHT.inc()
+        try:
+            await self.app(scope, receive, send_with_status)
+        finally:
+            IN_FLIGHT.dec()
+            rota = scope.get("route")
+            rota = getattr(rota, "path", None) or "unmatched"
+            metodo = scope["method"]
+            LATENCY.labels(metodo, rota).observe(time.perf_counter() - inicio)
+            REQUESTS.labels(metodo, rota, str(status_code)).inc()
+
+
+class MetricsSampler:
+    """Tarefa periódica que amostra loop, threadpool e pools do banco."""
+
+    def __init__(self, pools, interval: float):
+        # `pools` devolve {nome: pool}; é chamado a cada amostra porque
+        # `engine.dispose()` troca o objeto do pool
+        self.pools = pools
+        self.interval = interval
+        self._task = None
+        self._anteriores: dict[str, tuple[int, int]] = {}
+
+    def sample(self, lag: float = 0.0) -> None:
+        # pylint: disable=import-outside-toplevel
+        from anyio.to_thread import current_default_thread_limiter
+
+        LOOP_LAG.set(lag)
+        limiter = current_default_thread_limiter()
+        # Com `config.threadpool` instalado, uma entrada por faixa
+        for nome, faixa in getattr(limiter, "lanes",
+                                   {"default": limiter}).items():
+            THREADPOOL_TOKENS.labels(nome).set(faixa.total_tokens)
+            THREADPOOL_IN_USE.labels(nome).set(faixa.borrowed_tokens)
+            THREADPOOL_WAITING.labels(nome).set(
+                faixa.statistics().tasks_waiting)
+
+        for nome, pool in self.pools().items():
+            stats = pool_stats(pool)
+            POOL_SIZE.labels(nome).set(stats["size"] or 0)
+            POOL_CHECKED_OUT.labels(nome).set(stats["checked_out"] or 0)
+            POOL_OVERFLOW.labels(nome).set(max(stats["overflow"] or 0, 0))
+            # Os contadores do pool são acumulados; o Prometheus recebe
+            # só o incremento desde a última amostra
+            atuais = (stats.get("checkouts", 0), stats.get("timeouts", 0))
+            checkouts, timeouts = self._anteriores.get(nome, (0, 0))
+            POOL_CHECKOUTS.labels(nome).inc(max(atuais[0] - checkouts, 0))
+            POOL_TIMEOUTS.labels(nome).inc(max(atuais[1] - timeouts, 0))
+            self._anteriores[nome] = atuais
+
+    async def _run(self) -> None:
+        while True:
+            inicio = time.perf_counter()
+            await asyncio.sleep(self.interval)
+            # O quanto o sleep passou do combinado é o atraso do loop
+            self.sample(max(time.perf_counter() - inicio - self.interval, 0))
+
+    async def start(self) -> None:
+        if self.interval > 0 and self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
@@ -0,0 +1,212 @@
+"""
+Pool de conexões instrumentado e verificação de saúde em segundo plano.
+
+- `InstrumentedQueuePool` (e a variante assíncrona) mede quanto cada
+  checkout esperou por uma conexão e conta os timeouts, para que a
+  exaustão do pool apareça em `/metrics/pool` em vez de virar latência
+  sem explicação.
+- `PoolHealthChecker` é a alternativa ao `pool_pre_ping`: em vez de um
+  `SELECT 1` a cada checkout, uma thread testa as conexões ociosas a cada
+  `DB_HEALTH_CHECK_SECONDS`, uma por vez, e invalida as que não
+  respondem; esses checkouts não entram nas métricas de espera. Com
+  `DB_POOL_RECYCLE` abaixo do `wait_timeout` do MySQL, cobre as quedas
+  por inatividade sem o custo de um round trip por requisição.
+"""
+import logging
+import threading
+import time
+from contextlib import contextmanager, nullcontext
+
+from sqlalchemy import exc
+from sqlalchemy.pool import AsyncAdaptedQueuePool, QueuePool
+
+from config.settings import settings
+
+logger = logging.getLogger("uvicorn")
+
+
+def pool_options() -> dict:
+    """Parâmetros de pool para `create_engine` conforme `settings`."""
+    return {
+        "pool_size": settings.DB_POOL_SIZE,
+        "max_overflow": settings.DB_MAX_OVERFLOW,
+        "pool_timeout": settings.DB_POOL_TIMEOUT,
+        "pool_recycle": settings.DB_POOL_RECYCLE,
+        "pool_pre_ping": settings.DB_POOL_PRE_PING,
+    }
+
+
+class PoolStats:
+    """Contadores de checkout compartilhados entre recriações do pool."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.checkouts = 0
+        self.timeouts = 0
+        self.waiting = 0
+        self.wait_total = 0.0
+        self.wait_max = 0.0
+        self.health_checks = 0
+        self.health_failures = 0
+        self._local = threading.local()
+
+    @contextmanager
+    def unrecorded(self):
+        """Checkouts desta thread no bloco não entram nos contadores."""
+        self._local.ignorar = True
+        try:
+            yield
+        finally:
+            self._local.ignorar = False
+
+    def ignored(self) -> bool:
+        return getattr(self._local, "ignorar", False)
+
+    def record(self, espera: float, timeout: bool = False) -> None:
+        with self._lock:
+            if timeout:
+                self.timeouts += 1
+            else:
+                self.checkouts += 1
+            self.wait_total += espera
+            self.wait_max = max(self.wait_max, espera)
+
+    def record_health(self, verificadas: int, falhas: int) -> None:
+        with self._lock:
+            self.health_checks += verificadas
+            self.health_failures += falhas
+
+
+class _InstrumentedMixin:
+    """Mede a espera em `_do_get`, por onde passa todo checkout do pool."""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.stats = PoolStats()
+
+    def _do_get(self):
+        if self.stats.ignored():
+            return super()._do_get()
+        inicio = time.perf_counter()
+        with self.stats._lock:  # pylint: disable=protected-access
+            self.stats.waiting += 1
+        try:
+            conexao = super()._do_get()
+        except exc.TimeoutError:
+            self.stats.record(time.perf_counter() - inicio, timeout=True)
+            raise
+        finally:
+            with self.stats._lock:  # pylint: disable=protected-access
+                self.stats.waiting -= 1
+        self.stats.record(time.perf_counter() - inicio)
+        return conexao
+
+    def recreate(self):
+        # `engine.dispose()` recria o pool; os contadores continuam
+        novo = super().recreate()
+        novo.stats = self.stats
+        return novo
+
+
+class InstrumentedQueuePool(_InstrumentedMixin, QueuePool):
+    """QueuePool com métricas de espera e timeout."""
+
+
+class InstrumentedAsyncQueuePool(_InstrumentedMixin, AsyncAdaptedQueuePool):
+    """Pool do engine assíncrono com as mesmas métricas."""
+
+
+def pool_stats(pool) -> dict:
+    """Estado atual e contadores acumulados de um pool."""
+    stats = getattr(pool, "stats", None)
+    resumo = {
+        "pool_class": type(pool).__name__,
+        "size": pool.size() if hasattr(pool, "size") else None,
+        "checked_out": (pool.checkedout()
+                        if hasattr(pool, "checkedout") else None),
+        "checked_in": pool.checkedin() if hasattr(pool, "checkedin") else None,
+        "overflow": pool.overflow() if hasattr(pool, "overflow") else None,
+        "timeout_seconds": getattr(pool, "_timeout", None),
+        "pre_ping": getattr(pool, "_pre_ping", None),
+    }
+    if stats is None:
+        return resumo
+    with stats._lock:  # pylint: disable=protected-access
+        total = stats.checkouts + stats.timeouts
+        resumo.update({
+            "checkouts": stats.checkouts,
+            "timeouts": stats.timeouts,
+            "waiting": stats.waiting,
+            "wait_avg_ms": round(
+                stats.wait_total / total * 1000 if total else 0.0, 3),
+            "wait_max_ms": round(stats.wait_max * 1000, 3),
+            "health_checks": stats.health_checks,
+            "health_failures": stats.health_failures,
+        })
+    return resumo
+
+
+class PoolHealthChecker:
+    """Thread que testa periodicamente as conexões ociosas do pool."""
+
+    def __init__(self, engine, interval: float):
+        self.engine = engine
+        self.interval = interval
+        self._stop = threading.Event()
+        self._thread = None
+
+    def check_idle(self) -> tuple[int, int]:
+        """
+        Testa as conexões ociosas com um ping do driver; devolve
+        (verificadas, falhas). Conexões em uso não são tocadas.
+
+        Retira uma conexão por vez e a devolve logo após o ping, então no
+        máximo uma fica fora do pool; a fila é FIFO, e cada devolução vai
+        para o fim, atrás das que ainda não foram testadas. Para assim que
+        não houver mais ociosas, para não abrir conexões nem esperar.
+        """
+        pool = self.engine.pool
+        tem_contagem = hasattr(pool, "checkedin")
+        ociosas = pool.checkedin() if tem_contagem else 1
+        stats = getattr(pool, "stats", None)
+        verificadas = falhas = 0
+        with stats.unrecorded() if stats is not None else nullcontext():
+            for _ in range(ociosas):
+                if tem_contagem and pool.checkedin() == 0:
+                    break  # as restantes foram retiradas por requisições
+                try:
+                    conexao = pool.connect()
+                except exc.SQLAlchemyError as erro:
+                    falhas += 1
+                    logger.warning("Falha na verificação do pool: %s", erro)
+                    break
+                verificadas += 1
+                try:
+                    self.engine.dialect.do_ping(conexao.dbapi_connection)
+                except Exception as erro:  # pylint: disable=broad-except
+                    falhas += 1
+                    logger.warning("Conexão ociosa inválida: %s", erro)
+                    conexao.invalidate(erro)
+                finally:
+                    conexao.close()
+        if stats is not None:
+            stats.record_health(verificadas, falhas)
+        return verificadas, falhas
+
+    def _run(self) -> None:
+        while not self._stop.wait(self.interval):
+            self.check_idle()
+
+    def start(self) -> None:
+        if self.interval <= 0 or self._thread is not None:
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(
+            target=self._run, name="pool-health", daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout=self.interval)
+            self._thread = None
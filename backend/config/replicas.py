@@ -0,0 +1,282 @@
+"""
+Roteamento de leituras para réplicas do banco.
+
+Com `DB_REPLICA_URLS` (URLs do SQLAlchemy separadas por vírgula) as rotas
+GET de episódios, gatilhos e medicações leem de uma réplica, escolhida em
+round-robin. Uma réplica que falha ao conectar fica fora da rotação por
+`DB_REPLICA_RETRY_SECONDS`; sem nenhuma disponível a leitura volta ao
+primário.
+
+Leia-o-que-escreveu: depois de um commit com escrita, as leituras do
+mesmo usuário vão ao primário por `DB_REPLICA_STICKY_SECONDS`, cobrindo o
+atraso de replicação. Cada worker guarda as escritas que atendeu e, para
+que a próxima leitura caia em outro worker sem perder a janela,
+`ReadYourWritesMiddleware` devolve na resposta um marcador assinado
+(`usuario.até.assinatura`) no cookie `ultima_escrita` e no cabeçalho
+`X-Last-Write`. O cliente o reenvia (o navegador, pelo cookie; outros
+clientes, no mesmo cabeçalho) e qualquer worker respeita a janela.
+"""
+import hashlib
+import hmac
+import itertools
+import logging
+import threading
+import time
+from contextvars import ContextVar
+
+from sqlalchemy import create_engine, event
+from sqlalchemy.exc import SQLAlchemyError
+from sqlalchemy.orm import Session, sessionmaker
+
+from config.deadline import instrument_deadlines
+from config.pool import InstrumentedQueuePool, pool_options, pool_stats
+from config.settings import settings
+
+logger = logging.getLogger("uvicorn")
+
+# Acima disso o registro de escritas descarta as janelas já vencidas
+STICKY_PRUNE_SIZE = 10000
+
+WRITE_MARKER_COOKIE = "ultima_escrita"
+WRITE_MARKER_HEADER = b"x-last-write"
+
+
+class WriteMarker:
+    """Janela de escrita recebida na requisição e a aberta por ela."""
+
+    __slots__ = ("recebido", "novo")
+
+    def __init__(self, recebido: tuple[int, float] | None):
+        self.recebido = recebido
+        self.novo: tuple[int, float] | None = None
+
+
+_request_marker: ContextVar[WriteMarker | None] = ContextVar(
+    "write_marker", default=None)
+
+
+def _assinatura(corpo: str) -> str:
+    return hmac.new(settings.SECRET_KEY.encode(), corpo.encode(),
+                    hashlib.sha256).hexdigest()[:32]
+
+
+def sign_write_marker(usuario_id: int, ate: float) -> str:
+    """Marcador `usuario.até.assinatura` (até em segundos desde a época)."""
+    corpo = f"{usuario_id}.{int(ate)}"
+    return f"{corpo}.{_assinatura(corpo)}"
+
+
+def parse_write_marker(valor: str) -> tuple[int, float] | None:
+    """`(usuario_id, até)` de um marcador íntegro, ou None."""
+    try:
+        usuario_id, ate, assinatura = valor.strip().split(".")
+        corpo = f"{int(usuario_id)}.{int(ate)}"
+    except ValueError:
+        return None
+    if not hmac.compare_digest(assinatura, _assinatura(corpo)):
+        return None
+    return int(usuario_id), float(ate)
+
+
+def _create_replica_engine(url: str):
+    connect_args = {}
+    if url.startswith("mysql") and settings.MYSQL_USE_SSL:
+        connect_args["ssl"] = {"ca": settings.MYSQL_SSL_CA}
+    engine = create_engine(url, poolclass=InstrumentedQueuePool,
+                           connect_args=connect_args, **pool_options())
+    instrument_deadlines(engine)
+    return engine
+
+
+class Replica:
+    """Engine de uma réplica e até quando ela fica fora da rotação."""
+
+    def __init__(self, engine):
+        self.engine = engine
+        self.session_factory = sessionmaker(
+            autocommit=False, autoflush=False, bind=engine)
+        self.down_until = 0.0
+        self.reads = 0
+        self.failures = 0
+
+    def available(self, agora: float) -> bool:
+        return agora >= self.down_until
+
+
+class ReplicaRouter:
+    """Escolhe a sessão de leitura: réplica saudável ou primário."""
+
+    def __init__(self, engines, sticky_seconds: float, retry_seconds: float):
+        self.replicas = [Replica(engine) for engine in engines]
+        self.sticky_seconds = sticky_seconds
+        self.retry_seconds = retry_seconds
+        self._lock = threading.Lock()
+        self._turno = itertools.count()
+        self._escritas: dict[int, float] = {}
+        self._primary_reads = 0
+        self._sticky_reads = 0
+
+    def mark_write(self, usuario_id: int) -> None:
+        """Manda as próximas leituras do usuário ao primário por um tempo."""
+        if not self.replicas or self.sticky_seconds <= 0:
+            return
+        agora = time.monotonic()
+        with self._lock:
+            if len(self._escritas) >= STICKY_PRUNE_SIZE:
+                self._escritas = {uid: ate for uid, ate
+                                  in self._escritas.items() if ate > agora}
+            self._escritas[usuario_id] = agora + self.sticky_seconds
+        marca = _request_marker.get()
+        if marca is not None:
+            # Relógio de parede: o marcador é lido por outros processos
+            marca.novo = (usuario_id, time.time() + self.sticky_seconds)
+
+    def is_sticky(self, usuario_id: int) -> bool:
+        """Janela de escrita aberta neste worker ou trazida pelo marcador."""
+        with self._lock:
+            ate = self._escritas.get(usuario_id)
+        if ate is not None and ate > time.monotonic():
+            return True
+        marca = _request_marker.get()
+        return (marca is not None and marca.recebido is not None
+                and marca.recebido[0] == usuario_id
+                and marca.recebido[1] > time.time())
+
+    def read_session(self, usuario_id: int | None = None) -> Session | None:
+        """
+        Sessão numa réplica já conectada, ou None para ler do primário
+        (sem réplicas, dentro da janela de escrita ou todas indisponíveis).
+        """
+        if not self.replicas:
+            return None
+        if usuario_id is not None and self.is_sticky(usuario_id):
+            with self._lock:
+                self._sticky_reads += 1
+            return None
+
+        inicio = next(self._turno)
+        agora = time.monotonic()
+        for deslocamento in range(len(self.replicas)):
+            replica = self.replicas[(inicio + deslocamento)
+                                    % len(self.replicas)]
+            if not replica.available(agora):
+                continue
+            session = replica.session_factory()
+            try:
+                # Faz o checkout já aqui para detectar réplica fora do ar
+                session.connection()
+            except SQLAlchemyError as exc:
+                session.close()
+                with self._lock:
+                    replica.failures += 1
+                    replica.down_until = agora + self.retry_seconds
+                logger.warning("Réplica %s indisponível: %s",
+                               replica.engine.url.host or replica.engine.url,
+                               exc)
+                continue
+            with self._lock:
+                replica.reads += 1
+            return session
+
+        with self._lock:
+            self._primary_reads += 1
+        return None
+
+    def stats(self) -> dict:
+        agora = time.monotonic()
+        with self._lock:
+            return {
+                "primary_fallback_reads": self._primary_reads,
+                "sticky_reads": self._sticky_reads,
+                "sticky_users": sum(1 for ate in self._escritas.values()
+                                    if ate > agora),
+                "replicas": [
+                    {
+                        "url": replica.engine.url.render_as_string(
+                            hide_password=True),
+                        "available": replica.available(agora),
+                        "reads": replica.reads,
+                        "failures": replica.failures,
+                        "pool": pool_stats(replica.engine.pool),
+                    }
+                    for replica in self.replicas
+                ],
+            }
+
+
+replica_router = ReplicaRouter(
+    [_create_replica_engine(url.strip())
+     for url in settings.DB_REPLICA_URLS.split(",") if url.strip()],
+    sticky_seconds=settings.DB_REPLICA_STICKY_SECONDS,
+    retry_seconds=settings.DB_REPLICA_RETRY_SECONDS,
+)
+
+
+# `get_current_user` grava `usuario_id` em `session.info`; um commit que
+# escreveu algo abre a janela de leitura no primário para esse usuário.
+@event.listens_for(Session, "after_flush")
+def _flag_write(session, _flush_context):
+    session.info["escreveu"] = True
+
+
+@event.listens_for(Session, "do_orm_execute")
+def _flag_dml(orm_execute_state):
+    # UPDATE/DELETE/INSERT em lote via `session.execute` não passam por flush
+    if not orm_execute_state.is_select:
+        orm_execute_state.session.info["escreveu"] = True
+
+
+@event.listens_for(Session, "after_commit")
+def _track_write(session):
+    if session.info.pop("escreveu", False) and "usuario_id" in session.info:
+        replica_router.mark_write(session.info["usuario_id"])
+
+
+@event.listens_for(Session, "after_rollback")
+def _discard_write(session):
+    session.info.pop("escreveu", None)
+
+
+def _marcador_recebido(headers) -> tuple[int, float] | None:
+    for nome, valor in headers:
+        if nome == WRITE_MARKER_HEADER:
+            return parse_write_marker(valor.decode("latin-1"))
+        if nome == b"cookie":
+            for item in valor.decode("latin-1").split(";"):
+                chave, _, conteudo = item.strip().partition("=")
+                if chave == WRITE_MARKER_COOKIE:
+                    return parse_write_marker(conteudo)
+    return None
+
+
+class ReadYourWritesMiddleware:
+    """Leva a janela de escrita do usuário entre workers (ASGI puro)."""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or not replica_router.replicas:
+            await self.app(scope, receive, send)
+            return
+
+        marca = WriteMarker(_marcador_recebido(scope["headers"]))
+
+        async def enviar(message):
+            if message["type"] == "http.response.start" and marca.novo:
+                valor = sign_write_marker(*marca.novo)
+                cookie = (f"{WRITE_MARKER_COOKIE}={valor}; "
+                          f"Max-Age={replica_router.sticky_seconds}; "
+                          "Path=/; HttpOnly; SameSite=Lax")
+                message = {**message, "headers": [
+                    *message.get("headers", []),
+                    (WRITE_MARKER_HEADER, valor.encode()),
+                    (b"set-cookie", cookie.encode()),
+                ]}
+            await send(message)
+
+        token = _request_marker.set(marca)
+        try:
+            await self.app(scope, receive, enviar)
+        finally:
+            _request_marker.reset(token)
@@ -17,6 +17,26 @@ class Settings(BaseSettings):
     MYSQL_PORT: int = 3306
     MYSQL_USE_SSL: bool = False
     MYSQL_SSL_CA: str | None = None
+    # Pool de conexões; com DB_HEALTH_CHECK_SECONDS > 0 uma thread testa as
+    # conexões ociosas e DB_POOL_PRE_PING pode ser desligado
+    DB_POOL_SIZE: int = 5
+    DB_MAX_OVERFLOW: int = 10
+    DB_POOL_TIMEOUT: float = 30.0
+    DB_POOL_RECYCLE: int = 3600
+    DB_POOL_PRE_PING: bool = True
+    DB_HEALTH_CHECK_SECONDS: int = 0
+    # Tempo de banco por requisição (Server-Timing e log JSON em
+    # `uvicorn.sql`) e queries lentas com EXPLAIN (0 desliga)
+    SQL_ECHO: bool = False
+    SQL_REQUEST_LOG: bool = True
+    SQL_SLOW_QUERY_MS: float = 200
+    SQL_EXPLAIN_SLOW: bool = True
+    # Réplicas de leitura (URLs do SQLAlchemy separadas por vírgula)
+    DB_REPLICA_URLS: str = ""
+    DB_REPLICA_STICKY_SECONDS: int = 5
+    DB_REPLICA_RETRY_SECONDS: int = 30
+    # Rotas com AsyncSession sobre aiomysql em vez de PyMySQL no threadpool
+    DB_ASYNC: bool = False
 
     # Aplicação
     APP_HOST: str = "0.0.0.0"
@@ -24,12 +44,79 @@ class Settings(BaseSettings):
     SECRET_KEY: str
     ALGORITHM: str = "HS256"
     ACCESS_TOKEN_EXPIRE_MINUTES: int = 1440  # 24 horas
+    # Chave dos endpoints /metrics (X-Admin-Key ou Bearer); sem ela, 403
+    ADMIN_API_KEY: str | None = None
+    # Confia nas claims `uid`/`gen`/`nome` do token sem consultar `usuarios`
+    STATELESS_TOKENS: bool = False
+
+    # Hashing de senhas (0 workers = hashing no threadpool)
+    HASH_POOL_WORKERS: int = 2
+    HASH_QUEUE_MAX: int = 64
+    # Custos do Argon2 (None = padrão do argon2-cffi); ajuste com
+    # `python -m config.calibrate_argon2` no serviço de autenticação
+    ARGON2_TIME_COST: int | None = None
+    ARGON2_MEMORY_COST: int | None = None  # KiB
+    ARGON2_PARALLELISM: int | None = None
+
+    # Threads do AnyIO para handlers síncronos; FAST_LANE_TOKENS > 0 dá aos
+    # GETs em FAST_LANE_PATHS um limiter próprio
+    THREADPOOL_TOKENS: int = 40
+    FAST_LANE_TOKENS: int = 0
+    FAST_LANE_PATHS: str = "/health,/api/usuarios/me"
+
+    # Descarte de carga (0 desliga cada limite) e prazo por requisição em
+    # ms (0 = sem prazo); REQUEST_DEADLINE_ROUTES: "prefixo=ms,..."
+    SHED_MAX_IN_FLIGHT: int = 0
+    SHED_MAX_QUEUED: int = 0
+    SHED_RETRY_AFTER_SECONDS: int = 1
+    SHED_EXEMPT_PATHS: str = "/health,/metrics"
+    REQUEST_DEADLINE_MS: int = 0
+    REQUEST_DEADLINE_ROUTES: str = (
+        "/api/episodios=10000,/api/episodios/import=120000,"
+        "/api/episodios/export=300000")
+
+    # Modo de produção (gunicorn.conf.py): WEB_WORKERS=0 usa um worker por
+    # núcleo; cada worker é reciclado após ~WEB_MAX_REQUESTS requisições
+    WEB_WORKERS: int = 0
+    WEB_MAX_REQUESTS: int = 10000
+    WEB_MAX_REQUESTS_JITTER: int = 1000
+    WEB_GRACEFUL_TIMEOUT: int = 30
+    WEB_TIMEOUT: int = 60
+
+    # Amostragem de event loop, threadpool e pools para /metrics (0 desliga)
+    METRICS_SAMPLE_SECONDS: float = 5.0
+
+    # Startup: contagem de linhas no log (none | estimate | exact)
+    STARTUP_ROW_COUNTS: str = "estimate"
 
     # Ambiente
     ENVIRONMENT: str = "development"
     DEBUG: bool = True
     FRONTEND_URL: str = "http://localhost:3000"
 
+    # Cache de usuários autenticados (0 desabilita)
+    PRINCIPAL_CACHE_TTL_SECONDS: int = 60
+    PRINCIPAL_CACHE_MAX_SIZE: int = 1024
+
+    # Cache do total de episódios (cabeçalho X-Total-Count; 0 desabilita)
+    EPISODIO_COUNT_CACHE_TTL_SECONDS: int = 60
+
+    # Importação de episódios: registros por lote, erros no relatório e
+    # tamanho máximo de uma linha (ou registro CSV de várias linhas)
+    EPISODIO_IMPORT_BATCH_SIZE: int = 500
+    EPISODIO_IMPORT_MAX_ERRORS: int = 100
+    EPISODIO_IMPORT_MAX_LINE_CHARS: int = 16384
+    # Exportação: linhas lidas do cursor do servidor por vez
+    EPISODIO_EXPORT_YIELD_PER: int = 1000
+
+    # Filtro de revogação de tokens (sincronizado de `tokens_revogados`):
+    # cada sincronização relê as últimas REVOCATION_SYNC_OVERLAP linhas e o
+    # filtro é recarregado por inteiro a cada REVOCATION_RELOAD_SECONDS
+    REVOCATION_SYNC_SECONDS: int = 30
+    REVOCATION_BLOOM_CAPACITY: int = 100000
+    REVOCATION_SYNC_OVERLAP: int = 1000
+    REVOCATION_RELOAD_SECONDS: int = 600
+
     # Configurações de email SMTP para FastMail
     MAIL_USERNAME: str
     MAIL_PASSWORD: str
@@ -0,0 +1,157 @@
+"""
+Tempo de banco por requisição e log de queries lentas.
+
+`instrument_engine` registra hooks no engine que contam os statements e
+somam o tempo gasto no banco da requisição corrente (guardada numa
+ContextVar, que o AnyIO copia para as threads do threadpool).
+`SqlTimingMiddleware` abre esse acumulador por requisição e:
+
+- devolve o resultado no cabeçalho `Server-Timing` (`db;dur=...`), que
+  aparece direto no DevTools do navegador;
+- escreve uma linha JSON por requisição no logger `uvicorn.sql`
+  (`SQL_REQUEST_LOG`);
+- manda ao logger `uvicorn.sql.slow` todo statement acima de
+  `SQL_SLOW_QUERY_MS`, com os parâmetros e, para SELECT/UPDATE/DELETE,
+  o EXPLAIN executado na mesma conexão (exceto com cursor no servidor,
+  cujas linhas ainda não lidas o EXPLAIN descartaria).
+"""
+import json
+import logging
+import time
+from contextvars import ContextVar
+
+from sqlalchemy import event
+
+from config.settings import settings
+
+request_logger = logging.getLogger("uvicorn.sql")
+slow_logger = logging.getLogger("uvicorn.sql.slow")
+
+EXPLAINABLE = ("select", "update", "delete")
+
+
+class RequestSqlStats:
+    """Statements e tempo de banco acumulados numa requisição."""
+
+    __slots__ = ("queries", "seconds")
+
+    def __init__(self):
+        self.queries = 0
+        self.seconds = 0.0
+
+    @property
+    def milliseconds(self) -> float:
+        return round(self.seconds * 1000, 3)
+
+
+_current: ContextVar[RequestSqlStats | None] = ContextVar(
+    "sql_timing", default=None)
+
+
+def _explain(dialect: str, cursor, statement: str, parameters):
+    prefixo = "EXPLAIN QUERY PLAN " if dialect == "sqlite" else "EXPLAIN "
+    explain_cursor = cursor.connection.cursor()
+    try:
+        explain_cursor.execute(prefixo + statement, parameters)
+        return [list(linha) for linha in explain_cursor.fetchall()]
+    finally:
+        explain_cursor.close()
+
+
+def _server_side(context) -> bool:
+    """Resultado lido aos poucos de um cursor no servidor (`yield_per`)."""
+    opcoes = context.execution_options
+    return bool(opcoes.get("stream_results") or opcoes.get("yield_per"))
+
+
+# pylint: disable=too-many-arguments, too-many-positional-arguments
+def _log_slow(conn, cursor, statement, parameters, duracao, context,
+              executemany):
+    registro = {
+        "ms": round(duracao * 1000, 3),
+        "statement": statement,
+        "parameters": repr(parameters),
+    }
+    if _server_side(context):
+        # Outro comando na conexão descartaria as linhas ainda não lidas
+        # do cursor (o PyMySQL termina a query sem buffer antes)
+        registro["explain_error"] = "cursor no servidor"
+    elif (settings.SQL_EXPLAIN_SLOW and not executemany
+            and statement.lstrip()[:6].lower() in EXPLAINABLE):
+        try:
+            registro["explain"] = _explain(
+                conn.dialect.name, cursor, statement, parameters)
+        except Exception as exc:  # pylint: disable=broad-except
+            registro["explain_error"] = str(exc)
+    slow_logger.warning(json.dumps(registro, default=str))
+
+
+def _before_cursor_execute(_conn, _cursor, _statement, _parameters,
+                           context, _executemany):
+    # No contexto de execução: um statement que falha não deixa resto
+    context.sql_timing_inicio = time.perf_counter()
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters,
+                          context, executemany):
+    duracao = time.perf_counter() - context.sql_timing_inicio
+    stats = _current.get()
+    if stats is not None:
+        stats.queries += 1
+        stats.seconds += duracao
+    limite = settings.SQL_SLOW_QUERY_MS
+    if 0 < limite <= duracao * 1000:
+        _log_slow(conn, cursor, statement, parameters, duracao, context,
+                  executemany)
+
+
+def instrument_engine(engine) -> None:
+    """Registra os hooks de tempo (idempotente) num engine síncrono."""
+    if event.contains(engine, "before_cursor_execute",
+                      _before_cursor_execute):
+        return
+    event.listen(engine, "before_cursor_execute", _before_cursor_execute)
+    event.listen(engine, "after_cursor_execute", _after_cursor_execute)
+
+
+class SqlTimingMiddleware:
+    """Middleware ASGI que mede o banco por requisição HTTP."""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        stats = RequestSqlStats()
+        token = _current.set(stats)
+        inicio = time.perf_counter()
+        status_code = 500
+
+        async def send_with_timing(message):
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+                valor = (f'db;dur={stats.milliseconds};'
+                         f'desc="{stats.queries} queries"')
+                message["headers"] = list(message.get("headers", [])) + [
+                    (b"server-timing", valor.encode())]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_timing)
+        finally:
+            _current.reset(token)
+            if (settings.SQL_REQUEST_LOG
+                    and request_logger.isEnabledFor(logging.INFO)):
+                request_logger.info(json.dumps({
+                    "method": scope["method"],
+                    "path": scope["path"],
+                    "status": status_code,
+                    "db_queries": stats.queries,
+                    "db_ms": stats.milliseconds,
+                    "total_ms": round(
+                        (time.perf_counter() - inicio) * 1000, 3),
+                }))
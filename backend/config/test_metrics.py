@@ -0,0 +1,37 @@
+"""
+Testes das métricas Prometheus (`config.metrics`): agregação entre
+processos e o amostrador de threadpool e lag do event loop.
+"""
+import os
+import subprocess
+import sys
+
+from prometheus_client import REGISTRY, CollectorRegistry
+from prometheus_client.multiprocess import MultiProcessCollector
+from sqlalchemy import create_engine
+
+from config.metrics import MetricsSampler
+
+
+def test_metricas_agregadas_entre_processos(tmp_path):
+    # Dois "workers" contam requisições no mesmo diretório multiprocesso
+    env = {**os.environ, "PROMETHEUS_MULTIPROC_DIR": str(tmp_path)}
+    for _ in range(2):
+        subprocess.run(
+            [sys.executable, "-c",
+             "from config.metrics import REQUESTS; "
+             "REQUESTS.labels('GET', '/health', '200').inc()"],
+            env=env, check=True)
+
+    registry = CollectorRegistry()
+    MultiProcessCollector(registry, path=str(tmp_path))
+    assert registry.get_sample_value("http_requests_total", {
+        "method": "GET", "route": "/health", "status": "200"}) == 2
+
+
+async def test_sampler_registra_threadpool_e_lag(tmp_path):
+    eng = create_engine(f"sqlite:///{tmp_path}/amostra.db")
+    MetricsSampler(lambda: {"sync": eng.pool}, 0).sample(lag=0.25)
+    assert REGISTRY.get_sample_value("event_loop_lag_seconds") == 0.25
+    assert REGISTRY.get_sample_value(
+        "threadpool_tokens", {"lane": "default"}) > 0
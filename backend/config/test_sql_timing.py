@@ -0,0 +1,37 @@
+"""
+Testes do log de queries lentas (`config.sql_timing`): statement,
+parâmetros e plano do EXPLAIN no registro em JSON.
+"""
+import json
+
+from sqlalchemy import create_engine, text
+
+from config.settings import settings
+from config.sql_timing import instrument_engine
+
+
+def test_query_lenta_vai_ao_log_com_explain(tmp_path, monkeypatch, caplog):
+    eng = create_engine(f"sqlite:///{tmp_path}/lento.db")
+    instrument_engine(eng)
+    monkeypatch.setattr(settings, "SQL_SLOW_QUERY_MS", 0.000001)
+    with eng.connect() as conn:
+        conn.exec_driver_sql(
+            "CREATE TABLE itens (id INTEGER PRIMARY KEY, email TEXT)")
+        with caplog.at_level("WARNING", logger="uvicorn.sql.slow"):
+            conn.execute(text("SELECT id FROM itens WHERE email = :email"),
+                         {"email": "lento@x.com"})
+
+        registro = json.loads(caplog.records[-1].getMessage())
+        assert registro["statement"].startswith("SELECT id FROM itens")
+        assert "lento@x.com" in registro["parameters"]
+        assert registro["explain"]  # plano do SQLite (EXPLAIN QUERY PLAN)
+
+        # Cursor no servidor: sem EXPLAIN na conexão, as linhas seguem intactas
+        with caplog.at_level("WARNING", logger="uvicorn.sql.slow"):
+            linhas = conn.execute(
+                text("SELECT id FROM itens"),
+                execution_options={"yield_per": 10}).all()
+    assert linhas == []
+    registro = json.loads(caplog.records[-1].getMessage())
+    assert "explain" not in registro
+    assert registro["explain_error"] == "cursor no servidor"
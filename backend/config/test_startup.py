@@ -0,0 +1,31 @@
+"""
+Testes da inicialização (`config.startup`): versão do schema gravada
+no banco, contagem de linhas no boot e tempos por fase.
+"""
+from sqlalchemy import create_engine
+
+from config.settings import settings
+from config.startup import (
+    BootTimer, log_table_counts, mark_schema, schema_is_current,
+)
+
+
+def test_schema_versao_e_contagens(tmp_path, monkeypatch):
+    eng = create_engine(f"sqlite:///{tmp_path}/boot.db")
+    with eng.connect() as conn:
+        assert not schema_is_current(conn, "servico", 1)
+        mark_schema(conn, "servico", 1)
+        assert schema_is_current(conn, "servico", 1)
+        assert not schema_is_current(conn, "servico", 2)
+
+        conn.exec_driver_sql("CREATE TABLE itens (id INTEGER PRIMARY KEY)")
+        conn.exec_driver_sql("INSERT INTO itens (id) VALUES (1)")
+        monkeypatch.setattr(settings, "STARTUP_ROW_COUNTS", "exact")
+        assert log_table_counts(conn, ["itens"]) == {"itens": 1}
+        monkeypatch.setattr(settings, "STARTUP_ROW_COUNTS", "none")
+        assert log_table_counts(conn, ["itens"]) == {}
+
+    boot = BootTimer("teste")
+    with boot.phase("fase"):
+        pass
+    assert set(boot.report()) == {"fase", "total"}
@@ -0,0 +1,42 @@
+"""
+Testes das faixas do threadpool (`config.threadpool`): a faixa rápida
+não espera a padrão e as esperas ficam nas estatísticas.
+"""
+import asyncio
+import time
+
+from anyio import to_thread
+
+from config.threadpool import ThreadLanes, _lane
+
+
+async def test_threadpool_faixa_rapida_nao_espera_a_padrao():
+    lanes = ThreadLanes(tokens=1, fast_tokens=1, fast_paths="/health")
+    lanes.install()
+    # Falha aqui se o AnyIO mudar a RunVar interna usada por install()
+    assert to_thread.current_default_thread_limiter() is lanes.limiter
+    assert lanes.lane_for("GET", "/health") == "fast"
+    assert lanes.lane_for("POST", "/health") == "default"
+    assert lanes.lane_for("GET", "/api/recurso") == "default"
+
+    # Duas chamadas na faixa padrão (1 thread): a segunda espera a primeira
+    lentas = [asyncio.create_task(to_thread.run_sync(time.sleep, 0.1))
+              for _ in range(2)]
+    await asyncio.sleep(0.02)
+    token = _lane.set("fast")
+    try:
+        inicio = time.perf_counter()
+        await to_thread.run_sync(time.sleep, 0)
+        assert time.perf_counter() - inicio < 0.05
+    finally:
+        _lane.reset(token)
+    await asyncio.gather(*lentas)
+
+    stats = lanes.stats()
+    assert stats["default"]["tokens"] == 1
+    assert stats["default"]["acquired"] == 2
+    assert stats["default"]["waited"] == 1
+    assert stats["default"]["wait_max_ms"] >= 50
+    assert stats["default"]["peak_in_use"] == 1
+    assert stats["fast"]["acquired"] == 1
+    assert stats["fast"]["waited"] == 0
@@ -0,0 +1,186 @@
+"""
+Threadpool dos handlers síncronos: tamanho, métricas e faixa rápida.
+
+O FastAPI roda handlers e dependências síncronos no limiter padrão do
+AnyIO (40 threads). Quando todas estão ocupadas por queries lentas, as
+demais requisições esperam sem que nada registre essa fila.
+
+`ThreadLanes.install` (no startup, dentro do event loop) ajusta o limiter
+padrão para `THREADPOOL_TOKENS` threads e o envolve num
+`InstrumentedLimiter`, que mede a espera por uma thread, as threads
+ocupadas e o pico de ocupação. Com `FAST_LANE_TOKENS` > 0, os GETs em
+`FAST_LANE_PATHS` (ex.: `/health`, `/me`) usam um limiter próprio:
+`ThreadLaneMiddleware` marca a requisição e o limiter padrão repassa a ela
+as threads da faixa rápida, inclusive nas dependências, sem mudar os
+handlers.
+
+O FastAPI chama `to_thread.run_sync` sem `limiter=`, então o único ponto
+para trocar o limiter dos handlers e dependências é a RunVar interna do
+AnyIO que guarda o padrão. Ela não é API pública: o `anyio` fica fixado
+em `requirements.txt`, um teste falha se ela mudar, e sem ela `install`
+só redimensiona o limiter padrão (API pública), sem métricas nem faixa
+rápida.
+"""
+import logging
+import threading
+import time
+from contextvars import ContextVar
+
+from config.metrics import THREADPOOL_WAIT
+from config.settings import settings
+
+logger = logging.getLogger("uvicorn")
+
+_lane: ContextVar[str] = ContextVar("thread_lane", default="default")
+
+
+class LaneStats:
+    """Espera e ocupação de uma faixa do threadpool."""
+
+    def __init__(self, nome: str):
+        self.nome = nome
+        self.acquired = 0
+        self.waited = 0
+        self.wait_total = 0.0
+        self.wait_max = 0.0
+        self.peak_in_use = 0
+
+
+class InstrumentedLimiter:
+    """
+    Limiter padrão do AnyIO com métricas, que escolhe a faixa pela
+    ContextVar da requisição. Demais atributos (`borrowed_tokens`,
+    `statistics()`...) vêm do limiter da faixa padrão.
+    """
+
+    def __init__(self, lanes: dict):
+        # {nome: CapacityLimiter}; "default" é obrigatório
+        self.lanes = lanes
+        self.stats = {nome: LaneStats(nome) for nome in lanes}
+        self._lock = threading.Lock()
+
+    def _lane(self) -> str:
+        nome = _lane.get()
+        return nome if nome in self.lanes else "default"
+
+    async def __aenter__(self):
+        nome = self._lane()
+        limiter = self.lanes[nome]
+        enfileirou = limiter.available_tokens < 1
+        inicio = time.perf_counter()
+        await limiter.acquire()
+        espera = time.perf_counter() - inicio
+        THREADPOOL_WAIT.labels(nome).observe(espera)
+        stats = self.stats[nome]
+        with self._lock:
+            stats.acquired += 1
+            stats.waited += enfileirou
+            stats.wait_total += espera
+            stats.wait_max = max(stats.wait_max, espera)
+            stats.peak_in_use = max(stats.peak_in_use,
+                                    limiter.borrowed_tokens)
+
+    async def __aexit__(self, *_exc):
+        self.lanes[self._lane()].release()
+
+    @property
+    def total_tokens(self):
+        return self.lanes["default"].total_tokens
+
+    @total_tokens.setter
+    def total_tokens(self, valor):
+        self.lanes["default"].total_tokens = valor
+
+    def __getattr__(self, nome):
+        return getattr(self.lanes["default"], nome)
+
+    def snapshot(self) -> dict:
+        """Estado de cada faixa, para `/metrics/threadpool`."""
+        resumo = {}
+        with self._lock:
+            for nome, limiter in self.lanes.items():
+                stats = self.stats[nome]
+                resumo[nome] = {
+                    "tokens": limiter.total_tokens,
+                    "in_use": limiter.borrowed_tokens,
+                    "waiting": limiter.statistics().tasks_waiting,
+                    "peak_in_use": stats.peak_in_use,
+                    "acquired": stats.acquired,
+                    "waited": stats.waited,
+                    "wait_avg_ms": round(
+                        stats.wait_total / stats.acquired * 1000
+                        if stats.acquired else 0.0, 3),
+                    "wait_max_ms": round(stats.wait_max * 1000, 3),
+                }
+        return resumo
+
+
+class ThreadLanes:
+    """Configura o limiter padrão do AnyIO conforme `settings`."""
+
+    def __init__(self, tokens: int, fast_tokens: int, fast_paths: str):
+        self.tokens = tokens
+        self.fast_tokens = fast_tokens
+        self.fast_paths = frozenset(
+            caminho.strip() for caminho in fast_paths.split(",")
+            if caminho.strip())
+        self.limiter: InstrumentedLimiter | None = None
+
+    def install(self) -> None:
+        """Instrumenta o limiter padrão do event loop corrente."""
+        # pylint: disable=import-outside-toplevel
+        import anyio
+        from anyio import to_thread
+
+        padrao = to_thread.current_default_thread_limiter()
+        if isinstance(padrao, InstrumentedLimiter):
+            padrao = padrao.lanes["default"]
+        padrao.total_tokens = self.tokens
+        lanes = {"default": padrao}
+        if self.fast_tokens > 0:
+            lanes["fast"] = anyio.CapacityLimiter(self.fast_tokens)
+        limiter = InstrumentedLimiter(lanes)
+        try:
+            # O AnyIO não expõe um setter público para o limiter padrão;
+            # ele é guardado por event loop nesta RunVar
+            from anyio._backends._asyncio import _default_thread_limiter
+            _default_thread_limiter.set(limiter)
+        except (ImportError, AttributeError) as erro:
+            logger.error("Limiter do AnyIO não instrumentado (métricas e "
+                         "faixa rápida desligadas): %r", erro)
+            return
+        self.limiter = limiter
+
+    def lane_for(self, method: str, path: str) -> str:
+        if (self.fast_tokens > 0 and method in ("GET", "HEAD")
+                and path in self.fast_paths):
+            return "fast"
+        return "default"
+
+    def stats(self) -> dict:
+        return self.limiter.snapshot() if self.limiter else {}
+
+
+thread_lanes = ThreadLanes(
+    tokens=settings.THREADPOOL_TOKENS,
+    fast_tokens=settings.FAST_LANE_TOKENS,
+    fast_paths=settings.FAST_LANE_PATHS,
+)
+
+
+class ThreadLaneMiddleware:
+    """Marca as requisições da faixa rápida (ASGI puro, uma comparação)."""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        token = _lane.set(thread_lanes.lane_for(scope["method"],
+                                                scope["path"]))
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            _lane.reset(token)
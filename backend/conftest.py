@@ -5,13 +5,16 @@ Fixtures globais e configuração de testes.
 # pylint: disable=redefined-outer-name, import-outside-toplevel
 # pylint: disable=unused-argument, invalid-name, import-error
 
+from contextlib import contextmanager
+
 import pytest
 from fastapi.testclient import TestClient
-from sqlalchemy import create_engine
+from sqlalchemy import create_engine, event
 from sqlalchemy.orm import sessionmaker
 from sqlalchemy.pool import StaticPool
 
-from config.database import Base, get_db
+from config.database import Base, get_db, get_session_factory
+from config.sql_timing import instrument_engine
 from main import app
 
 # URL do banco de testes (SQLite em memória)
@@ -23,15 +26,56 @@ engine = create_engine(
     connect_args={"check_same_thread": False},
     poolclass=StaticPool,
 )
+# Server-Timing e log de queries lentas também nos testes
+instrument_engine(engine)
 
 # Session de teste
 TestingSessionLocal = sessionmaker(
     autocommit=False,
     autoflush=False,
     bind=engine,
+    expire_on_commit=False,
 )
 
 
+class QueryCounter:
+    """Registra os statements SQL enviados por um engine."""
+
+    def __init__(self, target_engine):
+        self.engine = target_engine
+        self.statements: list[str] = []
+
+    def _on_execute(self, _conn, _cursor, statement, *_args):
+        self.statements.append(statement)
+
+    def __enter__(self):
+        event.listen(self.engine, "before_cursor_execute", self._on_execute)
+        return self
+
+    def __exit__(self, *_exc):
+        event.remove(self.engine, "before_cursor_execute", self._on_execute)
+
+
+@pytest.fixture
+def assert_num_queries():
+    """
+    Fixa quantos statements SQL um trecho executa, para que regressões
+    N+1 falhem no teste:
+
+        with assert_num_queries(3):
+            client.get("/api/episodios/", headers=headers)
+    """
+    @contextmanager
+    def _assert(esperado: int):
+        with QueryCounter(engine) as contador:
+            yield contador
+        executados = contador.statements
+        assert len(executados) == esperado, (
+            f"{len(executados)} statements (esperado {esperado}):\n"
+            + "\n".join(executados))
+    return _assert
+
+
 @pytest.fixture(scope="function")
 def db():
     """Fixture que cria um banco de dados limpo para cada teste."""
@@ -57,14 +101,70 @@ def client(db):
             pass
 
     app.dependency_overrides[get_db] = override_get_db
+    app.dependency_overrides[get_session_factory] = lambda: TestingSessionLocal
+    # Caches são globais ao processo; não devem vazar entre testes
+    from source.usuario.cache_usuario import principal_cache
+    from source.episodio.paginacao_episodio import episodio_count_cache
+    principal_cache.clear()
+    episodio_count_cache.clear()
+
+    from source.usuario.revogacao_usuario import revocation_filter
 
     with TestClient(app) as test_client:
+        # Filtro de revogação é montado a partir do banco de cada teste
+        revocation_filter.reset()
         yield test_client
 
     # Limpa override após uso
     app.dependency_overrides.clear()
 
 
+@pytest.fixture(scope="function")
+def async_client():
+    """
+    TestClient de um app com as rotas assíncronas (modo DB_ASYNC) sobre
+    aiosqlite em memória.
+    """
+    from fastapi import FastAPI
+    from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+    from config.database import get_async_db, get_async_session_factory
+    from main import register_routers
+    from source.usuario.view_async_usuario import router as usuarios
+    from source.episodio.view_async_episodio import router as episodios
+    from source.gatilho.view_async_gatilho import router as gatilhos
+    from source.medicacao.view_async_medicacao import router as medicacoes
+    from source.usuario.cache_usuario import principal_cache
+    from source.usuario.revogacao_usuario import revocation_filter
+    from source.episodio.paginacao_episodio import episodio_count_cache
+
+    async_engine = create_async_engine(
+        "sqlite+aiosqlite:///:memory:", poolclass=StaticPool)
+    session_local = async_sessionmaker(
+        async_engine, autoflush=False, expire_on_commit=False)
+
+    async def override_get_async_db():
+        async with session_local() as session:
+            yield session
+
+    async def create_tables():
+        async with async_engine.begin() as conn:
+            await conn.run_sync(Base.metadata.create_all)
+
+    async_app = FastAPI()
+    register_routers(async_app, (usuarios, episodios, gatilhos, medicacoes))
+    async_app.dependency_overrides[get_async_db] = override_get_async_db
+    async_app.dependency_overrides[get_async_session_factory] = \
+        lambda: session_local
+    principal_cache.clear()
+    episodio_count_cache.clear()
+    revocation_filter.reset()
+
+    with TestClient(async_app) as test_client:
+        test_client.portal.call(create_tables)
+        yield test_client
+        test_client.portal.call(async_engine.dispose)
+
+
 @pytest.fixture
 def usuario_teste(db):
     # Usuário mockado para endpoints que precisam de um usuário
@@ -117,3 +217,32 @@ def auth_header(auth_token):
     em requisições autenticadas."""
 
     return {"Authorization": f"Bearer {auth_token}"}
+
+
+@pytest.fixture
+def async_auth_header(async_client):
+    """Header Authorization de um usuário registrado pelas rotas assíncronas."""
+    from config.settings import settings
+    from jose import jwt
+
+    res = async_client.post("/api/usuarios/", json={
+        "nome": "Usuario Async",
+        "email": "usuario_async@email.com",
+        "senha": "senha12345",
+    })
+    assert res.status_code == 201
+    token = jwt.encode(
+        {"sub": "usuario_async@email.com"},
+        settings.SECRET_KEY,
+        algorithm=settings.ALGORITHM,
+    )
+    return {"Authorization": f"Bearer {token}"}
+
+
+@pytest.fixture
+def admin_header(monkeypatch):
+    """Cabeçalho dos endpoints administrativos (`/metrics` e afins)."""
+    from config.settings import settings
+
+    monkeypatch.setattr(settings, "ADMIN_API_KEY", "chave-admin-teste")
+    return {"X-Admin-Key": "chave-admin-teste"}
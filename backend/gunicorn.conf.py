@@ -0,0 +1,51 @@
+"""
+Configuração do gunicorn para produção: `gunicorn main:app`.
+
+Workers uvicorn (um por núcleo com `WEB_WORKERS=0`), app pré-carregado no
+mestre, pools do banco recriados após o fork, drenagem no SIGTERM e
+reciclagem de workers. Ver `config/server.py`.
+"""
+# pylint: disable=invalid-name
+import os
+
+from config.server import (
+    mark_worker_dead, prepare_multiproc_dir, reset_after_fork, worker_count,
+)
+from config.settings import settings
+
+# As métricas de todos os workers vão para um diretório compartilhado; o
+# prometheus_client lê a variável ao ser importado, antes do preload
+os.environ.setdefault("PROMETHEUS_MULTIPROC_DIR", "/tmp/prometheus-backend")
+prepare_multiproc_dir(os.environ["PROMETHEUS_MULTIPROC_DIR"])
+
+bind = f"{settings.APP_HOST}:8000"
+worker_class = "uvicorn.workers.UvicornWorker"
+workers = worker_count(settings.WEB_WORKERS)
+preload_app = True
+
+# Recicla cada worker após ~N requisições (jitter evita reinícios juntos)
+max_requests = settings.WEB_MAX_REQUESTS
+max_requests_jitter = settings.WEB_MAX_REQUESTS_JITTER
+
+# SIGTERM: até graceful_timeout para as requisições em andamento
+graceful_timeout = settings.WEB_GRACEFUL_TIMEOUT
+timeout = settings.WEB_TIMEOUT
+keepalive = 5
+accesslog = "-"
+
+
+def post_fork(_server, _worker):
+    """Cada worker abre as próprias conexões com o banco."""
+    # pylint: disable=import-outside-toplevel
+    from config.database import async_engine, engine
+    from config.replicas import replica_router
+
+    engines = [engine] + [replica.engine for replica in replica_router.replicas]
+    if async_engine is not None:
+        engines.append(async_engine.sync_engine)
+    reset_after_fork(engines)
+
+
+def child_exit(_server, worker):
+    """Worker reciclado ou encerrado: descarta seus gauges."""
+    mark_worker_dead(worker.pid)
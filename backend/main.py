@@ -2,24 +2,50 @@
 Ponto de entrada da aplicação FastAPI - Diário de Enxaqueca.
 """
 import logging
-from fastapi import FastAPI
+from fastapi import Depends, FastAPI, Request, status
 from fastapi.middleware.cors import CORSMiddleware
-from sqlalchemy import inspect
+from fastapi.responses import JSONResponse, Response
+from sqlalchemy import inspect, text
 from sqlalchemy.exc import OperationalError, SQLAlchemyError
-from sqlalchemy.orm import sessionmaker
+from config.admin import require_admin
 from config.settings import settings
-from config.database import Base, engine
+from config.database import (
+    Base, SessionLocal, async_engine, engine, pool_health_checker,
+)
+from config.metrics import MetricsMiddleware, MetricsSampler, render_metrics
+from config.pool import pool_stats
+from config.sql_timing import SqlTimingMiddleware
+from config.threadpool import ThreadLaneMiddleware, thread_lanes
+from config.deadline import DeadlineExceeded, DeadlineMiddleware
+from config.shedding import LoadSheddingMiddleware, load_shedder
+from config.replicas import ReadYourWritesMiddleware, replica_router
+from config.hashing import HashingQueueFull, hashing_executor
+from config.startup import (
+    BootTimer, log_table_counts, mark_schema, schema_is_current,
+)
 
-# Importar rotas (views)
-from source.usuario.view_usuario import router as usuario_router
-from source.episodio.view_episodio import router as episodio_router
-from source.gatilho.view_gatilho import router as gatilho_router
-from source.medicacao.view_medicacao import router as medicacao_router
+# Importar rotas (views): assíncronas com DB_ASYNC, síncronas caso contrário
+# pylint: disable=ungrouped-imports
+if settings.DB_ASYNC:
+    from source.usuario.view_async_usuario import router as usuario_router
+    from source.episodio.view_async_episodio import router as episodio_router
+    from source.gatilho.view_async_gatilho import router as gatilho_router
+    from source.medicacao.view_async_medicacao import (
+        router as medicacao_router)
+else:
+    from source.usuario.view_usuario import router as usuario_router
+    from source.episodio.view_episodio import router as episodio_router
+    from source.gatilho.view_gatilho import router as gatilho_router
+    from source.medicacao.view_medicacao import router as medicacao_router
 
 # Importar todos os modelos para registrar no metadata
 # pylint: disable=W0611
-from source.usuario.model_usuario import Usuario  # noqa: F401
-from source.episodio.model_episodio import Episodio  # noqa: F401
+from source.usuario.model_usuario import (  # noqa: F401
+    Usuario, tokens_revogados, usuarios_excluidos)
+from source.usuario.revogacao_usuario import revocation_filter
+from source.episodio.model_episodio import (  # noqa: F401
+    Episodio, episodio_gatilho, episodio_medicacao,
+)
 from source.gatilho.model_gatilho import Gatilho  # noqa: F401
 from source.medicacao.model_medicacao import Medicacao  # noqa: F401
 
@@ -52,6 +78,19 @@ if settings.ENVIRONMENT == "production":
         "https://*.vercel.app",
     ])
 
+# Tempo de banco por requisição (Server-Timing e log)
+app.add_middleware(SqlTimingMiddleware)
+# Contagem e latência por rota para /metrics
+app.add_middleware(MetricsMiddleware)
+# Janela de leitura no primário após escrita, entre workers (réplicas)
+app.add_middleware(ReadYourWritesMiddleware)
+# Faixa do threadpool (rápida para FAST_LANE_PATHS)
+app.add_middleware(ThreadLaneMiddleware)
+# Prazo por requisição (max_execution_time no MySQL)
+app.add_middleware(DeadlineMiddleware)
+# Recusa com 503 acima das marcas d'água, antes de qualquer trabalho
+app.add_middleware(LoadSheddingMiddleware)
+
 # Configurar CORS
 app.add_middleware(
     CORSMiddleware,
@@ -59,58 +98,202 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    # Paginação da listagem de episódios e janela de escrita (réplicas)
+    expose_headers=["X-Next-Cursor", "X-Total-Count", "X-Last-Write"],
 )
 
+
+def register_routers(target: FastAPI, routers) -> None:
+    """Registra os routers de usuários, episódios, gatilhos e medicações."""
+    usuarios, episodios, gatilhos, medicacoes = routers
+    target.include_router(usuarios, prefix="/api/usuarios",
+                          tags=["Usuários"])
+    target.include_router(episodios, prefix="/api/episodios",
+                          tags=["Episódios"])
+    target.include_router(gatilhos, prefix="/api/gatilhos",
+                          tags=["Gatilhos"])
+    target.include_router(medicacoes, prefix="/api/medicacoes",
+                          tags=["Medicações"])
+
+
 # Registrar routers
-app.include_router(usuario_router, prefix="/api/usuarios",
-                   tags=["Usuários"])
-app.include_router(episodio_router, prefix="/api/episodios",
-                   tags=["Episódios"])
-app.include_router(gatilho_router, prefix="/api/gatilhos",
-                   tags=["Gatilhos"])
-app.include_router(medicacao_router, prefix="/api/medicacoes",
-                   tags=["Medicações"])
+register_routers(app, (usuario_router, episodio_router, gatilho_router,
+                       medicacao_router))
 # rotas de autenticação ficam em serviço separado
 
 
+@app.exception_handler(HashingQueueFull)
+async def hashing_queue_full_handler(_request: Request, _exc: HashingQueueFull):
+    """Fila de hashing cheia: pede para o cliente tentar novamente."""
+    return JSONResponse(
+        status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+        content={"detail": "Serviço sobrecarregado, tente novamente"},
+        headers={"Retry-After": "1"},
+    )
+
+
+@app.exception_handler(DeadlineExceeded)
+async def deadline_exceeded_handler(_request: Request, exc: DeadlineExceeded):
+    """Prazo da requisição esgotado (na fila ou no banco)."""
+    return JSONResponse(
+        status_code=status.HTTP_504_GATEWAY_TIMEOUT,
+        content={"detail": str(exc)},
+    )
+
+
+def ensure_token_geracao(conn, inspector):
+    """Adiciona `usuarios.token_geracao` em bancos criados antes da coluna."""
+    colunas = {col["name"] for col in inspector.get_columns("usuarios")}
+    if "token_geracao" in colunas:
+        return
+    try:
+        conn.execute(text(
+            "ALTER TABLE usuarios "
+            "ADD COLUMN token_geracao INT NOT NULL DEFAULT 0"
+        ))
+        conn.commit()
+        logger.info("Coluna usuarios.token_geracao adicionada")
+    except SQLAlchemyError as exc:
+        conn.rollback()
+        # O serviço de autenticação pode ter criado a coluna em paralelo
+        logger.warning("Falha ao adicionar token_geracao: %s", exc)
+
+
+def ensure_episodio_indexes(conn):
+    """Cria o índice `(usuario_id, data, id)` da listagem por cursor."""
+    for indice in Episodio.__table__.indexes:
+        indice.create(bind=conn, checkfirst=True)
+    conn.commit()
+
+
+def comandos_cascade(inspector, tabela) -> list[str]:
+    """ALTERs que recriam com ON DELETE CASCADE as FKs de `tabela` sem ele."""
+    comandos = []
+    for fk in inspector.get_foreign_keys(tabela.name):
+        if (fk.get("options") or {}).get("ondelete", "").upper() == "CASCADE":
+            continue
+        comandos += [
+            f"ALTER TABLE {tabela.name} DROP FOREIGN KEY {fk['name']}",
+            f"ALTER TABLE {tabela.name} ADD CONSTRAINT {fk['name']} "
+            f"FOREIGN KEY ({', '.join(fk['constrained_columns'])}) "
+            f"REFERENCES {fk['referred_table']} "
+            f"({', '.join(fk['referred_columns'])}) ON DELETE CASCADE",
+        ]
+    return comandos
+
+
+def ensure_association_cascade(conn, inspector):
+    """
+    Põe ON DELETE CASCADE nas FKs de `episodio_gatilho` e
+    `episodio_medicacao` de bancos criados antes dele: os DELETEs diretos
+    de episódio, gatilho e medicação contam com a cascata.
+    """
+    if conn.dialect.name != "mysql":
+        return  # o SQLite (testes) não altera FKs; as tabelas são novas
+    for tabela in (episodio_gatilho, episodio_medicacao):
+        comandos = comandos_cascade(inspector, tabela)
+        if not comandos:
+            continue
+        try:
+            for comando in comandos:
+                conn.execute(text(comando))
+            conn.commit()
+            logger.info("FKs de %s recriadas com ON DELETE CASCADE",
+                        tabela.name)
+        except SQLAlchemyError as exc:
+            conn.rollback()
+            logger.warning("Falha ao recriar as FKs de %s: %s",
+                           tabela.name, exc)
+
+
+# Incrementar quando o startup passar a verificar algo novo no schema
+SCHEMA_VERSION = 4
+
+
+def check_schema(conn):
+    """Cria as tabelas ausentes e aplica as migrações de colunas."""
+    inspector = inspect(conn)
+    if not inspector.has_table('usuarios'):
+        # Nenhuma tabela 'usuarios' -> cria todas as definidas
+        Base.metadata.create_all(bind=conn)
+        conn.commit()
+        logger.info("Tabelas backend criadas (usuarios ausente)")
+    else:
+        logger.info("Tabela usuarios já existe; pulando create_all")
+        ensure_token_geracao(conn, inspector)
+        # Log de revogações escrito pelo serviço de autenticação
+        tokens_revogados.create(bind=conn, checkfirst=True)
+        usuarios_excluidos.create(bind=conn, checkfirst=True)
+        ensure_episodio_indexes(conn)
+        ensure_association_cascade(conn, inspector)
+        conn.commit()
+
+
 @app.on_event("startup")
 def startup_event():
-    """Verifica existência das tabelas e cria somente as ausentes.
+    """Verifica o schema (uma vez por versão) e prepara os componentes.
 
-    Também loga contagem de registros para diagnosticar perda de dados.
+    A contagem de registros segue `STARTUP_ROW_COUNTS` e a duração de
+    cada fase vai para o log e para `/metrics/boot`.
     """
+    boot = BootTimer("backend")
     try:
-        inspector = inspect(engine)
-        if not inspector.has_table('usuarios'):
-            # Nenhuma tabela 'usuarios' -> cria todas as definidas
-            Base.metadata.create_all(bind=engine)
-            logger.info("Tabelas backend criadas (usuarios ausente)")
-        else:
-            logger.info("Tabela usuarios já existe; pulando create_all")
-
-        # Logar contagem de linhas para diagnóstico
-        session_local = sessionmaker(
-            autocommit=False, autoflush=False, bind=engine
-        )
-        with session_local() as db:
-            for model, name in [
-                (Usuario, "usuarios"),
-                (Episodio, "episodios"),
-                (Gatilho, "gatilhos"),
-                (Medicacao, "medicacoes"),
-            ]:
-                try:
-                    count = db.query(model).count()
-                    logger.info("Tabela %s possui %d registros", name, count)
-                except SQLAlchemyError as inner_exc:
-                    logger.warning(
-                        "Falha ao contar registros em %s: %s",
-                        name,
-                        inner_exc,
-                    )
+        with engine.connect() as conn:
+            with boot.phase("schema"):
+                if not schema_is_current(conn, "backend", SCHEMA_VERSION):
+                    check_schema(conn)
+                    mark_schema(conn, "backend", SCHEMA_VERSION)
+            with boot.phase("contagens"):
+                log_table_counts(
+                    conn, ["usuarios", "episodios", "gatilhos", "medicacoes"])
+        with boot.phase("revogacao"), SessionLocal() as db:
+            # Monta o filtro de revogação antes da primeira requisição
+            revocation_filter.maybe_sync(db)
     except OperationalError as exc:
         logger.error("Erro ao verificar/criar tabelas: %s", exc)
 
+    with boot.phase("hashing"):
+        hashing_executor.start()
+    pool_health_checker.start()
+    app.state.boot = boot.report()
+
+
+def database_pools() -> dict:
+    """Pools amostrados para /metrics (recalculado: dispose troca o pool)."""
+    pools = {"sync": engine.pool}
+    if async_engine is not None:
+        pools["async"] = async_engine.pool
+    for indice, replica in enumerate(replica_router.replicas):
+        pools[f"replica-{indice}"] = replica.engine.pool
+    return pools
+
+
+metrics_sampler = MetricsSampler(database_pools,
+                                 settings.METRICS_SAMPLE_SECONDS)
+
+
+@app.on_event("startup")
+async def install_thread_lanes():
+    """Troca o limiter padrão do AnyIO pelo instrumentado (por faixa)."""
+    thread_lanes.install()
+
+
+@app.on_event("startup")
+async def start_metrics_sampler():
+    """Amostra event loop, threadpool e pools periodicamente."""
+    await metrics_sampler.start()
+
+
+@app.on_event("shutdown")
+async def shutdown_event():
+    """Encerra o pool de hashing e fecha as conexões com o banco."""
+    await metrics_sampler.stop()
+    hashing_executor.shutdown()
+    pool_health_checker.stop()
+    if async_engine is not None:
+        await async_engine.dispose()
+    engine.dispose()
+
 
 @app.get("/")
 async def root():
@@ -126,3 +309,58 @@ async def root():
 def health_check():
     """Health check endpoint."""
     return {"status": "healthy"}
+
+
+@app.get("/metrics", include_in_schema=False,
+         dependencies=[Depends(require_admin)])
+def prometheus_metrics():
+    """Métricas no formato texto do Prometheus (todos os workers)."""
+    corpo, content_type = render_metrics()
+    return Response(corpo, media_type=content_type)
+
+
+@app.get("/metrics/hashing", include_in_schema=False,
+         dependencies=[Depends(require_admin)])
+def hashing_metrics():
+    """Fila, rejeições e latência do executor de hashing."""
+    return hashing_executor.stats()
+
+
+@app.get("/metrics/pool", include_in_schema=False,
+         dependencies=[Depends(require_admin)])
+def pool_metrics():
+    """Conexões em uso, overflow, espera e timeouts dos pools do banco."""
+    pools = {"sync": pool_stats(engine.pool)}
+    if async_engine is not None:
+        pools["async"] = pool_stats(async_engine.pool)
+    if replica_router.replicas:
+        pools["read_routing"] = replica_router.stats()
+    return pools
+
+
+@app.get("/metrics/threadpool", include_in_schema=False,
+         dependencies=[Depends(require_admin)])
+async def threadpool_metrics():
+    """Threads, fila e espera de cada faixa do threadpool do AnyIO."""
+    return thread_lanes.stats()
+
+
+@app.get("/metrics/shedding", include_in_schema=False,
+         dependencies=[Depends(require_admin)])
+async def shedding_metrics():
+    """Requisições em andamento, fila do threadpool e recusas por motivo."""
+    return load_shedder.stats()
+
+
+@app.get("/metrics/boot", include_in_schema=False,
+         dependencies=[Depends(require_admin)])
+def boot_metrics():
+    """Duração (ms) de cada fase do último startup deste worker."""
+    return getattr(app.state, "boot", {})
+
+
+@app.get("/metrics/revocation", include_in_schema=False,
+         dependencies=[Depends(require_admin)])
+def revocation_metrics():
+    """Tamanho do filtro de revogação e confirmações feitas no banco."""
+    return revocation_filter.stats()
@@ -11,9 +11,46 @@ CREATE TABLE IF NOT EXISTS usuarios (
     email VARCHAR(100) NOT NULL UNIQUE,
     senha_hash VARCHAR(255) NOT NULL,
     data_cadastro TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    token_geracao INT NOT NULL DEFAULT 0,
     INDEX idx_email (email)
 ) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_unicode_ci;
 
+-- =====================================================
+-- TABELA: refresh_tokens (rotação de refresh tokens)
+-- =====================================================
+CREATE TABLE IF NOT EXISTS refresh_tokens (
+    jti VARCHAR(32) PRIMARY KEY,
+    usuario_id INT NOT NULL,
+    expira_em DATETIME NOT NULL,
+    revogado BOOLEAN NOT NULL DEFAULT 0,
+    data_criacao TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    FOREIGN KEY (usuario_id) REFERENCES usuarios(id) ON DELETE CASCADE,
+    INDEX idx_usuario (usuario_id)
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_unicode_ci;
+
+-- =====================================================
+-- TABELA: tokens_revogados (log lido pelo backend)
+-- =====================================================
+CREATE TABLE IF NOT EXISTS tokens_revogados (
+    id INT AUTO_INCREMENT PRIMARY KEY,
+    usuario_id INT NOT NULL,
+    jti VARCHAR(32) UNIQUE,
+    token_geracao INT,
+    expira_em DATETIME NOT NULL,
+    data_criacao TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    FOREIGN KEY (usuario_id) REFERENCES usuarios(id) ON DELETE CASCADE,
+    INDEX idx_usuario (usuario_id)
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_unicode_ci;
+
+-- =====================================================
+-- TABELA: usuarios_excluidos (sem FK: sobrevive ao DELETE do usuário)
+-- =====================================================
+CREATE TABLE IF NOT EXISTS usuarios_excluidos (
+    id INT AUTO_INCREMENT PRIMARY KEY,
+    usuario_id INT NOT NULL,
+    expira_em DATETIME NOT NULL
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_unicode_ci;
+
 -- =====================================================
 -- TABELA: gatilhos
 -- =====================================================
@@ -17,3 +17,5 @@ class Usuario(Base):
     email = Column(String(100), unique=True, nullable=False, index=True)
     senha_hash = Column(String(255), nullable=False)
     data_cadastro = Column(DateTime, server_default=text("CURRENT_TIMESTAMP"))
+    token_geracao = Column(Integer, nullable=False, default=0,
+                           server_default=text("0"))
@@ -26,6 +26,11 @@ class SharedSettings(BaseSettings):
     ALGORITHM: str = "HS256"
     ACCESS_TOKEN_EXPIRE_MINUTES: int = 1440
 
+    # Custos do Argon2 (None = padrão do argon2-cffi)
+    ARGON2_TIME_COST: int | None = None
+    ARGON2_MEMORY_COST: int | None = None
+    ARGON2_PARALLELISM: int | None = None
+
     # Ambiente
     ENVIRONMENT: str = "development"
     DEBUG: bool = True
@@ -2,7 +2,18 @@
 
 from passlib.context import CryptContext
 
-pwd_context = CryptContext(schemes=["argon2"], deprecated="auto")
+from .settings import shared_settings
+
+_custos = {
+    "argon2__rounds": shared_settings.ARGON2_TIME_COST,
+    "argon2__memory_cost": shared_settings.ARGON2_MEMORY_COST,
+    "argon2__parallelism": shared_settings.ARGON2_PARALLELISM,
+}
+pwd_context = CryptContext(
+    schemes=["argon2"],
+    deprecated="auto",
+    **{chave: valor for chave, valor in _custos.items() if valor},
+)
 MAX_PASSWORD_LENGTH = 72
 
 
@@ -0,0 +1,130 @@
+"""
+Gatilhos e medicações de um episódio, gravados sem passar pelas coleções
+do ORM.
+
+`consulta_associacoes` confere numa única query (UNION ALL) que os IDs
+pedidos existem e pertencem ao usuário, e já traz as colunas que a
+resposta mostra; `montar_associacoes` transforma essas linhas em objetos
+persistentes da sessão sem novo SELECT. As linhas de `episodio_gatilho` e
+`episodio_medicacao` são inseridas com um executemany por tabela
+(`linhas_associacao`), num INSERT de várias linhas.
+
+Na edição, `comandos_sincronizacao` calcula a diferença no próprio banco:
+um DELETE das associações que saíram e um INSERT ... SELECT das que
+entraram, então trocar um gatilho de um episódio com vinte toca uma linha.
+"""
+from sqlalchemy import (
+    delete, exists, insert, literal, null, select, union_all,
+)
+from sqlalchemy.orm import make_transient_to_detached
+
+from source.gatilho.model_gatilho import Gatilho
+from source.medicacao.model_medicacao import Medicacao
+
+from .model_episodio import episodio_gatilho, episodio_medicacao
+
+# Coluna da tabela associativa com o ID de cada lado
+ASSOCIACOES = {
+    "gatilhos": (episodio_gatilho, "gatilho_id", Gatilho),
+    "medicacoes": (episodio_medicacao, "medicacao_id", Medicacao),
+}
+
+
+class AssociacaoInvalida(ValueError):
+    """IDs de gatilho/medicação inexistentes ou de outro usuário."""
+
+    def __init__(self, ausentes: dict):
+        self.ausentes = ausentes
+        detalhes = "; ".join(f"{campo}: {sorted(ids)}"
+                             for campo, ids in ausentes.items())
+        super().__init__(f"IDs não encontrados para o usuário ({detalhes})")
+
+
+def ids_unicos(ids) -> list[int]:
+    """IDs sem repetição, na ordem em que vieram (None vira lista vazia)."""
+    return list(dict.fromkeys(ids or []))
+
+
+def consulta_associacoes(usuario_id: int, gatilhos, medicacoes):
+    """SELECT único dos gatilhos e medicações pedidos, ou None sem IDs."""
+    partes = []
+    if gatilhos:
+        partes.append(
+            select(literal("gatilhos").label("campo"), Gatilho.id,
+                   Gatilho.usuario_id, Gatilho.nome,
+                   null().label("dosagem"), Gatilho.data_criacao)
+            .where(Gatilho.id.in_(gatilhos),
+                   Gatilho.usuario_id == usuario_id))
+    if medicacoes:
+        partes.append(
+            select(literal("medicacoes").label("campo"), Medicacao.id,
+                   Medicacao.usuario_id, Medicacao.nome, Medicacao.dosagem,
+                   Medicacao.data_criacao)
+            .where(Medicacao.id.in_(medicacoes),
+                   Medicacao.usuario_id == usuario_id))
+    if not partes:
+        return None
+    return partes[0] if len(partes) == 1 else union_all(*partes)
+
+
+def consulta_nomes(usuario_id: int):
+    """`(campo, id, nome)` de todos os gatilhos e medicações do usuário."""
+    return union_all(*(
+        select(literal(campo).label("campo"), modelo.id, modelo.nome)
+        .where(modelo.usuario_id == usuario_id)
+        for campo, (_, _, modelo) in ASSOCIACOES.items()
+    ))
+
+
+def montar_associacoes(session, linhas, pedidos: dict) -> dict:
+    """
+    `{campo: [objetos]}` na ordem pedida a partir das linhas da consulta.
+
+    `session` é a `Session` síncrona (numa `AsyncSession`, `sync_session`):
+    os objetos entram no identity map com `merge(load=False)`, sem I/O.
+    Levanta `AssociacaoInvalida` se algum ID pedido não veio.
+    """
+    encontrados = {campo: {} for campo in pedidos}
+    for linha in linhas:
+        modelo = ASSOCIACOES[linha.campo][2]
+        valores = {"id": linha.id, "usuario_id": linha.usuario_id,
+                   "nome": linha.nome, "data_criacao": linha.data_criacao}
+        if modelo is Medicacao:
+            valores["dosagem"] = linha.dosagem
+        objeto = modelo(**valores)
+        make_transient_to_detached(objeto)
+        encontrados[linha.campo][linha.id] = session.merge(objeto, load=False)
+
+    ausentes = {campo: set(ids) - encontrados[campo].keys()
+                for campo, ids in pedidos.items()}
+    ausentes = {campo: ids for campo, ids in ausentes.items() if ids}
+    if ausentes:
+        raise AssociacaoInvalida(ausentes)
+    return {campo: [encontrados[campo][i] for i in ids]
+            for campo, ids in pedidos.items()}
+
+
+def linhas_associacao(campo: str, episodio_id: int, ids) -> list[dict]:
+    """Parâmetros do executemany na tabela associativa de `campo`."""
+    coluna = ASSOCIACOES[campo][1]
+    return [{"episodio_id": episodio_id, coluna: i} for i in ids]
+
+
+def comandos_sincronizacao(campo: str, episodio_id: int, usuario_id: int,
+                           ids) -> list:
+    """DELETE e INSERT que levam as associações de `campo` a `ids`."""
+    tabela, coluna, modelo = ASSOCIACOES[campo]
+    relacionado = tabela.c[coluna]
+    remover = delete(tabela).where(tabela.c.episodio_id == episodio_id)
+    if not ids:
+        return [remover]
+    remover = remover.where(relacionado.not_in(ids))
+    # Só os pedidos que são do usuário e ainda não estão associados
+    novos = (
+        select(literal(episodio_id), modelo.id)
+        .where(modelo.id.in_(ids), modelo.usuario_id == usuario_id,
+               ~exists().where(tabela.c.episodio_id == episodio_id,
+                               relacionado == modelo.id))
+    )
+    inserir = insert(tabela).from_select(["episodio_id", coluna], novos)
+    return [remover, inserir]
@@ -0,0 +1,204 @@
+"""
+Controller assíncrono para Episódios (modo `DB_ASYNC`).
+
+Mesmas regras de `controller_episodio`, sobre `AsyncSession`. Como não
+há lazy loading fora de um `await`, gatilhos e medicações são sempre
+carregados junto (selectinload) ou atribuídos antes do commit.
+"""
+from typing import Optional, List, Union
+from datetime import date
+
+from sqlalchemy import delete, func, select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm.attributes import set_committed_value
+
+from .associacoes_episodio import (
+    ASSOCIACOES, AssociacaoInvalida, comandos_sincronizacao,
+    consulta_associacoes, ids_unicos, linhas_associacao, montar_associacoes,
+)
+from .controller_episodio import CAMPOS_ANULAVEIS, CARREGA_ASSOCIACOES
+from .model_episodio import Episodio
+from .paginacao_episodio import (
+    ORDEM_LISTAGEM, episodio_count_cache, filtros_listagem,
+)
+
+
+# pylint: disable=too-many-arguments, too-many-positional-arguments
+async def create_episodio(
+    db: AsyncSession,
+    usuario_id: int,
+    data: Union[str, date],
+    intensidade: int,
+    duracao: int = None,
+    observacoes: str = None,
+    gatilhos: Optional[List[int]] = None,
+    medicacoes: Optional[List[int]] = None,
+):
+    """Mesma transação única de `controller_episodio.create_episodio`."""
+    # Converter string para date se necessário
+    if isinstance(data, str):
+        data = date.fromisoformat(data)
+
+    pedidos = {"gatilhos": ids_unicos(gatilhos),
+               "medicacoes": ids_unicos(medicacoes)}
+    consulta = consulta_associacoes(usuario_id, **pedidos)
+    linhas = (await db.execute(consulta)).all() if consulta is not None else []
+    associacoes = montar_associacoes(db.sync_session, linhas, pedidos)
+
+    episodio = Episodio(
+        usuario_id=usuario_id,
+        data=data,
+        intensidade=intensidade,
+        duracao=duracao,
+        observacoes=observacoes,
+    )
+    db.add(episodio)
+    await db.flush()
+
+    for campo, objetos in associacoes.items():
+        if objetos:
+            await db.execute(
+                ASSOCIACOES[campo][0].insert(),
+                linhas_associacao(campo, episodio.id, pedidos[campo]))
+        set_committed_value(episodio, campo, objetos)
+
+    await db.commit()
+    episodio_count_cache.invalidate(usuario_id)
+    return episodio
+
+
+async def get_episodios_usuario(
+    db: AsyncSession,
+    usuario_id: int,
+    skip: int = 0,
+    limit: int = 10,
+    data_inicio: Optional[date] = None,
+    data_fim: Optional[date] = None,
+    cursor: Optional[str] = None,
+):
+    """Mesma ordenação e cursor de `controller_episodio`."""
+    query = (
+        select(Episodio)
+        .options(*CARREGA_ASSOCIACOES)
+        .where(*filtros_listagem(usuario_id, data_inicio, data_fim, cursor))
+        .order_by(*ORDEM_LISTAGEM)
+    )
+    if skip and not cursor:
+        query = query.offset(skip)
+    return list(await db.scalars(query.limit(limit)))
+
+
+async def count_episodios_usuario(
+    db: AsyncSession,
+    usuario_id: int,
+    data_inicio: Optional[date] = None,
+    data_fim: Optional[date] = None,
+) -> int:
+    filtro = (data_inicio, data_fim)
+    total = episodio_count_cache.get(usuario_id, filtro)
+    if total is None:
+        total = await db.scalar(
+            select(func.count(Episodio.id))
+            .where(*filtros_listagem(usuario_id, data_inicio, data_fim)))
+        episodio_count_cache.set(usuario_id, filtro, total)
+    return total
+
+
+async def get_episodio(db: AsyncSession, episodio_id: int, usuario_id: int):
+    return await db.scalar(
+        select(Episodio)
+        .options(*CARREGA_ASSOCIACOES)
+        .where(Episodio.id == episodio_id, Episodio.usuario_id == usuario_id)
+    )
+
+
+async def update_episodio(db: AsyncSession, episodio: Episodio,
+                          gatilhos=None, medicacoes=None, **kwargs):
+    """Mesma atualização por diferença de `controller_episodio`."""
+    for field, value in kwargs.items():
+        if hasattr(episodio, field) and value is not None:
+            setattr(episodio, field, value)
+
+    pedidos = {campo: ids_unicos(ids) for campo, ids in
+               (("gatilhos", gatilhos), ("medicacoes", medicacoes))
+               if ids is not None}
+    if pedidos:
+        consulta = consulta_associacoes(episodio.usuario_id,
+                                        pedidos.get("gatilhos"),
+                                        pedidos.get("medicacoes"))
+        linhas = ((await db.execute(consulta)).all()
+                  if consulta is not None else [])
+        associacoes = montar_associacoes(db.sync_session, linhas, pedidos)
+        for campo, ids in pedidos.items():
+            for comando in comandos_sincronizacao(
+                    campo, episodio.id, episodio.usuario_id, ids):
+                await db.execute(comando)
+            set_committed_value(episodio, campo, associacoes[campo])
+
+    await db.commit()
+    episodio_count_cache.invalidate(episodio.usuario_id)
+    return episodio
+
+
+
+async def patch_episodio(db: AsyncSession, episodio_id: int, usuario_id: int,
+                         **campos) -> dict | None:
+    """
+    Altera só os campos enviados sem carregar o episódio: um UPDATE
+    restrito ao dono (o rowcount decide o 404) e, para `gatilhos`/
+    `medicacoes`, a sincronização por diferença. Campos nulos são
+    ignorados, exceto `duracao` e `observacoes`, que ficam vazios.
+    Devolve só o que mudou, ou None se o episódio não é do usuário.
+    """
+    filtro = (Episodio.id == episodio_id, Episodio.usuario_id == usuario_id)
+    pedidos = {campo: ids_unicos(campos.pop(campo)) for campo in ASSOCIACOES
+               if campos.get(campo) is not None}
+    valores = {campo: valor for campo, valor in campos.items()
+               if valor is not None or campo in CAMPOS_ANULAVEIS}
+
+    if valores:
+        resultado = await db.execute(
+            update(Episodio).where(*filtro).values(**valores))
+        encontrado = resultado.rowcount > 0
+    else:
+        encontrado = await db.scalar(
+            select(Episodio.id).where(*filtro)) is not None
+    if not encontrado:
+        await db.rollback()
+        return None
+
+    if pedidos:
+        consulta = consulta_associacoes(usuario_id, pedidos.get("gatilhos"),
+                                        pedidos.get("medicacoes"))
+        linhas = ((await db.execute(consulta)).all()
+                  if consulta is not None else [])
+        try:
+            montar_associacoes(db.sync_session, linhas, pedidos)
+        except AssociacaoInvalida:
+            await db.rollback()
+            raise
+        for campo, ids in pedidos.items():
+            for comando in comandos_sincronizacao(
+                    campo, episodio_id, usuario_id, ids):
+                await db.execute(comando)
+
+    await db.commit()
+    if "data" in valores:
+        episodio_count_cache.invalidate(usuario_id)
+    return {"id": episodio_id, **valores, **pedidos}
+
+
+async def delete_episodio_usuario(db: AsyncSession, episodio_id: int,
+                                  usuario_id: int) -> bool:
+    """
+    DELETE direto do episódio do usuário; as associações saem por
+    ON DELETE CASCADE. False se nada foi removido.
+    """
+    resultado = await db.execute(
+        delete(Episodio)
+        .where(Episodio.id == episodio_id, Episodio.usuario_id == usuario_id))
+    await db.commit()
+    if resultado.rowcount == 0:
+        return False
+    episodio_count_cache.invalidate(usuario_id)
+    return True
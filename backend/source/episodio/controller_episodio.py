@@ -1,12 +1,27 @@
 from typing import Optional, List, Union
 from datetime import date
 
-from sqlalchemy.orm import Session, joinedload
+from sqlalchemy import delete, func, select, update
+from sqlalchemy.orm import Session, selectinload
+from sqlalchemy.orm.attributes import set_committed_value
+
+from .associacoes_episodio import (
+    ASSOCIACOES, AssociacaoInvalida, comandos_sincronizacao,
+    consulta_associacoes, ids_unicos, linhas_associacao, montar_associacoes,
+)
+from .model_episodio import Episodio
+from .paginacao_episodio import (
+    ORDEM_LISTAGEM, episodio_count_cache, filtros_listagem,
+)
 
-from source.gatilho.model_gatilho import Gatilho
-from source.medicacao.model_medicacao import Medicacao
+# Colunas que um PATCH pode esvaziar enviando null
+CAMPOS_ANULAVEIS = frozenset({"duracao", "observacoes"})
 
-from .model_episodio import Episodio
+# Um SELECT ... IN por coleção para a página inteira; com joinedload, um
+# episódio com 5 gatilhos e 4 medicações viraria 20 linhas (e o LIMIT
+# forçaria uma subquery)
+CARREGA_ASSOCIACOES = (selectinload(Episodio.gatilhos),
+                       selectinload(Episodio.medicacoes))
 
 
 # pylint: disable=too-many-arguments, too-many-positional-arguments
@@ -20,10 +35,24 @@ def create_episodio(
     gatilhos: Optional[List[int]] = None,
     medicacoes: Optional[List[int]] = None,
 ):
+    """
+    Cria o episódio e suas associações numa única transação.
+
+    Os IDs de `gatilhos` e `medicacoes` são conferidos numa query (têm de
+    ser do usuário; senão `AssociacaoInvalida`), o INSERT do episódio sai
+    no flush e cada tabela associativa recebe um executemany. As coleções
+    do objeto devolvido já vêm preenchidas, sem refresh após o commit.
+    """
     # Converter string para date se necessário
     if isinstance(data, str):
         data = date.fromisoformat(data)
 
+    pedidos = {"gatilhos": ids_unicos(gatilhos),
+               "medicacoes": ids_unicos(medicacoes)}
+    consulta = consulta_associacoes(usuario_id, **pedidos)
+    linhas = db.execute(consulta).all() if consulta is not None else []
+    associacoes = montar_associacoes(db, linhas, pedidos)
+
     episodio = Episodio(
         usuario_id=usuario_id,
         data=data,
@@ -32,25 +61,17 @@ def create_episodio(
         observacoes=observacoes
     )
     db.add(episodio)
-    db.commit()
-    db.refresh(episodio)
+    db.flush()  # INSERT do episódio (gera o id) na mesma transação
 
-    if gatilhos:
-        gatilhos_objs = (
-            db.query(Gatilho)
-            .filter(Gatilho.id.in_(gatilhos))
-            .all()
-        )
-        episodio.gatilhos.extend(gatilhos_objs)
-    if medicacoes:
-        medicacoes_objs = (
-            db.query(Medicacao)
-            .filter(Medicacao.id.in_(medicacoes))
-            .all()
-        )
-        episodio.medicacoes.extend(medicacoes_objs)
+    for campo, objetos in associacoes.items():
+        if objetos:
+            db.execute(ASSOCIACOES[campo][0].insert(),
+                       linhas_associacao(campo, episodio.id, pedidos[campo]))
+        # Coleção marcada como carregada com o que acabou de ser gravado
+        set_committed_value(episodio, campo, objetos)
 
     db.commit()
+    episodio_count_cache.invalidate(usuario_id)
     return episodio
 
 
@@ -61,44 +82,145 @@ def get_episodios_usuario(
     limit: int = 10,
     data_inicio: Optional[date] = None,
     data_fim: Optional[date] = None,
+    cursor: Optional[str] = None,
 ):
+    """
+    Episódios do usuário do mais recente ao mais antigo, por `(data, id)`.
+
+    Com `cursor` (ver `paginacao_episodio`) a página começa logo após o
+    episódio codificado nele; `skip` continua aceito, mas fica mais lento
+    a cada página. Levanta ValueError para um cursor inválido.
+    """
     query = (
         db.query(Episodio)
-        .options(joinedload(Episodio.gatilhos),
-                 joinedload(Episodio.medicacoes))
-        .filter(Episodio.usuario_id == usuario_id)
-    )
-    if data_inicio:
-        query = query.filter(Episodio.data >= data_inicio)
-    if data_fim:
-        query = query.filter(Episodio.data <= data_fim)
-    return (
-        query
-        .order_by(Episodio.data.desc())
-        .offset(skip).limit(limit)
-        .all()
+        .options(*CARREGA_ASSOCIACOES)
+        .filter(*filtros_listagem(usuario_id, data_inicio, data_fim, cursor))
+        .order_by(*ORDEM_LISTAGEM)
     )
+    if skip and not cursor:
+        query = query.offset(skip)
+    return query.limit(limit).all()
+
+
+def count_episodios_usuario(
+    db: Session,
+    usuario_id: int,
+    data_inicio: Optional[date] = None,
+    data_fim: Optional[date] = None,
+) -> int:
+    """Total de episódios do filtro, servido do cache quando possível."""
+    filtro = (data_inicio, data_fim)
+    total = episodio_count_cache.get(usuario_id, filtro)
+    if total is None:
+        total = (
+            db.query(func.count(Episodio.id))
+            .filter(*filtros_listagem(usuario_id, data_inicio, data_fim))
+            .scalar()
+        )
+        episodio_count_cache.set(usuario_id, filtro, total)
+    return total
 
 
 def get_episodio(db: Session, episodio_id: int, usuario_id: int):
     return (
         db.query(Episodio)
-        .options(joinedload(Episodio.gatilhos),
-                 joinedload(Episodio.medicacoes))
+        .options(*CARREGA_ASSOCIACOES)
         .filter(Episodio.id == episodio_id, Episodio.usuario_id == usuario_id)
         .first()
     )
 
 
-def update_episodio(db: Session, episodio: Episodio, **kwargs):
+def update_episodio(db: Session, episodio: Episodio, gatilhos=None,
+                    medicacoes=None, **kwargs):
+    """
+    Atualiza os campos não nulos; `gatilhos`/`medicacoes` (listas de IDs)
+    substituem as associações com um DELETE e um INSERT por tabela, que só
+    tocam as linhas que mudaram. Levanta `AssociacaoInvalida` para IDs que
+    não são do usuário.
+    """
     for field, value in kwargs.items():
         if hasattr(episodio, field) and value is not None:
             setattr(episodio, field, value)
+
+    pedidos = {campo: ids_unicos(ids) for campo, ids in
+               (("gatilhos", gatilhos), ("medicacoes", medicacoes))
+               if ids is not None}
+    if pedidos:
+        consulta = consulta_associacoes(episodio.usuario_id,
+                                        pedidos.get("gatilhos"),
+                                        pedidos.get("medicacoes"))
+        linhas = db.execute(consulta).all() if consulta is not None else []
+        associacoes = montar_associacoes(db, linhas, pedidos)
+        for campo, ids in pedidos.items():
+            for comando in comandos_sincronizacao(
+                    campo, episodio.id, episodio.usuario_id, ids):
+                db.execute(comando)
+            set_committed_value(episodio, campo, associacoes[campo])
+
     db.commit()
-    db.refresh(episodio)
+    # A data pode ter mudado: totais filtrados por período ficam velhos
+    episodio_count_cache.invalidate(episodio.usuario_id)
     return episodio
 
 
-def delete_episodio(db: Session, episodio: Episodio):
-    db.delete(episodio)
+
+def patch_episodio(db: Session, episodio_id: int, usuario_id: int,
+                   **campos) -> dict | None:
+    """
+    Altera só os campos enviados sem carregar o episódio: um UPDATE
+    restrito ao dono (o rowcount decide o 404) e, para `gatilhos`/
+    `medicacoes`, a sincronização por diferença. Campos nulos são
+    ignorados, exceto `duracao` e `observacoes`, que ficam vazios.
+    Devolve só o que mudou, ou None se o episódio não é do usuário.
+    """
+    filtro = (Episodio.id == episodio_id, Episodio.usuario_id == usuario_id)
+    pedidos = {campo: ids_unicos(campos.pop(campo)) for campo in ASSOCIACOES
+               if campos.get(campo) is not None}
+    valores = {campo: valor for campo, valor in campos.items()
+               if valor is not None or campo in CAMPOS_ANULAVEIS}
+
+    if valores:
+        resultado = db.execute(
+            update(Episodio).where(*filtro).values(**valores))
+        encontrado = resultado.rowcount > 0
+    else:
+        encontrado = db.scalar(
+            select(Episodio.id).where(*filtro)) is not None
+    if not encontrado:
+        db.rollback()
+        return None
+
+    if pedidos:
+        consulta = consulta_associacoes(usuario_id, pedidos.get("gatilhos"),
+                                        pedidos.get("medicacoes"))
+        linhas = db.execute(consulta).all() if consulta is not None else []
+        try:
+            montar_associacoes(db, linhas, pedidos)
+        except AssociacaoInvalida:
+            db.rollback()
+            raise
+        for campo, ids in pedidos.items():
+            for comando in comandos_sincronizacao(
+                    campo, episodio_id, usuario_id, ids):
+                db.execute(comando)
+
+    db.commit()
+    if "data" in valores:
+        episodio_count_cache.invalidate(usuario_id)
+    return {"id": episodio_id, **valores, **pedidos}
+
+
+def delete_episodio_usuario(db: Session, episodio_id: int,
+                            usuario_id: int) -> bool:
+    """
+    DELETE direto do episódio do usuário; as associações saem por
+    ON DELETE CASCADE. False se nada foi removido.
+    """
+    resultado = db.execute(
+        delete(Episodio)
+        .where(Episodio.id == episodio_id, Episodio.usuario_id == usuario_id))
     db.commit()
+    if resultado.rowcount == 0:
+        return False
+    episodio_count_cache.invalidate(usuario_id)
+    return True
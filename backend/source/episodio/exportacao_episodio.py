@@ -0,0 +1,178 @@
+"""
+Exportação do diário completo em CSV, JSON lines ou JSON, em streaming.
+
+A listagem paginada materializa os objetos ORM e os modelos Pydantic da
+página inteira; aqui os episódios saem de um cursor no servidor
+(`yield_per`, que liga `stream_results`) em partes de
+`EPISODIO_EXPORT_YIELD_PER` linhas, e cada parte é serializada e enviada
+antes de a próxima ser lida. A memória fica constante qualquer que seja o
+tamanho do histórico.
+
+Com o cursor aberto a conexão não aceita outra consulta, então os nomes
+dos gatilhos e medicações são carregados antes (`nomes_por_id`, uma
+consulta), e cada episódio traz os IDs associados agregados na própria
+linha (`GROUP_CONCAT`). O CSV usa as colunas e o separador `;` da
+importação, então um arquivo exportado pode ser importado de volta.
+
+`Exportador` também comprime em gzip à medida que gera, quando o cliente
+aceita (`Accept-Encoding: gzip`).
+"""
+import csv
+import io
+import json
+import zlib
+from collections.abc import AsyncIterator, Iterator
+
+from sqlalchemy import func, select
+
+from .associacoes_episodio import ASSOCIACOES, consulta_nomes
+from .model_episodio import Episodio
+from .paginacao_episodio import filtros_listagem
+
+FORMATOS = {
+    "csv": "text/csv; charset=utf-8",
+    "ndjson": "application/x-ndjson",
+    "json": "application/json",
+}
+COLUNAS = ("data", "intensidade", "duracao", "observacoes", "gatilhos",
+           "medicacoes")
+
+
+def aceita_gzip(accept_encoding: str) -> bool:
+    """Se o `Accept-Encoding` do cliente aceita gzip (q=0 recusa)."""
+    for item in accept_encoding.lower().split(","):
+        nome, _, parametros = item.partition(";")
+        if nome.strip() == "gzip":
+            qualidade = parametros.replace(" ", "").removeprefix("q=")
+            try:
+                return not parametros or float(qualidade) > 0
+            except ValueError:
+                return True
+    return False
+
+
+def cabecalhos(formato: str, gzip: bool) -> dict:
+    """Cabeçalhos da resposta: anexo para download e codificação."""
+    cabecalho = {
+        "Content-Disposition":
+            f'attachment; filename="diario-enxaqueca.{formato}"',
+        "Vary": "Accept-Encoding",
+    }
+    if gzip:
+        cabecalho["Content-Encoding"] = "gzip"
+    return cabecalho
+
+
+def nomes_por_id(db, usuario_id: int) -> dict:
+    """`{campo: {id: nome}}` dos gatilhos e medicações do usuário."""
+    nomes = {campo: {} for campo in ASSOCIACOES}
+    for linha in db.execute(consulta_nomes(usuario_id)):
+        nomes[linha.campo][linha.id] = linha.nome
+    return nomes
+
+
+def consulta_exportacao(usuario_id: int, data_inicio=None, data_fim=None,
+                        yield_per: int = 1000):
+    """Episódios em ordem cronológica com os IDs associados agregados."""
+    agregados = [
+        select(func.group_concat(tabela.c[coluna]))
+        .where(tabela.c.episodio_id == Episodio.id)
+        .scalar_subquery().label(campo)
+        for campo, (tabela, coluna, _) in ASSOCIACOES.items()
+    ]
+    return (
+        select(Episodio.data, Episodio.intensidade, Episodio.duracao,
+               Episodio.observacoes, *agregados)
+        .where(*filtros_listagem(usuario_id, data_inicio, data_fim))
+        .order_by(Episodio.data, Episodio.id)
+        .execution_options(yield_per=yield_per)
+    )
+
+
+def _ids(valor) -> list[int]:
+    if not valor:
+        return []
+    if isinstance(valor, bytes):
+        # O MySQL devolve GROUP_CONCAT de inteiros como string binária
+        valor = valor.decode()
+    return sorted(int(parte) for parte in valor.split(","))
+
+
+class Exportador:
+    """Serializa as partes do cursor em `formato`, com gzip opcional."""
+
+    def __init__(self, formato: str, nomes: dict, gzip: bool = False):
+        self.formato = formato
+        self.nomes = nomes
+        self.primeira = True
+        # wbits=31: cabeçalho e rodapé gzip em vez de zlib
+        self.compressor = (zlib.compressobj(6, zlib.DEFLATED, 31)
+                           if gzip else None)
+
+    def _saida(self, texto: str) -> bytes:
+        dados = texto.encode()
+        if self.compressor is None:
+            return dados
+        return self.compressor.compress(dados)
+
+    def _registro(self, linha) -> dict:
+        registro = {
+            "data": linha.data.isoformat(),
+            "intensidade": linha.intensidade,
+            "duracao": linha.duracao,
+            "observacoes": linha.observacoes,
+        }
+        for campo, nomes in self.nomes.items():
+            registro[campo] = [nomes[i] for i in _ids(getattr(linha, campo))
+                               if i in nomes]
+        return registro
+
+    def inicio(self) -> bytes:
+        if self.formato == "csv":
+            return self._saida(",".join(COLUNAS) + "\r\n")
+        if self.formato == "json":
+            return self._saida("[")
+        return b""
+
+    def parte(self, linhas) -> bytes:
+        """Bytes de uma parte do cursor (vazio até o compressor encher)."""
+        registros = [self._registro(linha) for linha in linhas]
+        if self.formato == "csv":
+            buffer = io.StringIO()
+            escritor = csv.writer(buffer)
+            for registro in registros:
+                escritor.writerow(
+                    ";".join(valor) if isinstance(valor, list) else valor
+                    for valor in (registro[coluna] for coluna in COLUNAS))
+            return self._saida(buffer.getvalue())
+        textos = [json.dumps(registro, ensure_ascii=False)
+                  for registro in registros]
+        if self.formato == "ndjson":
+            return self._saida("".join(texto + "\n" for texto in textos))
+        separador = "" if self.primeira else ","
+        self.primeira = False
+        return self._saida(separador + ",".join(textos))
+
+    def fim(self) -> bytes:
+        dados = self._saida("]" if self.formato == "json" else "")
+        if self.compressor is not None:
+            dados += self.compressor.flush()
+        return dados
+
+
+def exportar(db, exportador: Exportador, consulta) -> Iterator[bytes]:
+    """Corpo da resposta a partir do cursor da `Session` síncrona."""
+    yield exportador.inicio()
+    for linhas in db.execute(consulta).partitions():
+        yield exportador.parte(linhas)
+    yield exportador.fim()
+
+
+async def exportar_async(db, exportador: Exportador,
+                         consulta) -> AsyncIterator[bytes]:
+    """Corpo da resposta a partir do cursor da `AsyncSession`."""
+    yield exportador.inicio()
+    resultado = await db.stream(consulta)
+    async for linhas in resultado.partitions():
+        yield exportador.parte(linhas)
+    yield exportador.fim()
@@ -0,0 +1,318 @@
+"""
+Importação em lote de episódios (migração de diários em papel ou de
+outros apps).
+
+O corpo chega em JSON lines ou CSV (`Content-Type: text/csv`, cabeçalho
+com `data,intensidade,duracao,observacoes,gatilhos,medicacoes`) e é lido
+em pedaços, à medida que chega: `linhas_texto` decodifica o stream e
+`registros` gera uma linha lógica por vez, sem juntar o corpo inteiro.
+Linhas e registros CSV maiores que `EPISODIO_IMPORT_MAX_LINE_CHARS`
+(inclusive uma aspa sem fechamento) viram erro daquela linha, e a leitura
+continua na seguinte.
+No CSV, gatilhos e medicações vêm numa célula separados por `;` ou `|`;
+no JSON lines, como lista de nomes.
+
+Os registros válidos são gravados em lotes de `EPISODIO_IMPORT_BATCH_SIZE`
+por `gravar_lote`, numa transação por lote:
+
+- os nomes de gatilhos e medicações do usuário são carregados uma vez
+  (`carregar_nomes`) e comparados sem diferenciar maiúsculas; os que
+  faltam são criados num INSERT multi-linha por tabela;
+- um episódio é duplicado quando já existe outro do usuário com a mesma
+  `(data, intensidade, hash de observacoes)`, no banco (uma consulta por
+  lote, pelas datas do lote) ou antes no próprio arquivo; reenviar um
+  arquivo interrompido só grava o que faltou;
+- os episódios novos saem num INSERT multi-linha, e as associações num
+  executemany por tabela.
+
+Um lote de 500 episódios custa no máximo 9 statements, em vez dos quatro
+por episódio do `POST /api/episodios/`.
+"""
+import codecs
+import csv
+import hashlib
+import json
+from collections.abc import AsyncIterator
+
+from pydantic import ValidationError
+from sqlalchemy import insert, select
+
+from .associacoes_episodio import (
+    ASSOCIACOES, consulta_nomes, linhas_associacao,
+)
+from .model_episodio import Episodio
+from .schemas_episodio import EpisodioImport
+
+CSV_CONTENT_TYPES = ("text/csv", "application/csv")
+
+
+def formato_csv(content_type: str) -> bool:
+    return content_type.split(";")[0].strip() in CSV_CONTENT_TYPES
+
+
+class RegistroInvalido(ValueError):
+    """Linha ou registro que nem chega à validação (tamanho, aspas)."""
+
+
+async def linhas_texto(partes: AsyncIterator[bytes],
+                       max_caracteres: int) -> AsyncIterator:
+    """
+    Linhas do corpo decodificadas à medida que os pedaços chegam.
+
+    Cada pedaço é dividido uma vez; a linha em andamento fica em partes
+    até o `\\n`. Uma linha maior que `max_caracteres` é descartada sem
+    ser acumulada e gera um `RegistroInvalido` no lugar.
+    """
+    decodificador = codecs.getincrementaldecoder("utf-8-sig")()
+    pedacos: list[str] = []
+    tamanho = 0
+    longa = False
+
+    def acumular(trecho: str) -> None:
+        nonlocal tamanho, longa, pedacos
+        tamanho += len(trecho)
+        if longa or tamanho > max_caracteres:
+            longa, pedacos = True, []
+        elif trecho:
+            pedacos.append(trecho)
+
+    def fechar():
+        nonlocal tamanho, longa, pedacos
+        linha = (RegistroInvalido(f"linha com mais de {max_caracteres} "
+                                  "caracteres")
+                 if longa else "".join(pedacos).rstrip("\r"))
+        pedacos, tamanho, longa = [], 0, False
+        return linha
+
+    async for parte in partes:
+        *completas, resto = decodificador.decode(parte).split("\n")
+        for trecho in completas:
+            acumular(trecho)
+            yield fechar()
+        acumular(resto)
+    acumular(decodificador.decode(b"", final=True))
+    if pedacos or longa:
+        yield fechar()
+
+
+async def _registros_csv(linhas: AsyncIterator, max_caracteres: int):
+    cabecalho = None
+    delimitador = ","
+    pendente: list[str] = []
+    aberto = False  # paridade das aspas do registro pendente
+    tamanho = inicio = numero = 0
+    async for linha in linhas:
+        numero += 1
+        if isinstance(linha, RegistroInvalido):
+            # Ressincroniza: o registro pendente também se perde
+            pendente, aberto, tamanho = [], False, 0
+            yield numero, linha
+            continue
+        if not pendente:
+            inicio = numero
+        pendente.append(linha + "\n")
+        tamanho += len(linha) + 1
+        aberto ^= linha.count('"') % 2 == 1
+        # Aspas abertas: a célula continua na próxima linha física
+        if aberto:
+            if tamanho > max_caracteres:
+                pendente, aberto, tamanho = [], False, 0
+                yield inicio, RegistroInvalido(
+                    "campo entre aspas sem fechamento")
+            continue
+        texto, pendente, tamanho = "".join(pendente), [], 0
+        if not texto.strip():
+            continue
+        if cabecalho is None:
+            if ";" in texto and "," not in texto:
+                delimitador = ";"  # CSV exportado por planilha em pt-BR
+            cabecalho = [campo.strip().lower() for campo in next(
+                csv.reader([texto], delimiter=delimitador))]
+            continue
+        valores = next(csv.reader([texto], delimiter=delimitador))
+        yield inicio, {
+            campo: valor.strip() for campo, valor in zip(cabecalho, valores)
+            if campo and valor.strip()
+        }
+    if pendente:
+        yield inicio, RegistroInvalido("campo entre aspas sem fechamento")
+
+
+async def registros(linhas: AsyncIterator, csv_: bool,
+                    max_caracteres: int) -> AsyncIterator[tuple[int, dict]]:
+    """
+    Gera `(número da linha, campos)`; linhas ilegíveis geram `{}` e as
+    que nem podem ser lidas (tamanho, aspas), um `RegistroInvalido`.
+    """
+    if csv_:
+        async for registro in _registros_csv(linhas, max_caracteres):
+            yield registro
+        return
+    numero = 0
+    async for linha in linhas:
+        numero += 1
+        if isinstance(linha, RegistroInvalido):
+            yield numero, linha
+            continue
+        if not linha.strip():
+            continue
+        try:
+            registro = json.loads(linha)
+        except json.JSONDecodeError:
+            registro = {}
+        yield numero, registro if isinstance(registro, dict) else {}
+
+
+def _erro_validacao(exc: ValidationError) -> str:
+    erro = exc.errors()[0]
+    campo = ".".join(str(parte) for parte in erro["loc"])
+    return f"{campo}: {erro['msg']}" if campo else erro["msg"]
+
+
+def hash_observacoes(observacoes: str | None) -> bytes:
+    return hashlib.blake2b((observacoes or "").strip().encode(),
+                           digest_size=16).digest()
+
+
+def chave(data, intensidade: int, observacoes: str | None) -> tuple:
+    """Identidade de um episódio para a deduplicação."""
+    return data, intensidade, hash_observacoes(observacoes)
+
+
+def carregar_nomes(db, usuario_id: int) -> dict:
+    """`{campo: {nome normalizado: id}}` dos gatilhos e medicações."""
+    nomes = {campo: {} for campo in ASSOCIACOES}
+    for linha in db.execute(consulta_nomes(usuario_id)):
+        nomes[linha.campo][linha.nome.casefold()] = linha.id
+    return nomes
+
+
+def _criar_nomes(db, usuario_id: int, campo: str, ids: dict,
+                 novos: list[str]) -> None:
+    modelo = ASSOCIACOES[campo][2]
+    db.execute(insert(modelo.__table__).values(
+        [{"usuario_id": usuario_id, "nome": nome} for nome in novos]))
+    for id_, nome in db.execute(
+            select(modelo.id, modelo.nome)
+            .where(modelo.usuario_id == usuario_id, modelo.nome.in_(novos))):
+        ids[nome.casefold()] = id_
+
+
+def _chaves_existentes(db, usuario_id: int, datas) -> dict:
+    """`chave -> id` dos episódios do usuário nas datas dadas."""
+    linhas = db.execute(
+        select(Episodio.id, Episodio.data, Episodio.intensidade,
+               Episodio.observacoes)
+        .where(Episodio.usuario_id == usuario_id, Episodio.data.in_(datas))
+    )
+    return {chave(linha.data, linha.intensidade, linha.observacoes): linha.id
+            for linha in linhas}
+
+
+# pylint: disable=too-many-locals
+def gravar_lote(db, usuario_id: int, lote: list[EpisodioImport],
+                nomes: dict, vistos: set) -> dict:
+    """
+    Grava um lote numa transação e devolve as contagens do lote.
+
+    `nomes` (de `carregar_nomes`) e `vistos` (chaves já lidas no arquivo)
+    são atualizados a cada lote.
+    """
+    resultado = {"importados": 0, "duplicados": 0,
+                 "gatilhos_criados": 0, "medicacoes_criadas": 0}
+    existentes = _chaves_existentes(db, usuario_id,
+                                    {ep.data for ep in lote})
+    novos = []
+    for ep in lote:
+        identidade = chave(ep.data, ep.intensidade, ep.observacoes)
+        if identidade in existentes or identidade in vistos:
+            resultado["duplicados"] += 1
+            continue
+        vistos.add(identidade)
+        novos.append((identidade, ep))
+    if not novos:
+        db.rollback()  # encerra a transação aberta pelo SELECT
+        return resultado
+
+    for campo, criados in (("gatilhos", "gatilhos_criados"),
+                           ("medicacoes", "medicacoes_criadas")):
+        faltando = {}
+        for _, ep in novos:
+            for nome in getattr(ep, campo):
+                if nome.casefold() not in nomes[campo]:
+                    faltando.setdefault(nome.casefold(), nome)
+        if faltando:
+            _criar_nomes(db, usuario_id, campo, nomes[campo],
+                         list(faltando.values()))
+            resultado[criados] = len(faltando)
+
+    db.execute(insert(Episodio.__table__).values([
+        {"usuario_id": usuario_id, "data": ep.data,
+         "intensidade": ep.intensidade, "duracao": ep.duracao,
+         "observacoes": ep.observacoes}
+        for _, ep in novos
+    ]))
+    if any(ep.gatilhos or ep.medicacoes for _, ep in novos):
+        # Sem RETURNING no MySQL: os ids voltam pela mesma chave da
+        # deduplicação, que é única entre os episódios recém-gravados
+        ids = _chaves_existentes(db, usuario_id, {ep.data for _, ep in novos})
+        for campo, (tabela, _, _) in ASSOCIACOES.items():
+            linhas = [
+                linha
+                for identidade, ep in novos if getattr(ep, campo)
+                for linha in linhas_associacao(
+                    campo, ids[identidade],
+                    dict.fromkeys(nomes[campo][nome.casefold()]
+                                  for nome in getattr(ep, campo)))
+            ]
+            if linhas:
+                db.execute(tabela.insert(), linhas)
+    db.commit()
+    resultado["importados"] = len(novos)
+    return resultado
+
+
+# pylint: disable=too-many-arguments, too-many-positional-arguments
+async def importar(executar, usuario_id: int,
+                   linhas: AsyncIterator[tuple[int, dict]],
+                   batch_size: int, max_erros: int) -> dict:
+    """
+    Lê os registros, grava em lotes e devolve o relatório da importação.
+
+    `executar(funcao, *args)` roda `funcao(session, *args)` com a sessão
+    síncrona: no threadpool (`Session`) ou via `AsyncSession.run_sync`.
+    """
+    relatorio = {"linhas": 0, "importados": 0, "duplicados": 0,
+                 "invalidos": 0, "gatilhos_criados": 0,
+                 "medicacoes_criadas": 0, "lotes": 0, "erros": []}
+    nomes = await executar(carregar_nomes, usuario_id)
+    vistos: set = set()
+    lote: list[EpisodioImport] = []
+
+    async def gravar():
+        contagens = await executar(gravar_lote, usuario_id, lote, nomes,
+                                   vistos)
+        for campo, valor in contagens.items():
+            relatorio[campo] += valor
+        relatorio["lotes"] += 1
+
+    async for numero, campos in linhas:
+        relatorio["linhas"] += 1
+        try:
+            if isinstance(campos, RegistroInvalido):
+                raise campos
+            lote.append(EpisodioImport.model_validate(campos))
+        except (RegistroInvalido, ValidationError) as exc:
+            relatorio["invalidos"] += 1
+            # Só os primeiros erros: o relatório não cresce com o arquivo
+            if len(relatorio["erros"]) < max_erros:
+                relatorio["erros"].append({"linha": numero, "erro": (
+                    _erro_validacao(exc)
+                    if isinstance(exc, ValidationError) else str(exc))})
+            continue
+        if len(lote) >= batch_size:
+            await gravar()
+            lote = []
+    if lote:
+        await gravar()
+    return relatorio
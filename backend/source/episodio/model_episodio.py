@@ -1,31 +1,37 @@
 from sqlalchemy import (Table, Column, Integer, Date, Text,
-                        DateTime, ForeignKey, text)
+                        DateTime, ForeignKey, Index, text)
 from sqlalchemy.orm import relationship
 from config.database import Base
 
 
+# ON DELETE CASCADE como em mysql-init/init.sql: excluir um episódio, gatilho
+# ou medicação é um único DELETE, e o banco remove as associações
 episodio_gatilho = Table(
     "episodio_gatilho",
     Base.metadata,
     Column("episodio_id", Integer,
-           ForeignKey("episodios.id"), primary_key=True),
+           ForeignKey("episodios.id", ondelete="CASCADE"), primary_key=True),
     Column("gatilho_id", Integer,
-           ForeignKey("gatilhos.id"), primary_key=True),
+           ForeignKey("gatilhos.id", ondelete="CASCADE"), primary_key=True),
 )
 
 episodio_medicacao = Table(
     "episodio_medicacao",
     Base.metadata,
     Column("episodio_id", Integer,
-           ForeignKey("episodios.id"), primary_key=True),
+           ForeignKey("episodios.id", ondelete="CASCADE"), primary_key=True),
     Column("medicacao_id", Integer,
-           ForeignKey("medicacoes.id"), primary_key=True),
+           ForeignKey("medicacoes.id", ondelete="CASCADE"), primary_key=True),
 )
 
 
 # pylint: disable=too-few-public-methods
 class Episodio(Base):
     __tablename__ = "episodios"
+    # Atende a listagem paginada por cursor: WHERE usuario_id ORDER BY data, id
+    __table_args__ = (
+        Index("ix_episodios_usuario_data_id", "usuario_id", "data", "id"),
+    )
 
     id = Column(Integer, primary_key=True, index=True)
     usuario_id = Column(
@@ -0,0 +1,127 @@
+"""
+Paginação por cursor (keyset) da listagem de episódios.
+
+A listagem é ordenada por `(data, id)` decrescente, uma ordem única, e o
+cursor guarda a chave do último episódio entregue. A página seguinte é
+`WHERE (data, id) < cursor ... LIMIT n` sobre o índice
+`(usuario_id, data, id)`, então cada página custa o mesmo, seja a
+primeira ou a de dez anos atrás, e nenhuma linha se repete ou é pulada
+entre páginas.
+
+O total (cabeçalho `X-Total-Count`) é opcional e vem de `EpisodioCountCache`,
+um cache por processo com TTL, invalidado nas escritas do próprio usuário.
+A invalidação só alcança o worker que atendeu a escrita: com vários workers
+do gunicorn, os outros podem devolver o total anterior até o TTL vencer.
+"""
+import base64
+import json
+import threading
+import time
+from datetime import date
+
+from sqlalchemy import and_, or_
+
+from config.settings import settings
+from .model_episodio import Episodio
+
+# Acima disso o cache de totais descarta os usuários já expirados
+COUNT_CACHE_MAX_USERS = 10000
+
+ORDEM_LISTAGEM = (Episodio.data.desc(), Episodio.id.desc())
+
+
+def encode_cursor(episodio: Episodio) -> str:
+    """Cursor opaco com a chave `(data, id)` de um episódio."""
+    chave = json.dumps([episodio.data.isoformat(), episodio.id])
+    return base64.urlsafe_b64encode(chave.encode()).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str) -> tuple[date, int]:
+    """Chave `(data, id)` de um cursor; ValueError se ele for inválido."""
+    try:
+        preenchido = cursor + "=" * (-len(cursor) % 4)
+        data, episodio_id = json.loads(base64.urlsafe_b64decode(preenchido))
+        return date.fromisoformat(data), int(episodio_id)
+    except (TypeError, ValueError) as exc:
+        raise ValueError("Cursor inválido") from exc
+
+
+def paginar(episodios: list, limit: int) -> tuple[list, str | None]:
+    """
+    Recebe até `limit + 1` episódios e devolve a página e o cursor da
+    próxima (None na última página), sem uma consulta extra.
+    """
+    if len(episodios) <= limit:
+        return episodios, None
+    pagina = episodios[:limit]
+    return pagina, encode_cursor(pagina[-1])
+
+
+def filtros_listagem(usuario_id: int, data_inicio: date | None = None,
+                     data_fim: date | None = None,
+                     cursor: str | None = None) -> list:
+    """Condições WHERE da listagem (e da contagem, sem cursor)."""
+    filtros = [Episodio.usuario_id == usuario_id]
+    if data_inicio:
+        filtros.append(Episodio.data >= data_inicio)
+    if data_fim:
+        filtros.append(Episodio.data <= data_fim)
+    if cursor:
+        data, episodio_id = decode_cursor(cursor)
+        # Forma expandida de (data, id) < (:data, :id), que o MySQL
+        # transforma em range no índice composto
+        filtros.append(or_(
+            Episodio.data < data,
+            and_(Episodio.data == data, Episodio.id < episodio_id),
+        ))
+    return filtros
+
+
+class EpisodioCountCache:
+    """Total de episódios por usuário e filtro de datas, com TTL."""
+
+    def __init__(self, ttl_seconds: float):
+        self.ttl_seconds = ttl_seconds
+        self.hits = 0
+        self.misses = 0
+        self._entries: dict[int, dict] = {}
+        self._lock = threading.Lock()
+
+    def get(self, usuario_id: int, filtro: tuple):
+        if self.ttl_seconds <= 0:
+            return None
+        with self._lock:
+            entry = self._entries.get(usuario_id, {}).get(filtro)
+            if entry is None or entry[0] < time.monotonic():
+                self.misses += 1
+                return None
+            self.hits += 1
+            return entry[1]
+
+    def set(self, usuario_id: int, filtro: tuple, total: int) -> None:
+        if self.ttl_seconds <= 0:
+            return
+        agora = time.monotonic()
+        expires_at = agora + self.ttl_seconds
+        with self._lock:
+            if len(self._entries) >= COUNT_CACHE_MAX_USERS:
+                self._entries = {
+                    uid: filtros for uid, filtros in self._entries.items()
+                    if any(ate > agora for ate, _ in filtros.values())}
+            self._entries.setdefault(usuario_id, {})[filtro] = (
+                expires_at, total)
+
+    def invalidate(self, usuario_id: int) -> None:
+        with self._lock:
+            self._entries.pop(usuario_id, None)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self.hits = 0
+            self.misses = 0
+
+
+episodio_count_cache = EpisodioCountCache(
+    ttl_seconds=settings.EPISODIO_COUNT_CACHE_TTL_SECONDS,
+)
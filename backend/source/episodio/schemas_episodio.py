@@ -1,5 +1,6 @@
 from __future__ import annotations
 
+import re
 from typing import Optional, List
 from datetime import date
 
@@ -26,6 +27,55 @@ class EpisodioCreate(BaseModel):
     medicacoes: Optional[List[int]] = []  # IDs das medicações
 
 
+class EpisodioUpdate(BaseModel):
+    """PATCH: só os campos enviados mudam (listas substituem as atuais)."""
+    data: Optional[date] = Field(None, description="Data do episódio")
+    intensidade: Optional[int] = Field(None, ge=0, le=10)
+    duracao: Optional[int] = Field(None, description="Duração em minutos")
+    observacoes: Optional[str] = Field(None, max_length=500)
+    gatilhos: Optional[List[int]] = None  # IDs dos gatilhos
+    medicacoes: Optional[List[int]] = None  # IDs das medicações
+
+
+class EpisodioImport(BaseModel):
+    """Linha da importação: gatilhos e medicações vêm pelo nome."""
+    data: date
+    intensidade: int = Field(..., ge=0, le=10)
+    duracao: Optional[int] = Field(None, ge=0)
+    observacoes: Optional[str] = Field(None, max_length=500)
+    gatilhos: List[str] = []
+    medicacoes: List[str] = []
+
+    @field_validator("gatilhos", "medicacoes", mode="before")
+    # pylint: disable=no-self-argument
+    def separar_nomes(cls, value):
+        """No CSV os nomes vêm numa célula, separados por `;` ou `|`."""
+        if value is None:
+            return []
+        if isinstance(value, str):
+            return re.split(r"[;|]", value)
+        return value
+
+    @field_validator("gatilhos", "medicacoes")
+    # pylint: disable=no-self-argument
+    def limpar_nomes(cls, value):
+        nomes = [nome.strip() for nome in value if nome.strip()]
+        if any(len(nome) > 100 for nome in nomes):
+            raise ValueError("nome com mais de 100 caracteres")
+        return nomes
+
+
+class EpisodioPatchOut(BaseModel):
+    """Resposta do PATCH: o id e só os campos alterados."""
+    id: int
+    data: Optional[date] = None
+    intensidade: Optional[int] = None
+    duracao: Optional[int] = None
+    observacoes: Optional[str] = None
+    gatilhos: Optional[List[int]] = None
+    medicacoes: Optional[List[int]] = None
+
+
 class EpisodioOut(BaseModel):
     id: int
     data_inicio: str = Field(alias="data")  # alias to map from model.data
@@ -2,7 +2,8 @@
 Testes unitários e parametrizados para o CRUD de Episódio.
 
 Usam diretamente as funções do controller (`create_episodio`,
-`get_episodio`, `get_episodios_usuario`, `update_episodio`, `delete_episodio`)
+`get_episodio`, `get_episodios_usuario`, `update_episodio`,
+`delete_episodio_usuario`)
 com uma sessão transacional (savepoint) para isolamento.
 """
 
@@ -20,7 +21,7 @@ from source.episodio.controller_episodio import (
     get_episodio,
     get_episodios_usuario,
     update_episodio,
-    delete_episodio,
+    delete_episodio_usuario,
 )
 from source.usuario.controller_usuario import create_usuario
 
@@ -91,7 +92,7 @@ def test_create_get_delete_episodio(db):
     assert fetched is not None
     assert fetched.id == epi.id
 
-    delete_episodio(db, fetched)
+    assert delete_episodio_usuario(db, fetched.id, user.id)
     after = get_episodio(db, epi.id, user.id)
     assert after is None
 
@@ -130,3 +131,101 @@ def test_get_episodios_usuario_pagination(db):
 
     limited = get_episodios_usuario(db, user.id, skip=1, limit=1)
     assert len(limited) == 1
+
+
+def test_get_episodios_usuario_cursor_percorre_sem_repetir(db):
+    from source.episodio.paginacao_episodio import (
+        decode_cursor, encode_cursor, paginar,
+    )
+
+    user = create_usuario(db, "Epi Cursor", "epicursor@test.local", "Senha1")
+    # Datas repetidas: a ordem só é única com o desempate por id
+    for dia in (1, 1, 1, 2, 2, 3, 4):
+        create_episodio(db, user.id, date(2025, 1, dia), intensidade=5)
+
+    vistos, cursor = [], None
+    while True:
+        pagina, cursor = paginar(
+            get_episodios_usuario(db, user.id, limit=3, cursor=cursor), 2)
+        vistos.extend(e.id for e in pagina)
+        if cursor is None:
+            break
+    esperado = [e.id for e in get_episodios_usuario(db, user.id, limit=10)]
+    assert vistos == esperado and len(set(vistos)) == 7
+
+    ultimo = get_episodio(db, esperado[-1], user.id)
+    assert decode_cursor(encode_cursor(ultimo)) == (ultimo.data, ultimo.id)
+    with pytest.raises(ValueError):
+        decode_cursor("nao-e-um-cursor")
+
+
+async def _ler_registros(corpo: bytes, csv_: bool, maximo: int,
+                         tamanho_parte: int = 7):
+    from source.episodio.importacao_episodio import linhas_texto, registros
+
+    async def partes():
+        for inicio in range(0, len(corpo), tamanho_parte):
+            yield corpo[inicio:inicio + tamanho_parte]
+
+    return [registro async for registro in registros(
+        linhas_texto(partes(), maximo), csv_, maximo)]
+
+
+async def test_importacao_aspa_sem_fechamento_vira_erro_e_ressincroniza():
+    from source.episodio.importacao_episodio import RegistroInvalido
+
+    linhas = ["data,intensidade,observacoes", '2024-01-01,3,"sem fim']
+    linhas += [f"2024-01-{dia:02d},4,ok" for dia in range(2, 30)]
+    corpo = "\n".join(linhas).encode()
+
+    lidos = await _ler_registros(corpo, True, maximo=60)
+    assert lidos[0][0] == 2
+    assert isinstance(lidos[0][1], RegistroInvalido)
+    # Depois do limite a leitura volta a gerar registros normais
+    assert lidos[-1] == (30, {"data": "2024-01-29", "intensidade": "4",
+                              "observacoes": "ok"})
+
+    # Sem limite atingido, a aspa aberta no fim do corpo também é erro
+    lidos = await _ler_registros(corpo, True, maximo=10_000)
+    assert len(lidos) == 1
+    assert str(lidos[0][1]) == "campo entre aspas sem fechamento"
+
+
+async def test_importacao_linha_longa_nao_e_acumulada():
+    from source.episodio.importacao_episodio import RegistroInvalido
+
+    corpo = b'{"data": "2024-01-01", "intensidade": 1}\n' + b"x" * 5000 \
+        + b'\n{"data": "2024-01-02", "intensidade": 2}'
+    lidos = await _ler_registros(corpo, False, maximo=100, tamanho_parte=64)
+    assert [numero for numero, _ in lidos] == [1, 2, 3]
+    assert isinstance(lidos[1][1], RegistroInvalido)
+    assert lidos[2][1] == {"data": "2024-01-02", "intensidade": 2}
+
+
+def test_migracao_poe_cascade_nas_fks_de_associacao(db, tmp_path):
+    from sqlalchemy import create_engine, inspect, text
+    from main import comandos_cascade
+    from source.episodio.model_episodio import episodio_gatilho
+
+    # Tabela como criada pelos models anteriores, sem ON DELETE CASCADE
+    antigo = create_engine(f"sqlite:///{tmp_path}/antigo.db")
+    with antigo.begin() as conn:
+        conn.execute(text("CREATE TABLE episodios (id INTEGER PRIMARY KEY)"))
+        conn.execute(text("CREATE TABLE gatilhos (id INTEGER PRIMARY KEY)"))
+        conn.execute(text(
+            "CREATE TABLE episodio_gatilho ("
+            "episodio_id INTEGER, gatilho_id INTEGER, "
+            "CONSTRAINT fk_ep FOREIGN KEY (episodio_id) "
+            "REFERENCES episodios (id), "
+            "CONSTRAINT fk_gat FOREIGN KEY (gatilho_id) "
+            "REFERENCES gatilhos (id) ON DELETE CASCADE)"))
+    comandos = comandos_cascade(inspect(antigo), episodio_gatilho)
+    assert comandos == [
+        "ALTER TABLE episodio_gatilho DROP FOREIGN KEY fk_ep",
+        "ALTER TABLE episodio_gatilho ADD CONSTRAINT fk_ep FOREIGN KEY "
+        "(episodio_id) REFERENCES episodios (id) ON DELETE CASCADE",
+    ]
+
+    # Tabelas criadas pelos models atuais não precisam de migração
+    assert comandos_cascade(inspect(db.connection()),
+                            episodio_gatilho) == []
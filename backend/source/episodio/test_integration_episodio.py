@@ -6,6 +6,8 @@ Contém apenas casos que exercitam os endpoints de episódio:
 `PUT /api/episodios/{id}` e `DELETE /api/episodios/{id}`.
 """
 
+import json
+
 import pytest
 
 
@@ -63,3 +65,454 @@ def test_create_invalid_data_returns_400(client, auth_header):
     payload = {"data": "2025-10-24", "intensidade": 99}
     res = client.post("/api/episodios/", json=payload, headers=headers)
     assert res.status_code in (422, 400)
+
+
+@pytest.mark.integration
+def test_crud_episodio_async_com_associacoes(async_client, async_auth_header):
+    """CRUD assíncrono (DB_ASYNC), incluindo gatilhos e medicações."""
+    headers = async_auth_header
+    gatilho_id = async_client.post("/api/gatilhos/", json={"nome": "Sono"},
+                                   headers=headers).json()["id"]
+    medicacao_id = async_client.post("/api/medicacoes/",
+                                     json={"nome": "Paracetamol"},
+                                     headers=headers).json()["id"]
+
+    res = async_client.post("/api/episodios/", json={
+        "data": "2025-10-24",
+        "intensidade": 7,
+        "gatilhos": [gatilho_id],
+        "medicacoes": [medicacao_id],
+    }, headers=headers)
+    assert res.status_code == 201
+    episodio = res.json()
+    assert [g["id"] for g in episodio["gatilhos"]] == [gatilho_id]
+
+    res = async_client.put(f"/api/episodios/{episodio['id']}", json={
+        "data": "2025-10-24",
+        "intensidade": 4,
+        "gatilhos": [],
+        "medicacoes": [medicacao_id],
+    }, headers=headers)
+    assert res.status_code == 200
+    assert res.json()["intensidade"] == 4
+    assert res.json()["gatilhos"] == []
+
+    res = async_client.get("/api/episodios/", headers=headers)
+    assert [e["id"] for e in res.json()] == [episodio["id"]]
+    assert res.json()[0]["medicacoes"][0]["nome"] == "Paracetamol"
+
+    res = async_client.delete(f"/api/episodios/{episodio['id']}",
+                              headers=headers)
+    assert res.status_code == 204
+
+
+@pytest.mark.integration
+def test_listagem_por_cursor_e_total(client, auth_header):
+    """Percorre a listagem pelo cabeçalho X-Next-Cursor e lê o total."""
+    headers = auth_header
+    for dia in range(1, 6):
+        res = client.post("/api/episodios/", json={
+            "data": f"2025-03-0{dia}", "intensidade": dia,
+        }, headers=headers)
+        assert res.status_code == 201
+
+    res = client.get("/api/episodios/?limit=2&total=true", headers=headers)
+    assert res.headers["X-Total-Count"] == "5"
+    datas = [e["data"] for e in res.json()]
+    while "X-Next-Cursor" in res.headers:
+        res = client.get("/api/episodios/", headers=headers, params={
+            "limit": 2, "cursor": res.headers["X-Next-Cursor"]})
+        datas.extend(e["data"] for e in res.json())
+    assert datas == [f"2025-03-0{dia}" for dia in range(5, 0, -1)]
+
+    # O total em cache é invalidado pela escrita do próprio usuário
+    client.post("/api/episodios/", json={"data": "2025-03-09",
+                                         "intensidade": 1}, headers=headers)
+    res = client.get("/api/episodios/?total=true", headers=headers)
+    assert res.headers["X-Total-Count"] == "6"
+
+    res = client.get("/api/episodios/?cursor=invalido", headers=headers)
+    assert res.status_code == 400
+
+
+@pytest.mark.integration
+def test_listagem_carrega_associacoes_em_lote(client, auth_header,
+                                               assert_num_queries):
+    """O número de statements da listagem não cresce com os episódios."""
+    headers = auth_header
+    gatilhos = [client.post("/api/gatilhos/", json={"nome": f"Gatilho {i}"},
+                            headers=headers).json()["id"] for i in range(3)]
+    medicacoes = [client.post("/api/medicacoes/", json={"nome": f"Med {i}"},
+                              headers=headers).json()["id"] for i in range(2)]
+    for dia in range(1, 5):
+        client.post("/api/episodios/", json={
+            "data": f"2025-04-0{dia}", "intensidade": 3,
+            "gatilhos": gatilhos, "medicacoes": medicacoes,
+        }, headers=headers)
+    client.get("/api/episodios/", headers=headers)  # aquece os caches
+
+    # episódios + um SELECT ... IN por coleção
+    with assert_num_queries(3):
+        res = client.get("/api/episodios/", headers=headers)
+    assert len(res.json()) == 4
+    assert all(len(e["gatilhos"]) == 3 and len(e["medicacoes"]) == 2
+               for e in res.json())
+
+
+@pytest.mark.integration
+def test_server_timing_informa_tempo_de_banco(client, auth_header):
+    headers = auth_header
+    client.get("/api/episodios/", headers=headers)  # aquece os caches
+    res = client.get("/api/episodios/", headers=headers)
+    timing = res.headers["Server-Timing"]
+    assert timing.startswith("db;dur=")
+    # Sem episódios as coleções não são carregadas: só o SELECT da página
+    assert timing.endswith('desc="1 queries"')
+
+
+@pytest.mark.integration
+def test_metrics_prometheus_por_rota(client, auth_header, admin_header):
+    client.get("/api/episodios/", headers=auth_header)
+    client.get("/api/episodios/999", headers=auth_header)
+
+    assert client.get("/metrics").status_code == 403
+    assert not [caminho for caminho in client.get("/openapi.json").json()
+                ["paths"] if caminho.startswith("/metrics")]
+    res = client.get("/metrics", headers={
+        "Authorization": f"Bearer {admin_header['X-Admin-Key']}"})
+    assert res.status_code == 200
+    assert res.headers["content-type"].startswith("text/plain")
+    corpo = res.text
+    assert ('http_requests_total{method="GET",route="/api/episodios/",'
+            'status="200"}') in corpo
+    # Rota pelo template, não pelo id da URL
+    assert 'route="/api/episodios/{episodio_id}",status="404"' in corpo
+    assert "http_request_duration_seconds_bucket" in corpo
+    assert "password_hash_duration_seconds" in corpo
+
+
+@pytest.mark.integration
+def test_metrics_threadpool_mede_a_faixa_padrao(client, auth_header,
+                                                admin_header):
+    client.get("/api/episodios/", headers=auth_header)
+
+    res = client.get("/metrics/threadpool", headers=admin_header)
+    assert res.status_code == 200
+    padrao = res.json()["default"]
+    assert padrao["tokens"] == 40
+    # Handler e dependências síncronos passaram pelo limiter instrumentado
+    assert padrao["acquired"] >= 1
+    assert padrao["peak_in_use"] >= 1
+    assert "wait_max_ms" in padrao
+
+
+@pytest.mark.integration
+def test_thread_lanes_instalado_no_startup(client):
+    """Falha aqui, e não só em produção, se o AnyIO mudar o limiter interno."""
+    from anyio import to_thread
+    from anyio._backends._asyncio import _default_thread_limiter  # noqa: F401  # pylint: disable=unused-import
+    from config.threadpool import InstrumentedLimiter, thread_lanes
+
+    limiter = client.portal.call(to_thread.current_default_thread_limiter)
+    assert isinstance(limiter, InstrumentedLimiter)
+    assert limiter is thread_lanes.limiter
+    assert limiter.total_tokens == 40
+
+
+@pytest.mark.integration
+def test_sobrecarga_recusa_com_503_menos_health(client, auth_header,
+                                                admin_header, monkeypatch):
+    from config.shedding import load_shedder
+
+    monkeypatch.setattr(load_shedder, "max_in_flight", 1)
+    monkeypatch.setattr(load_shedder, "in_flight", 1)
+    res = client.get("/api/episodios/", headers=auth_header)
+    assert res.status_code == 503
+    assert res.headers["Retry-After"] == "1"
+    assert client.get("/health").status_code == 200
+    res = client.get("/metrics/shedding", headers=admin_header)
+    assert res.json()["rejected"]["in_flight"] >= 1
+
+
+@pytest.mark.integration
+def test_criacao_numa_transacao_confere_donos(client, auth_header,
+                                              assert_num_queries):
+    headers = auth_header
+    gatilhos = [client.post("/api/gatilhos/", json={"nome": f"Gatilho {i}"},
+                            headers=headers).json()["id"] for i in range(3)]
+    medicacao = client.post("/api/medicacoes/", json={"nome": "Med"},
+                            headers=headers).json()["id"]
+    client.get("/api/episodios/", headers=headers)  # aquece os caches
+
+    # Conferência dos IDs, INSERT do episódio e um INSERT por tabela
+    # associativa; nenhum refresh depois do commit
+    with assert_num_queries(4):
+        res = client.post("/api/episodios/", json={
+            "data": "2025-05-01", "intensidade": 6,
+            "gatilhos": gatilhos, "medicacoes": [medicacao],
+        }, headers=headers)
+    assert res.status_code == 201
+    assert [g["nome"] for g in res.json()["gatilhos"]] == [
+        "Gatilho 0", "Gatilho 1", "Gatilho 2"]
+    assert res.json()["medicacoes"][0]["id"] == medicacao
+
+    # ID inexistente (ou de outro usuário): nada é gravado
+    res = client.post("/api/episodios/", json={
+        "data": "2025-05-02", "intensidade": 6, "gatilhos": [9999],
+    }, headers=headers)
+    assert res.status_code == 400
+    assert "9999" in res.json()["detail"]
+    assert len(client.get("/api/episodios/", headers=headers).json()) == 1
+
+
+@pytest.mark.integration
+def test_edicao_de_associacoes_por_diferenca(client, auth_header,
+                                             assert_num_queries):
+    headers = auth_header
+    gatilhos = [client.post("/api/gatilhos/", json={"nome": f"Gatilho {i}"},
+                            headers=headers).json()["id"] for i in range(6)]
+    episodio = client.post("/api/episodios/", json={
+        "data": "2025-06-01", "intensidade": 4, "gatilhos": gatilhos[:5],
+    }, headers=headers).json()
+
+    # Troca um gatilho: dono do episódio, conferência dos IDs, um DELETE
+    # e um INSERT ... SELECT só em episodio_gatilho
+    novos = gatilhos[1:]
+    with assert_num_queries(4) as contador:
+        res = client.patch(f"/api/episodios/{episodio['id']}",
+                           json={"gatilhos": novos}, headers=headers)
+    assert res.status_code == 200
+    assert res.json() == {"id": episodio["id"], "gatilhos": novos}
+    escritas = [s for s in contador.statements
+                if s.startswith(("DELETE", "INSERT"))]
+    assert len(escritas) == 2
+    assert all("episodio_gatilho" in s for s in escritas)
+
+    res = client.get(f"/api/episodios/{episodio['id']}", headers=headers)
+    assert sorted(g["id"] for g in res.json()["gatilhos"]) == novos
+    assert res.json()["intensidade"] == 4
+
+    # PATCH sem listas não mexe nas associações
+    res = client.patch(f"/api/episodios/{episodio['id']}",
+                       json={"intensidade": 9}, headers=headers)
+    assert res.json() == {"id": episodio["id"], "intensidade": 9}
+    res = client.get(f"/api/episodios/{episodio['id']}", headers=headers)
+    assert len(res.json()["gatilhos"]) == 5
+
+    # PUT substitui: sem gatilhos no corpo, as associações são removidas
+    res = client.put(f"/api/episodios/{episodio['id']}", json={
+        "data": "2025-06-01", "intensidade": 2}, headers=headers)
+    assert res.json()["gatilhos"] == []
+
+    res = client.patch(f"/api/episodios/{episodio['id']}",
+                       json={"medicacoes": [9999]}, headers=headers)
+    assert res.status_code == 400
+
+
+@pytest.mark.integration
+@pytest.mark.parametrize("modo", ["sync", "async"])
+def test_patch_com_lista_vazia_remove_associacoes(request, modo):
+    if modo == "sync":
+        client = request.getfixturevalue("client")
+        headers = request.getfixturevalue("auth_header")
+    else:
+        client = request.getfixturevalue("async_client")
+        headers = request.getfixturevalue("async_auth_header")
+    gatilho = client.post("/api/gatilhos/", json={"nome": "Luz"},
+                          headers=headers).json()
+    medicacao = client.post("/api/medicacoes/", json={"nome": "Dipirona"},
+                            headers=headers).json()
+    episodio = client.post("/api/episodios/", json={
+        "data": "2025-06-02", "intensidade": 5, "gatilhos": [gatilho["id"]],
+        "medicacoes": [medicacao["id"]],
+    }, headers=headers).json()
+
+    res = client.patch(f"/api/episodios/{episodio['id']}",
+                       json={"gatilhos": []}, headers=headers)
+    assert res.status_code == 200
+    assert res.json() == {"id": episodio["id"], "gatilhos": []}
+    res = client.patch(f"/api/episodios/{episodio['id']}",
+                       json={"medicacoes": []}, headers=headers)
+    assert res.status_code == 200
+
+    res = client.get(f"/api/episodios/{episodio['id']}", headers=headers)
+    assert res.json()["gatilhos"] == []
+    assert res.json()["medicacoes"] == []
+
+
+@pytest.mark.integration
+def test_patch_e_delete_num_unico_statement(client, auth_header,
+                                            assert_num_queries):
+    headers = auth_header
+    episodio = client.post("/api/episodios/", json={
+        "data": "2025-07-01", "intensidade": 3, "observacoes": "texto",
+    }, headers=headers).json()
+    gatilho = client.post("/api/gatilhos/", json={"nome": "Luz"},
+                          headers=headers).json()
+    medicacao = client.post("/api/medicacoes/", json={
+        "nome": "Dipirona", "dosagem": "500mg"}, headers=headers).json()
+    client.post("/api/gatilhos/", json={"nome": "Barulho"}, headers=headers)
+
+    with assert_num_queries(1):
+        res = client.patch(f"/api/episodios/{episodio['id']}", json={
+            "intensidade": 7, "observacoes": None}, headers=headers)
+    assert res.json() == {"id": episodio["id"], "intensidade": 7,
+                          "observacoes": None}
+
+    with assert_num_queries(1):
+        res = client.patch(f"/api/gatilhos/{gatilho['id']}",
+                           json={"nome": "Luz forte"}, headers=headers)
+    assert res.json() == {"id": gatilho["id"], "nome": "Luz forte"}
+    res = client.patch(f"/api/gatilhos/{gatilho['id']}",
+                       json={"nome": "Barulho"}, headers=headers)
+    assert res.status_code == 400
+
+    with assert_num_queries(1):
+        res = client.patch(f"/api/medicacoes/{medicacao['id']}",
+                           json={"dosagem": None}, headers=headers)
+    assert res.json() == {"id": medicacao["id"], "dosagem": None}
+
+    # O rowcount decide o 404: id inexistente ou de outro usuário
+    assert client.patch("/api/episodios/9999", json={"intensidade": 1},
+                        headers=headers).status_code == 404
+    assert client.delete("/api/gatilhos/9999",
+                         headers=headers).status_code == 404
+
+    with assert_num_queries(1):
+        res = client.delete(f"/api/episodios/{episodio['id']}",
+                            headers=headers)
+    assert res.status_code == 204
+    assert client.get(f"/api/episodios/{episodio['id']}",
+                      headers=headers).status_code == 404
+
+
+@pytest.mark.integration
+def test_importacao_csv_em_lote_e_idempotente(client, auth_header,
+                                              assert_num_queries):
+    headers = auth_header
+    client.post("/api/medicacoes/", json={"nome": "Dipirona"},
+                headers=headers)
+    corpo = (
+        "﻿data,intensidade,duracao,observacoes,gatilhos,medicacoes\r\n"
+        "2024-01-02,6,90,\"Acordou com dor, piorou\nà tarde\",Sono;Luz,"
+        "dipirona\r\n"
+        "2024-01-03,4,,,Sono,\r\n"
+        "2024-01-03,4,,,Sono,\r\n"
+        "2024-01-04,11,,,,\r\n"
+    ).encode()
+
+    # Nomes do usuário, duplicados do lote, gatilhos novos (INSERT e
+    # SELECT), episódios, ids e uma inserção por tabela associativa
+    with assert_num_queries(8):
+        res = client.post("/api/episodios/import", content=corpo,
+                          headers={**headers, "Content-Type": "text/csv"})
+    assert res.status_code == 200
+    relatorio = res.json()
+    assert relatorio["linhas"] == 4
+    assert relatorio["importados"] == 2
+    assert relatorio["duplicados"] == 1
+    assert relatorio["invalidos"] == 1
+    assert relatorio["gatilhos_criados"] == 2
+    assert relatorio["medicacoes_criadas"] == 0
+    assert relatorio["erros"][0]["linha"] == 6
+    assert relatorio["erros"][0]["erro"].startswith("intensidade")
+
+    episodios = client.get("/api/episodios/", headers=headers).json()
+    assert [e["data"] for e in episodios] == ["2024-01-03",
+                                                     "2024-01-02"]
+    assert episodios[1]["observacoes"] == "Acordou com dor, piorou\nà tarde"
+    assert [g["nome"] for g in episodios[1]["gatilhos"]] == ["Sono", "Luz"]
+    assert episodios[1]["medicacoes"][0]["nome"] == "Dipirona"
+
+    # Reenviar o mesmo arquivo não duplica nada
+    with assert_num_queries(2):
+        res = client.post("/api/episodios/import", content=corpo,
+                          headers={**headers, "Content-Type": "text/csv"})
+    assert res.json()["importados"] == 0
+    assert res.json()["duplicados"] == 3
+
+
+@pytest.mark.integration
+def test_importacao_ndjson_async(async_client, async_auth_header):
+    headers = async_auth_header
+    linhas = [
+        {"data": "2024-02-01", "intensidade": 5, "gatilhos": ["Estresse"]},
+        {"data": "2024-02-02", "intensidade": 3, "observacoes": "leve"},
+        "não é um objeto",
+    ]
+    corpo = "\n".join(json.dumps(linha) for linha in linhas)
+    res = async_client.post(
+        "/api/episodios/import", content=corpo.encode(),
+        headers={**headers, "Content-Type": "application/x-ndjson"})
+    assert res.status_code == 200
+    assert res.json()["importados"] == 2
+    assert res.json()["erros"][0]["linha"] == 3
+
+    res = async_client.get("/api/episodios/?total=true", headers=headers)
+    assert res.headers["X-Total-Count"] == "2"
+    assert res.json()[1]["gatilhos"][0]["nome"] == "Estresse"
+
+
+@pytest.mark.integration
+def test_exportacao_csv_gzip_reimportavel(client, auth_header,
+                                          assert_num_queries):
+    headers = auth_header
+    corpo = (
+        "data,intensidade,duracao,observacoes,gatilhos,medicacoes\n"
+        "2024-03-02,6,90,\"Com vírgula, e aspas \"\"duplas\"\"\",Sono;Luz,"
+        "Dipirona\n"
+        "2024-03-01,2,,,,\n"
+    )
+    client.post("/api/episodios/import", content=corpo.encode(),
+                headers={**headers, "Content-Type": "text/csv"})
+
+    # Nomes dos gatilhos/medicações e o cursor dos episódios
+    with assert_num_queries(2):
+        res = client.get("/api/episodios/export", headers={
+            **headers, "Accept-Encoding": "gzip"})
+    assert res.status_code == 200
+    assert res.headers["content-encoding"] == "gzip"
+    assert res.headers["content-type"].startswith("text/csv")
+    assert "attachment" in res.headers["content-disposition"]
+    assert res.text.splitlines() == [
+        "data,intensidade,duracao,observacoes,gatilhos,medicacoes",
+        "2024-03-01,2,,,,",
+        "2024-03-02,6,90,\"Com vírgula, e aspas \"\"duplas\"\"\",Sono;Luz,"
+        "Dipirona",
+    ]
+
+    # O arquivo exportado volta pela importação sem duplicar
+    res = client.post("/api/episodios/import", content=res.content,
+                      headers={**headers, "Content-Type": "text/csv"})
+    assert res.json()["duplicados"] == 2
+
+
+@pytest.mark.integration
+def test_exportacao_json_e_ndjson_async(async_client, async_auth_header):
+    headers = {**async_auth_header, "Accept-Encoding": "identity"}
+    linhas = [
+        {"data": "2024-04-01", "intensidade": 5, "gatilhos": ["Estresse"]},
+        {"data": "2024-04-02", "intensidade": 3, "observacoes": "leve"},
+        {"data": "2023-12-31", "intensidade": 1},
+    ]
+    async_client.post(
+        "/api/episodios/import",
+        content="\n".join(json.dumps(linha) for linha in linhas).encode(),
+        headers=headers)
+
+    res = async_client.get("/api/episodios/export?formato=json"
+                           "&data_inicio=2024-01-01", headers=headers)
+    assert "content-encoding" not in res.headers
+    assert res.json() == [
+        {"data": "2024-04-01", "intensidade": 5, "duracao": None,
+         "observacoes": None, "gatilhos": ["Estresse"], "medicacoes": []},
+        {"data": "2024-04-02", "intensidade": 3, "duracao": None,
+         "observacoes": "leve", "gatilhos": [], "medicacoes": []},
+    ]
+
+    res = async_client.get("/api/episodios/export?formato=ndjson",
+                           headers=headers)
+    assert [json.loads(linha)["data"] for linha in res.text.splitlines()] \
+        == ["2023-12-31", "2024-04-01", "2024-04-02"]
+    assert async_client.get("/api/episodios/export?formato=xml",
+                            headers=headers).status_code == 422
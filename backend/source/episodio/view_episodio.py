@@ -1,15 +1,36 @@
 from datetime import date
-from fastapi import APIRouter, Depends, HTTPException, status, Query
+from fastapi import (
+    APIRouter, Depends, HTTPException, status, Query, Request, Response,
+)
+from fastapi.responses import StreamingResponse
 from sqlalchemy.orm import Session
+from starlette.concurrency import run_in_threadpool
 
-from config.database import get_db
-from source.episodio.schemas_episodio import EpisodioCreate, EpisodioOut
-from source.usuario.view_usuario import get_current_user  # reusa autenticação
+from config.database import get_db, get_session_factory
+from config.deadline import bind_deadline
+from config.replicas import replica_router
+from config.settings import settings
+from source.episodio.schemas_episodio import (
+    EpisodioCreate, EpisodioOut, EpisodioPatchOut, EpisodioUpdate,
+)
+from source.usuario.view_usuario import (  # reusa autenticação
+    get_current_user, get_read_db,
+)
 
+from .associacoes_episodio import AssociacaoInvalida
 from .controller_episodio import (
     create_episodio, get_episodios_usuario, get_episodio,
-    update_episodio, delete_episodio,
+    update_episodio, count_episodios_usuario, patch_episodio,
+    delete_episodio_usuario,
+)
+from .exportacao_episodio import (
+    FORMATOS, Exportador, aceita_gzip, cabecalhos, consulta_exportacao,
+    exportar, nomes_por_id,
 )
+from .importacao_episodio import (
+    formato_csv, importar, linhas_texto, registros,
+)
+from .paginacao_episodio import episodio_count_cache, paginar
 
 router = APIRouter()
 
@@ -22,29 +43,124 @@ router = APIRouter()
 def criar_episodio(ep: EpisodioCreate,
                    db: Session = Depends(get_db),
                    user=Depends(get_current_user)):
-    episodio = create_episodio(db, usuario_id=user.id, **ep.dict())
+    try:
+        episodio = create_episodio(db, usuario_id=user.id, **ep.dict())
+    except AssociacaoInvalida as exc:
+        raise HTTPException(400, detail=str(exc)) from exc
     return episodio
 
 
+@router.post("/import", tags=["Episódios"])
+async def importar_episodios(request: Request,
+                             db: Session = Depends(get_db),
+                             user=Depends(get_current_user)):
+    """
+    Importa episódios em lote de JSON lines ou CSV (`Content-Type:
+    text/csv`, cabeçalho `data,intensidade,duracao,observacoes,gatilhos,
+    medicacoes`), com gatilhos e medicações pelo nome.
+
+    O corpo é processado à medida que chega, gravado em lotes, e a
+    resposta traz as contagens (`importados`, `duplicados`, `invalidos`,
+    gatilhos e medicações criados) e os primeiros erros por linha.
+    Episódios já existentes (mesma data, intensidade e observações) são
+    ignorados, então reenviar um arquivo interrompido é seguro.
+    """
+    async def executar(funcao, *args):
+        return await run_in_threadpool(funcao, db, *args)
+
+    # O rollback de um lote só com duplicados expira o usuário da sessão
+    usuario_id = user.id
+    maximo = settings.EPISODIO_IMPORT_MAX_LINE_CHARS
+    linhas = registros(linhas_texto(request.stream(), maximo),
+                       formato_csv(request.headers.get("content-type", "")),
+                       maximo)
+    try:
+        return await importar(executar, usuario_id, linhas,
+                              settings.EPISODIO_IMPORT_BATCH_SIZE,
+                              settings.EPISODIO_IMPORT_MAX_ERRORS)
+    finally:
+        episodio_count_cache.invalidate(usuario_id)
+
+
 @router.get("/", response_model=list[EpisodioOut], tags=["Episódios"])
 # pylint: disable=too-many-arguments,too-many-positional-arguments
 def listar_episodios(
+    response: Response,
     skip: int = 0,
-    limit: int = Query(100, le=1000),
+    limit: int = Query(100, ge=1, le=1000),
+    cursor: str = Query(
+        None, description="Valor de X-Next-Cursor da página anterior"),
+    total: bool = Query(False, description="Inclui o cabeçalho X-Total-Count"),
     data_inicio: date = Query(None, description="Data inicial (YYYY-MM-DD)"),
     data_fim: date = Query(None, description="Data final (YYYY-MM-DD)"),
-    db: Session = Depends(get_db),
+    db: Session = Depends(get_read_db),
     user=Depends(get_current_user),
 ):
-    return get_episodios_usuario(
-        db, usuario_id=user.id, skip=skip, limit=limit,
-        data_inicio=data_inicio, data_fim=data_fim
-    )
+    """
+    Lista os episódios do mais recente ao mais antigo.
+
+    Para a próxima página, envie em `cursor` o cabeçalho `X-Next-Cursor`
+    da resposta (ausente na última página); `skip` segue aceito, mas fica
+    mais lento quanto mais fundo a página.
+    """
+    try:
+        episodios = get_episodios_usuario(
+            db, usuario_id=user.id, skip=skip, limit=limit + 1,
+            data_inicio=data_inicio, data_fim=data_fim, cursor=cursor,
+        )
+    except ValueError as exc:
+        raise HTTPException(400, detail=str(exc)) from exc
+    episodios, proximo = paginar(episodios, limit)
+    if proximo:
+        response.headers["X-Next-Cursor"] = proximo
+    if total:
+        response.headers["X-Total-Count"] = str(count_episodios_usuario(
+            db, user.id, data_inicio=data_inicio, data_fim=data_fim))
+    return episodios
+
+
+@router.get("/export", tags=["Episódios"])
+# pylint: disable=too-many-arguments,too-many-positional-arguments
+def exportar_episodios(
+    request: Request,
+    formato: str = Query("csv", pattern="^(csv|ndjson|json)$"),
+    data_inicio: date = Query(None, description="Data inicial (YYYY-MM-DD)"),
+    data_fim: date = Query(None, description="Data final (YYYY-MM-DD)"),
+    db: Session = Depends(get_read_db),
+    user=Depends(get_current_user),
+    session_factory=Depends(get_session_factory),
+):
+    """
+    Exporta o diário inteiro (ou o período) em ordem cronológica, em CSV,
+    JSON lines (`ndjson`) ou JSON, com os nomes dos gatilhos e medicações.
+
+    A resposta é gerada em streaming a partir de um cursor no servidor,
+    sem limite de tamanho, e comprimida em gzip quando o cliente aceita.
+    """
+    usuario_id = user.id
+    gzip = aceita_gzip(request.headers.get("accept-encoding", ""))
+    exportador = Exportador(formato, nomes_por_id(db, usuario_id), gzip=gzip)
+    consulta = consulta_exportacao(usuario_id, data_inicio, data_fim,
+                                   settings.EPISODIO_EXPORT_YIELD_PER)
+
+    def conteudo():
+        # Sessão do próprio gerador: a da dependência já teria sido
+        # fechada quando o corpo começa a ser enviado
+        leitura = (replica_router.read_session(usuario_id)
+                   or session_factory())
+        try:
+            bind_deadline(leitura)
+            yield from exportar(leitura, exportador, consulta)
+        finally:
+            leitura.close()
+
+    return StreamingResponse(conteudo(), media_type=FORMATOS[formato],
+                             headers=cabecalhos(formato, gzip))
 
 
 @router.get("/{episodio_id}", response_model=EpisodioOut, tags=["Episódios"])
 def ver_episodio(episodio_id: int,
-                 db: Session = Depends(get_db),
+                 db: Session = Depends(get_read_db),
                  user=Depends(get_current_user)):
     episodio = get_episodio(db, episodio_id, usuario_id=user.id)
     if not episodio:
@@ -60,15 +176,36 @@ def editar_episodio(episodio_id: int,
     episodio = get_episodio(db, episodio_id, usuario_id=user.id)
     if not episodio:
         raise HTTPException(404, detail="Episódio não encontrado")
-    episodio = update_episodio(db, episodio, **ep.dict())
+    try:
+        episodio = update_episodio(db, episodio, **ep.dict())
+    except AssociacaoInvalida as exc:
+        raise HTTPException(400, detail=str(exc)) from exc
     return episodio
 
 
+@router.patch("/{episodio_id}", response_model=EpisodioPatchOut,
+              response_model_exclude_unset=True, tags=["Episódios"])
+def atualizar_episodio(episodio_id: int,
+                       ep: EpisodioUpdate,
+                       db: Session = Depends(get_db),
+                       user=Depends(get_current_user)):
+    """
+    Altera só os campos enviados, sem carregar o episódio, e devolve o id
+    e o que mudou; gatilhos/medicações são sincronizados por diferença.
+    """
+    try:
+        alterado = patch_episodio(
+            db, episodio_id, user.id, **ep.model_dump(exclude_unset=True))
+    except AssociacaoInvalida as exc:
+        raise HTTPException(400, detail=str(exc)) from exc
+    if alterado is None:
+        raise HTTPException(404, detail="Episódio não encontrado")
+    return alterado
+
+
 @router.delete("/{episodio_id}", status_code=204, tags=["Episódios"])
 def excluir_episodio(episodio_id: int,
                      db: Session = Depends(get_db),
                      user=Depends(get_current_user)):
-    episodio = get_episodio(db, episodio_id, usuario_id=user.id)
-    if not episodio:
+    if not delete_episodio_usuario(db, episodio_id, usuario_id=user.id):
         raise HTTPException(404, detail="Episódio não encontrado")
-    delete_episodio(db, episodio)
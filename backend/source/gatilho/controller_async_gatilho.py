@@ -0,0 +1,101 @@
+"""
+Controller assíncrono para Gatilhos (modo `DB_ASYNC`).
+
+Mesmas regras de `controller_gatilho`, sobre `AsyncSession`.
+"""
+from sqlalchemy import delete, select, update
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.ext.asyncio import AsyncSession
+from .model_gatilho import Gatilho
+
+
+async def create_gatilho(db: AsyncSession, usuario_id: int, nome: str):
+    """Cria um novo gatilho para o usuário."""
+    gatilho = Gatilho(usuario_id=usuario_id, nome=nome.strip())
+    try:
+        db.add(gatilho)
+        await db.commit()
+        await db.refresh(gatilho)
+        return gatilho
+    except IntegrityError:
+        await db.rollback()
+        return None  # Gatilho duplicado para este usuário
+
+
+async def get_gatilhos_usuario(db: AsyncSession,
+                               usuario_id: int) -> list[Gatilho]:
+    """Lista todos os gatilhos de um usuário, ordenados alfabeticamente."""
+    result = await db.scalars(
+        select(Gatilho)
+        .where(Gatilho.usuario_id == usuario_id)
+        .order_by(Gatilho.nome)
+    )
+    return list(result)
+
+
+async def get_gatilho(db: AsyncSession,
+                      gatilho_id: int,
+                      usuario_id: int) -> Gatilho | None:
+    """Busca um gatilho específico do usuário."""
+    return await db.scalar(
+        select(Gatilho)
+        .where(Gatilho.id == gatilho_id, Gatilho.usuario_id == usuario_id)
+    )
+
+
+async def update_gatilho(db: AsyncSession, gatilho: Gatilho,
+                         nome: str) -> Gatilho | None:
+    """Atualiza o nome de um gatilho."""
+    gatilho.nome = nome.strip()
+    try:
+        await db.commit()
+        return gatilho
+    except IntegrityError:
+        await db.rollback()
+        return None  # Nome duplicado
+
+
+
+async def get_gatilho_by_nome(db: AsyncSession,
+                              usuario_id: int,
+                              nome: str) -> Gatilho | None:
+    """Busca gatilho pelo nome (útil para validação de duplicatas)."""
+    return await db.scalar(
+        select(Gatilho)
+        .where(Gatilho.usuario_id == usuario_id, Gatilho.nome == nome.strip())
+    )
+
+
+async def patch_gatilho(db: AsyncSession, gatilho_id: int, usuario_id: int,
+                        nome: str) -> dict | None:
+    """
+    Renomeia com um único UPDATE restrito ao dono. Devolve só o que mudou,
+    None se o gatilho não é do usuário; nome duplicado levanta
+    IntegrityError (após o rollback).
+    """
+    nome = nome.strip()
+    try:
+        resultado = await db.execute(
+            update(Gatilho)
+            .where(Gatilho.id == gatilho_id, Gatilho.usuario_id == usuario_id)
+            .values(nome=nome))
+        await db.commit()
+    except IntegrityError:
+        await db.rollback()
+        raise
+    if resultado.rowcount == 0:
+        return None
+    return {"id": gatilho_id, "nome": nome}
+
+
+async def delete_gatilho_usuario(db: AsyncSession, gatilho_id: int,
+                                 usuario_id: int) -> bool:
+    """
+    DELETE direto do gatilho do usuário; as associações com episódios
+    saem por ON DELETE CASCADE. False se nada foi removido.
+    """
+    resultado = await db.execute(
+        delete(Gatilho)
+        .where(Gatilho.id == gatilho_id, Gatilho.usuario_id == usuario_id))
+    await db.commit()
+    return resultado.rowcount > 0
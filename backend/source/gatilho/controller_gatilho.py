@@ -1,6 +1,7 @@
 """
 Controller para Gatilhos - Lógica de negócio para CRUD de gatilhos.
 """
+from sqlalchemy import delete, update
 from sqlalchemy.orm import Session
 from sqlalchemy.exc import IntegrityError
 from .model_gatilho import Gatilho
@@ -45,22 +46,12 @@ def update_gatilho(db: Session, gatilho: Gatilho, nome: str) -> Gatilho | None:
     gatilho.nome = nome.strip()
     try:
         db.commit()
-        db.refresh(gatilho)
         return gatilho
     except IntegrityError:
         db.rollback()
         return None  # Nome duplicado
 
 
-def delete_gatilho(db: Session, gatilho: Gatilho) -> None:
-    """
-    Deleta um gatilho.
-    Nota: Associações com episódios são
-    removidas automaticamente (ON DELETE CASCADE).
-    """
-    db.delete(gatilho)
-    db.commit()
-
 
 def get_gatilho_by_nome(db: Session,
                         usuario_id: int,
@@ -71,3 +62,38 @@ def get_gatilho_by_nome(db: Session,
         .filter(Gatilho.usuario_id == usuario_id, Gatilho.nome == nome.strip())
         .first()
     )
+
+
+def patch_gatilho(db: Session, gatilho_id: int, usuario_id: int,
+                  nome: str) -> dict | None:
+    """
+    Renomeia com um único UPDATE restrito ao dono. Devolve só o que mudou,
+    None se o gatilho não é do usuário; nome duplicado levanta
+    IntegrityError (após o rollback).
+    """
+    nome = nome.strip()
+    try:
+        resultado = db.execute(
+            update(Gatilho)
+            .where(Gatilho.id == gatilho_id, Gatilho.usuario_id == usuario_id)
+            .values(nome=nome))
+        db.commit()
+    except IntegrityError:
+        db.rollback()
+        raise
+    if resultado.rowcount == 0:
+        return None
+    return {"id": gatilho_id, "nome": nome}
+
+
+def delete_gatilho_usuario(db: Session, gatilho_id: int,
+                           usuario_id: int) -> bool:
+    """
+    DELETE direto do gatilho do usuário; as associações com episódios
+    saem por ON DELETE CASCADE. False se nada foi removido.
+    """
+    resultado = db.execute(
+        delete(Gatilho)
+        .where(Gatilho.id == gatilho_id, Gatilho.usuario_id == usuario_id))
+    db.commit()
+    return resultado.rowcount > 0
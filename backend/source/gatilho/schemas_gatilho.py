@@ -1,4 +1,5 @@
 from datetime import datetime
+from typing import Optional
 from pydantic import BaseModel, Field, constr
 
 # pylint: disable=too-few-public-methods
@@ -26,3 +27,9 @@ class GatilhoUpdate(BaseModel):
     nome: constr(strip_whitespace=True,
                  min_length=2, max_length=100) = Field(
                      ..., description="Novo nome para o gatilho")
+
+
+class GatilhoPatchOut(BaseModel):
+    """Resposta do PATCH: o id e só os campos alterados."""
+    id: int
+    nome: Optional[str] = None
@@ -19,7 +19,7 @@ from source.gatilho.controller_gatilho import (
     get_gatilho,
     get_gatilhos_usuario,
     update_gatilho,
-    delete_gatilho,
+    delete_gatilho_usuario,
 )
 from source.usuario.controller_usuario import create_usuario
 
@@ -68,7 +68,7 @@ def test_create_get_delete_gatilho(db):
     assert fetched is not None
     assert fetched.id == gat.id
 
-    delete_gatilho(db, fetched)
+    assert delete_gatilho_usuario(db, fetched.id, user.id)
     after = get_gatilho(db, gat.id, user.id)
     assert after is None
 
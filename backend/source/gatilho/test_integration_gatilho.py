@@ -51,3 +51,91 @@ def test_create_gatilho_invalid_returns_400(client, auth_header):
     # Nome obrigatório -> enviar payload vazio
     res = client.post("/api/gatilhos/", json={}, headers=headers)
     assert res.status_code in (422, 400)
+
+
+@pytest.mark.integration
+def test_crud_gatilho_async(async_client, async_auth_header):
+    """Mesmo CRUD pelas rotas assíncronas (DB_ASYNC)."""
+    headers = async_auth_header
+
+    res = async_client.post("/api/gatilhos/", json={"nome": "Cafeína"},
+                            headers=headers)
+    assert res.status_code == 201
+    gatilho_id = res.json()["id"]
+
+    res = async_client.put(f"/api/gatilhos/{gatilho_id}",
+                           json={"nome": "Café"}, headers=headers)
+    assert res.status_code == 200
+    assert res.json()["nome"] == "Café"
+
+    res = async_client.delete(f"/api/gatilhos/{gatilho_id}", headers=headers)
+    assert res.status_code == 204
+    res = async_client.get("/api/gatilhos/", headers=headers)
+    assert res.json() == []
+
+
+@pytest.mark.integration
+def test_listagem_le_da_replica_e_volta_ao_primario_apos_escrita(
+        client, auth_header, usuario_teste, tmp_path, monkeypatch):
+    """GET vai à réplica saudável; depois de uma escrita, ao primário."""
+    from sqlalchemy import create_engine
+    from config.database import Base
+    from config.replicas import Replica, replica_router
+    from source.gatilho.model_gatilho import Gatilho
+
+    replica_engine = create_engine(f"sqlite:///{tmp_path}/replica.db")
+    Base.metadata.create_all(bind=replica_engine)
+    with replica_engine.begin() as conn:
+        conn.execute(Gatilho.__table__.insert().values(
+            usuario_id=usuario_teste["id"], nome="Da Réplica"))
+    fora_do_ar = create_engine(f"sqlite:///{tmp_path}/nao/existe.db")
+
+    monkeypatch.setattr(replica_router, "replicas",
+                        [Replica(fora_do_ar), Replica(replica_engine)])
+    monkeypatch.setattr(replica_router, "_escritas", {})
+
+    for _ in range(2):  # round-robin pula a réplica indisponível
+        res = client.get("/api/gatilhos/", headers=auth_header)
+        assert [g["nome"] for g in res.json()] == ["Da Réplica"]
+    assert replica_router.replicas[0].failures == 1
+
+    res = client.post("/api/gatilhos/", json={"nome": "Recente"},
+                      headers=auth_header)
+    assert res.status_code == 201
+    res = client.get("/api/gatilhos/", headers=auth_header)
+    assert [g["nome"] for g in res.json()] == ["Recente"]
+    assert replica_router.stats()["sticky_reads"] >= 1
+
+
+@pytest.mark.integration
+def test_janela_de_escrita_segue_o_cliente_entre_workers(
+        client, auth_header, usuario_teste, tmp_path, monkeypatch):
+    """O marcador assinado leva a leitura ao primário em outro worker."""
+    from sqlalchemy import create_engine
+    from config.database import Base
+    from config.replicas import Replica, replica_router
+
+    replica_engine = create_engine(f"sqlite:///{tmp_path}/replica.db")
+    Base.metadata.create_all(bind=replica_engine)
+    monkeypatch.setattr(replica_router, "replicas", [Replica(replica_engine)])
+    monkeypatch.setattr(replica_router, "_escritas", {})
+
+    res = client.post("/api/gatilhos/", json={"nome": "Recente"},
+                      headers=auth_header)
+    marcador = res.headers["X-Last-Write"]
+    assert res.cookies["ultima_escrita"] == marcador
+    # Outro worker: não atendeu a escrita, só recebe o cookie
+    replica_router._escritas.clear()  # pylint: disable=protected-access
+    res = client.get("/api/gatilhos/", headers=auth_header)
+    assert [g["nome"] for g in res.json()] == ["Recente"]
+
+    client.cookies.clear()
+    res = client.get("/api/gatilhos/", headers=auth_header)
+    assert res.json() == []  # réplica atrasada
+    adulterado = marcador.replace(".", ".9", 1)
+    res = client.get("/api/gatilhos/",
+                     headers={**auth_header, "X-Last-Write": adulterado})
+    assert res.json() == []
+    res = client.get("/api/gatilhos/",
+                     headers={**auth_header, "X-Last-Write": marcador})
+    assert [g["nome"] for g in res.json()] == ["Recente"]
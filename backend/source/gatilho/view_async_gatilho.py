@@ -0,0 +1,165 @@
+"""
+View (Rotas) assíncronas para Gatilhos (modo `DB_ASYNC`).
+
+Mesmos endpoints e regras de `view_gatilho`, com `AsyncSession`.
+"""
+from fastapi import APIRouter, Depends, HTTPException, status
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.ext.asyncio import AsyncSession
+from config.database import get_async_db
+from source.usuario.view_async_usuario import get_current_user
+from .controller_async_gatilho import (
+    create_gatilho, get_gatilhos_usuario, get_gatilho,
+    update_gatilho, get_gatilho_by_nome, patch_gatilho,
+    delete_gatilho_usuario,
+)
+from .schemas_gatilho import (
+    GatilhoCreate, GatilhoOut, GatilhoPatchOut, GatilhoUpdate,
+)
+
+router = APIRouter()
+
+
+# --- ROTAS ---
+
+
+@router.post("/", response_model=GatilhoOut,
+             status_code=status.HTTP_201_CREATED,
+             tags=["Gatilhos"])
+async def criar_gatilho(
+    data: GatilhoCreate,
+    db: AsyncSession = Depends(get_async_db),
+    user=Depends(get_current_user)
+):
+    """
+    Cria um novo gatilho para o usuário logado.
+
+    **Regras de Negócio:**
+    - Nome deve ser único por usuário
+    - Nome é case-sensitive e será salvo com espaços removidos
+    """
+    if await get_gatilho_by_nome(db, user.id, data.nome):
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Gatilho já cadastrado"
+        )
+
+    gatilho = await create_gatilho(db, usuario_id=user.id, nome=data.nome)
+    if not gatilho:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Erro ao criar gatilho (possível duplicação)"
+        )
+    return gatilho
+
+
+@router.get("/", response_model=list[GatilhoOut], tags=["Gatilhos"])
+async def listar_gatilhos(
+    db: AsyncSession = Depends(get_async_db),
+    user=Depends(get_current_user)
+):
+    """
+    Lista todos os gatilhos do usuário logado, ordenados alfabeticamente.
+    """
+    return await get_gatilhos_usuario(db, usuario_id=user.id)
+
+
+@router.get("/{gatilho_id}", response_model=GatilhoOut, tags=["Gatilhos"])
+async def ver_gatilho(
+    gatilho_id: int,
+    db: AsyncSession = Depends(get_async_db),
+    user=Depends(get_current_user)
+):
+    """
+    Visualiza detalhes de um gatilho específico.
+    """
+    gatilho = await get_gatilho(db, gatilho_id, usuario_id=user.id)
+    if not gatilho:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Gatilho não encontrado"
+        )
+    return gatilho
+
+
+@router.put("/{gatilho_id}", response_model=GatilhoOut, tags=["Gatilhos"])
+async def editar_gatilho(
+    gatilho_id: int,
+    data: GatilhoUpdate,
+    db: AsyncSession = Depends(get_async_db),
+    user=Depends(get_current_user)
+):
+    """
+    Edita o nome de um gatilho.
+
+    **Regras de Negócio:**
+    - Novo nome deve ser único (não pode duplicar com outro gatilho do usuário)
+    """
+    gatilho = await get_gatilho(db, gatilho_id, usuario_id=user.id)
+    if not gatilho:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Gatilho não encontrado"
+        )
+
+    existing = await get_gatilho_by_nome(db, user.id, data.nome)
+    if existing and existing.id != gatilho_id:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Já existe outro gatilho com este nome"
+        )
+
+    gatilho = await update_gatilho(db, gatilho, nome=data.nome)
+    if not gatilho:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Erro ao atualizar gatilho"
+        )
+    return gatilho
+
+
+@router.patch("/{gatilho_id}", response_model=GatilhoPatchOut,
+              response_model_exclude_unset=True, tags=["Gatilhos"])
+async def renomear_gatilho(
+    gatilho_id: int,
+    data: GatilhoUpdate,
+    db: AsyncSession = Depends(get_async_db),
+    user=Depends(get_current_user)
+):
+    """
+    Renomeia um gatilho com um único UPDATE e devolve só o que mudou.
+    """
+    try:
+        alterado = await patch_gatilho(db, gatilho_id, user.id, data.nome)
+    except IntegrityError as exc:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Já existe outro gatilho com este nome"
+        ) from exc
+    if alterado is None:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Gatilho não encontrado"
+        )
+    return alterado
+
+
+@router.delete("/{gatilho_id}",
+               status_code=status.HTTP_204_NO_CONTENT,
+               tags=["Gatilhos"])
+async def excluir_gatilho(
+    gatilho_id: int,
+    db: AsyncSession = Depends(get_async_db),
+    user=Depends(get_current_user)
+):
+    """
+    Exclui um gatilho.
+
+    **Nota:** Associações com episódios serão removidas automaticamente.
+    """
+    if not await delete_gatilho_usuario(db, gatilho_id, usuario_id=user.id):
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Gatilho não encontrado"
+        )
+    # endpoint retorna 204 No Content quando excluído com sucesso
@@ -2,14 +2,18 @@
 View (Rotas) para Gatilhos - Endpoints REST para gerenciar gatilhos.
 """
 from fastapi import APIRouter, Depends, HTTPException, status
+from sqlalchemy.exc import IntegrityError
 from sqlalchemy.orm import Session
 from config.database import get_db
-from source.usuario.view_usuario import get_current_user
+from source.usuario.view_usuario import get_current_user, get_read_db
 from .controller_gatilho import (
     create_gatilho, get_gatilhos_usuario, get_gatilho,
-    update_gatilho, delete_gatilho, get_gatilho_by_nome
+    update_gatilho, get_gatilho_by_nome, patch_gatilho,
+    delete_gatilho_usuario,
+)
+from .schemas_gatilho import (
+    GatilhoCreate, GatilhoOut, GatilhoPatchOut, GatilhoUpdate,
 )
-from .schemas_gatilho import GatilhoCreate, GatilhoOut, GatilhoUpdate
 
 router = APIRouter()
 
@@ -49,7 +53,7 @@ def criar_gatilho(
 
 @router.get("/", response_model=list[GatilhoOut], tags=["Gatilhos"])
 def listar_gatilhos(
-    db: Session = Depends(get_db),
+    db: Session = Depends(get_read_db),
     user=Depends(get_current_user)
 ):
     """
@@ -61,7 +65,7 @@ def listar_gatilhos(
 @router.get("/{gatilho_id}", response_model=GatilhoOut, tags=["Gatilhos"])
 def ver_gatilho(
     gatilho_id: int,
-    db: Session = Depends(get_db),
+    db: Session = Depends(get_read_db),
     user=Depends(get_current_user)
 ):
     """
@@ -112,6 +116,32 @@ def editar_gatilho(
     return gatilho
 
 
+@router.patch("/{gatilho_id}", response_model=GatilhoPatchOut,
+              response_model_exclude_unset=True, tags=["Gatilhos"])
+def renomear_gatilho(
+    gatilho_id: int,
+    data: GatilhoUpdate,
+    db: Session = Depends(get_db),
+    user=Depends(get_current_user)
+):
+    """
+    Renomeia um gatilho com um único UPDATE e devolve só o que mudou.
+    """
+    try:
+        alterado = patch_gatilho(db, gatilho_id, user.id, data.nome)
+    except IntegrityError as exc:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Já existe outro gatilho com este nome"
+        ) from exc
+    if alterado is None:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Gatilho não encontrado"
+        )
+    return alterado
+
+
 @router.delete("/{gatilho_id}",
                status_code=status.HTTP_204_NO_CONTENT,
                tags=["Gatilhos"])
@@ -125,11 +155,9 @@ def excluir_gatilho(
 
     **Nota:** Associações com episódios serão removidas automaticamente.
     """
-    gatilho = get_gatilho(db, gatilho_id, usuario_id=user.id)
-    if not gatilho:
+    if not delete_gatilho_usuario(db, gatilho_id, usuario_id=user.id):
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="Gatilho não encontrado"
         )
-    delete_gatilho(db, gatilho)
     # endpoint retorna 204 No Content quando excluído com sucesso
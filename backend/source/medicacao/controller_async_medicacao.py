@@ -0,0 +1,121 @@
+"""
+Controller assíncrono para Medicações (modo `DB_ASYNC`).
+
+Mesmas regras de `controller_medicacao`, sobre `AsyncSession`.
+"""
+from sqlalchemy import delete, select, update
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.ext.asyncio import AsyncSession
+from .model_medicacao import Medicacao
+
+
+async def create_medicacao(db: AsyncSession,
+                           usuario_id: int,
+                           nome: str,
+                           dosagem: str | None = None) -> Medicacao | None:
+    """Cria uma nova medicação para o usuário."""
+    medicacao = Medicacao(
+        usuario_id=usuario_id,
+        nome=nome.strip(),
+        dosagem=dosagem.strip() if dosagem else None
+    )
+    try:
+        db.add(medicacao)
+        await db.commit()
+        return medicacao
+    except IntegrityError:
+        await db.rollback()
+        return None  # Medicação duplicada para este usuário
+
+
+async def get_medicacoes_usuario(db: AsyncSession,
+                                 usuario_id: int) -> list[Medicacao]:
+    """Lista todas as medicações de um usuário, ordenadas alfabeticamente."""
+    result = await db.scalars(
+        select(Medicacao)
+        .where(Medicacao.usuario_id == usuario_id)
+        .order_by(Medicacao.nome)
+    )
+    return list(result)
+
+
+async def get_medicacao(db: AsyncSession,
+                        medicacao_id: int,
+                        usuario_id: int) -> Medicacao | None:
+    """Busca uma medicação específica do usuário."""
+    return await db.scalar(
+        select(Medicacao)
+        .where(Medicacao.id == medicacao_id,
+               Medicacao.usuario_id == usuario_id)
+    )
+
+
+async def update_medicacao(db: AsyncSession, medicacao: Medicacao,
+                           nome: str | None = None,
+                           dosagem: str | None = None) -> Medicacao | None:
+    """Atualiza uma medicação (dosagem None remove a dosagem)."""
+    if nome is not None:
+        medicacao.nome = nome.strip()
+    medicacao.dosagem = dosagem.strip() if dosagem else None
+
+    try:
+        await db.commit()
+        await db.refresh(medicacao)
+        return medicacao
+    except IntegrityError:
+        await db.rollback()
+        return None  # Nome duplicado ou erro
+
+
+
+async def get_medicacao_by_nome(db: AsyncSession,
+                                usuario_id: int,
+                                nome: str) -> Medicacao | None:
+    """Busca medicação pelo nome (útil para validação de duplicatas)."""
+    return await db.scalar(
+        select(Medicacao)
+        .where(Medicacao.usuario_id == usuario_id,
+               Medicacao.nome == nome.strip())
+    )
+
+
+async def patch_medicacao(db: AsyncSession, medicacao_id: int, usuario_id: int,
+                          **campos) -> dict | None:
+    """
+    Altera só os campos enviados (`dosagem` nula remove a dosagem) com um
+    único UPDATE restrito ao dono. Devolve só o que mudou, None se a
+    medicação não é do usuário; nome duplicado levanta IntegrityError.
+    """
+    filtro = (Medicacao.id == medicacao_id, Medicacao.usuario_id == usuario_id)
+    valores = {}
+    if campos.get("nome") is not None:
+        valores["nome"] = campos["nome"].strip()
+    if "dosagem" in campos:
+        valores["dosagem"] = (campos["dosagem"] or "").strip() or None
+    if not valores:
+        existe = await db.scalar(select(Medicacao.id).where(*filtro))
+        return {"id": medicacao_id} if existe else None
+    try:
+        resultado = await db.execute(
+            update(Medicacao).where(*filtro).values(**valores))
+        await db.commit()
+    except IntegrityError:
+        await db.rollback()
+        raise
+    if resultado.rowcount == 0:
+        return None
+    return {"id": medicacao_id, **valores}
+
+
+async def delete_medicacao_usuario(db: AsyncSession, medicacao_id: int,
+                                   usuario_id: int) -> bool:
+    """
+    DELETE direto da medicação do usuário; as associações com episódios
+    saem por ON DELETE CASCADE. False se nada foi removido.
+    """
+    resultado = await db.execute(
+        delete(Medicacao)
+        .where(Medicacao.id == medicacao_id,
+               Medicacao.usuario_id == usuario_id))
+    await db.commit()
+    return resultado.rowcount > 0
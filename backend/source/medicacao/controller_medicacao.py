@@ -1,6 +1,7 @@
 """
 Controller para Medicações - Lógica de negócio para CRUD de medicações.
 """
+from sqlalchemy import delete, select, update
 from sqlalchemy.orm import Session
 from sqlalchemy.exc import IntegrityError
 from .model_medicacao import Medicacao
@@ -19,7 +20,6 @@ def create_medicacao(db: Session,
     try:
         db.add(medicacao)
         db.commit()
-        db.refresh(medicacao)
         return medicacao
     except IntegrityError:
         db.rollback()
@@ -69,14 +69,6 @@ def update_medicacao(db, medicacao: Medicacao,
         return None  # Nome duplicado ou erro
 
 
-def delete_medicacao(db: Session, medicacao: Medicacao) -> None:
-    """
-    Deleta uma medicação.
-    Nota: Associações com episódios são removidas automaticamente (ON DELETE CASCADE).
-    """
-    db.delete(medicacao)
-    db.commit()
-
 
 def get_medicacao_by_nome(db: Session,
                           usuario_id: int, nome: str) -> Medicacao | None:
@@ -86,3 +78,45 @@ def get_medicacao_by_nome(db: Session,
         .filter(Medicacao.usuario_id == usuario_id, Medicacao.nome == nome.strip())
         .first()
     )
+
+
+def patch_medicacao(db: Session, medicacao_id: int, usuario_id: int,
+                    **campos) -> dict | None:
+    """
+    Altera só os campos enviados (`dosagem` nula remove a dosagem) com um
+    único UPDATE restrito ao dono. Devolve só o que mudou, None se a
+    medicação não é do usuário; nome duplicado levanta IntegrityError.
+    """
+    filtro = (Medicacao.id == medicacao_id, Medicacao.usuario_id == usuario_id)
+    valores = {}
+    if campos.get("nome") is not None:
+        valores["nome"] = campos["nome"].strip()
+    if "dosagem" in campos:
+        valores["dosagem"] = (campos["dosagem"] or "").strip() or None
+    if not valores:
+        existe = db.scalar(select(Medicacao.id).where(*filtro))
+        return {"id": medicacao_id} if existe else None
+    try:
+        resultado = db.execute(
+            update(Medicacao).where(*filtro).values(**valores))
+        db.commit()
+    except IntegrityError:
+        db.rollback()
+        raise
+    if resultado.rowcount == 0:
+        return None
+    return {"id": medicacao_id, **valores}
+
+
+def delete_medicacao_usuario(db: Session, medicacao_id: int,
+                             usuario_id: int) -> bool:
+    """
+    DELETE direto da medicação do usuário; as associações com episódios
+    saem por ON DELETE CASCADE. False se nada foi removido.
+    """
+    resultado = db.execute(
+        delete(Medicacao)
+        .where(Medicacao.id == medicacao_id,
+               Medicacao.usuario_id == usuario_id))
+    db.commit()
+    return resultado.rowcount > 0
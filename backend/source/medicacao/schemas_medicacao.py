@@ -47,3 +47,11 @@ class MedicacaoUpdate(BaseModel):
         None,
         description="Nova dosagem (ou null para remover)",
     )
+
+
+class MedicacaoPatchOut(BaseModel):
+    # pylint: disable=too-few-public-methods
+    """Resposta do PATCH: o id e só os campos alterados."""
+    id: int
+    nome: Optional[str] = None
+    dosagem: Optional[str] = None
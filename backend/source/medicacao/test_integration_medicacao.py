@@ -51,3 +51,25 @@ def test_create_medicacao_invalid_returns_400(client, auth_header):
     # Falta de campos obrigatórios
     res = client.post("/api/medicacoes/", json={"nome": ""}, headers=headers)
     assert res.status_code in (422, 400)
+
+
+@pytest.mark.integration
+def test_crud_medicacao_async(async_client, async_auth_header):
+    """Mesmo CRUD pelas rotas assíncronas (DB_ASYNC)."""
+    headers = async_auth_header
+
+    res = async_client.post("/api/medicacoes/",
+                            json={"nome": "Dipirona", "dosagem": "500mg"},
+                            headers=headers)
+    assert res.status_code == 201
+    medicacao_id = res.json()["id"]
+
+    res = async_client.get("/api/medicacoes/", headers=headers)
+    assert [m["id"] for m in res.json()] == [medicacao_id]
+
+    res = async_client.delete(f"/api/medicacoes/{medicacao_id}",
+                              headers=headers)
+    assert res.status_code == 204
+    res = async_client.delete(f"/api/medicacoes/{medicacao_id}",
+                              headers=headers)
+    assert res.status_code == 404
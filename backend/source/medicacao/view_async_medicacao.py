@@ -0,0 +1,164 @@
+"""
+View (Rotas) assíncronas para Medicações (modo `DB_ASYNC`).
+
+Mesmos endpoints e regras de `view_medicacao`, com `AsyncSession`.
+"""
+from fastapi import APIRouter, Depends, HTTPException, status
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.ext.asyncio import AsyncSession
+from config.database import get_async_db
+from source.usuario.view_async_usuario import get_current_user
+from source.medicacao.schemas_medicacao import (
+    MedicacaoCreate, MedicacaoOut, MedicacaoPatchOut, MedicacaoUpdate)
+from .controller_async_medicacao import (
+    create_medicacao, get_medicacoes_usuario, get_medicacao,
+    get_medicacao_by_nome, update_medicacao, patch_medicacao,
+    delete_medicacao_usuario,
+)
+
+router = APIRouter()
+
+# --- ROTAS ---
+
+
+@router.post("/", response_model=MedicacaoOut,
+             status_code=status.HTTP_201_CREATED, tags=["Medicações"])
+async def criar_medicacao(
+    data: MedicacaoCreate,
+    db: AsyncSession = Depends(get_async_db),
+    user=Depends(get_current_user)
+):
+    """
+    Cria uma nova medicação para o usuário logado.
+
+    **Regras de Negócio:**
+    - Nome deve ser único por usuário
+    - Dosagem é opcional
+    """
+    if await get_medicacao_by_nome(db, user.id, data.nome):
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Medicação já cadastrada"
+        )
+
+    medicacao = await create_medicacao(
+        db, usuario_id=user.id,
+        nome=data.nome, dosagem=data.dosagem)
+    if not medicacao:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Erro ao criar medicação (possível duplicação)"
+        )
+    return medicacao
+
+
+@router.get("/", response_model=list[MedicacaoOut], tags=["Medicações"])
+async def listar_medicacoes(
+    db: AsyncSession = Depends(get_async_db),
+    user=Depends(get_current_user)
+):
+    """
+    Lista todas as medicações do usuário logado, ordenadas alfabeticamente.
+    """
+    return await get_medicacoes_usuario(db, usuario_id=user.id)
+
+
+@router.get(
+    "/{medicacao_id}", response_model=MedicacaoOut, tags=["Medicações"]
+)
+async def ver_medicacao(
+    medicacao_id: int,
+    db: AsyncSession = Depends(get_async_db),
+    user=Depends(get_current_user)
+):
+    """
+    Visualiza detalhes de uma medicação específica.
+    """
+    medicacao = await get_medicacao(db, medicacao_id, usuario_id=user.id)
+    if not medicacao:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Medicação não encontrada"
+        )
+    return medicacao
+
+
+@router.put(
+    "/{medicacao_id}", response_model=MedicacaoOut, tags=["Medicações"]
+)
+async def editar_medicacao(
+    medicacao_id: int,
+    data: MedicacaoUpdate,
+    db: AsyncSession = Depends(get_async_db),
+    user=Depends(get_current_user)
+):
+    medicacao = await get_medicacao(db, medicacao_id, usuario_id=user.id)
+    if not medicacao:
+        raise HTTPException(status_code=404, detail="Medicação não encontrada")
+
+    if data.nome is not None:
+        existing = await get_medicacao_by_nome(db, user.id, data.nome)
+        if existing and existing.id != medicacao_id:
+            raise HTTPException(
+                status_code=400,
+                detail="Já existe outra medicação com este nome")
+
+    updated_medicacao = await update_medicacao(
+        db,
+        medicacao,
+        nome=data.nome,
+        dosagem=data.dosagem
+    )
+
+    if updated_medicacao is None:
+        raise HTTPException(
+            status_code=400,
+            detail="Erro ao atualizar medicação"
+        )
+
+    return updated_medicacao
+
+
+@router.patch("/{medicacao_id}", response_model=MedicacaoPatchOut,
+              response_model_exclude_unset=True, tags=["Medicações"])
+async def atualizar_medicacao(
+    medicacao_id: int,
+    data: MedicacaoUpdate,
+    db: AsyncSession = Depends(get_async_db),
+    user=Depends(get_current_user)
+):
+    """
+    Altera só os campos enviados (`dosagem: null` remove a dosagem) com
+    um único UPDATE e devolve só o que mudou.
+    """
+    try:
+        alterado = await patch_medicacao(
+            db, medicacao_id, user.id, **data.model_dump(exclude_unset=True))
+    except IntegrityError as exc:
+        raise HTTPException(
+            status_code=400,
+            detail="Já existe outra medicação com este nome") from exc
+    if alterado is None:
+        raise HTTPException(status_code=404, detail="Medicação não encontrada")
+    return alterado
+
+
+@router.delete("/{medicacao_id}",
+               status_code=status.HTTP_204_NO_CONTENT,
+               tags=["Medicações"])
+async def excluir_medicacao(
+    medicacao_id: int,
+    db: AsyncSession = Depends(get_async_db),
+    user=Depends(get_current_user)
+):
+    """
+    Exclui uma medicação.
+
+    **Nota:** Associações com episódios serão removidas automaticamente.
+    """
+    if not await delete_medicacao_usuario(db, medicacao_id, usuario_id=user.id):
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Medicação não encontrada"
+        )
+    # Retorna 204 No Content quando excluído com sucesso
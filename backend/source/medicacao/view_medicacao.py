@@ -2,14 +2,16 @@
 View (Rotas) para Medicações - Endpoints REST para gerenciar medicações.
 """
 from fastapi import APIRouter, Depends, HTTPException, status
+from sqlalchemy.exc import IntegrityError
 from sqlalchemy.orm import Session
 from config.database import get_db
-from source.usuario.view_usuario import get_current_user
+from source.usuario.view_usuario import get_current_user, get_read_db
 from source.medicacao.schemas_medicacao import (
-    MedicacaoCreate, MedicacaoOut, MedicacaoUpdate)
+    MedicacaoCreate, MedicacaoOut, MedicacaoPatchOut, MedicacaoUpdate)
 from .controller_medicacao import (
     create_medicacao, get_medicacoes_usuario, get_medicacao,
-    delete_medicacao, get_medicacao_by_nome, update_medicacao,
+    get_medicacao_by_nome, update_medicacao, patch_medicacao,
+    delete_medicacao_usuario,
 )
 
 router = APIRouter()
@@ -50,7 +52,7 @@ def criar_medicacao(
 
 @router.get("/", response_model=list[MedicacaoOut], tags=["Medicações"])
 def listar_medicacoes(
-    db: Session = Depends(get_db),
+    db: Session = Depends(get_read_db),
     user=Depends(get_current_user)
 ):
     """
@@ -64,7 +66,7 @@ def listar_medicacoes(
 )
 def ver_medicacao(
     medicacao_id: int,
-    db: Session = Depends(get_db),
+    db: Session = Depends(get_read_db),
     user=Depends(get_current_user)
 ):
     """
@@ -115,6 +117,30 @@ def editar_medicacao(
     return updated_medicacao
 
 
+@router.patch("/{medicacao_id}", response_model=MedicacaoPatchOut,
+              response_model_exclude_unset=True, tags=["Medicações"])
+def atualizar_medicacao(
+    medicacao_id: int,
+    data: MedicacaoUpdate,
+    db: Session = Depends(get_db),
+    user=Depends(get_current_user)
+):
+    """
+    Altera só os campos enviados (`dosagem: null` remove a dosagem) com
+    um único UPDATE e devolve só o que mudou.
+    """
+    try:
+        alterado = patch_medicacao(
+            db, medicacao_id, user.id, **data.model_dump(exclude_unset=True))
+    except IntegrityError as exc:
+        raise HTTPException(
+            status_code=400,
+            detail="Já existe outra medicação com este nome") from exc
+    if alterado is None:
+        raise HTTPException(status_code=404, detail="Medicação não encontrada")
+    return alterado
+
+
 @router.delete("/{medicacao_id}",
                status_code=status.HTTP_204_NO_CONTENT,
                tags=["Medicações"])
@@ -128,11 +154,9 @@ def excluir_medicacao(
 
     **Nota:** Associações com episódios serão removidas automaticamente.
     """
-    medicacao = get_medicacao(db, medicacao_id, usuario_id=user.id)
-    if not medicacao:
+    if not delete_medicacao_usuario(db, medicacao_id, usuario_id=user.id):
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="Medicação não encontrada"
         )
-    delete_medicacao(db, medicacao)
     # Retorna 204 No Content quando excluído com sucesso
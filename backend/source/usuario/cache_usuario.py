@@ -0,0 +1,104 @@
+"""
+Cache em memória de usuários autenticados (principal) por processo.
+
+Evita que `get_current_user` consulte a tabela `usuarios` a cada
+requisição: o resultado de `get_usuario_by_email` é guardado por um tempo
+limitado (TTL), indexado pelo `sub` do token. O cache é local a cada
+worker; alterações feitas em outro processo só aparecem após o TTL.
+"""
+import threading
+import time
+from collections import OrderedDict
+
+from sqlalchemy.orm import Session, make_transient_to_detached
+
+from config.settings import settings
+from .model_usuario import Usuario
+
+# Colunas copiadas para o snapshot; `senha_hash` fica fora de propósito
+# e é carregada sob demanda caso algum handler precise dela.
+CACHED_FIELDS = ("id", "nome", "email", "data_cadastro")
+
+
+class PrincipalCache:
+    """Cache LRU limitado com expiração por TTL, seguro entre threads."""
+
+    def __init__(self, max_size: int, ttl_seconds: float):
+        self.max_size = max_size
+        self.ttl_seconds = ttl_seconds
+        self.hits = 0
+        self.misses = 0
+        self._entries: OrderedDict = OrderedDict()
+        self._lock = threading.Lock()
+
+    @property
+    def enabled(self) -> bool:
+        return self.max_size > 0 and self.ttl_seconds > 0
+
+    def get(self, subject: str):
+        """Retorna o snapshot do usuário ou None (conta hit/miss)."""
+        if not self.enabled:
+            return None
+        with self._lock:
+            entry = self._entries.get(subject)
+            if entry is None or entry[0] < time.monotonic():
+                if entry is not None:
+                    del self._entries[subject]
+                self.misses += 1
+                return None
+            self._entries.move_to_end(subject)
+            self.hits += 1
+            return entry[1]
+
+    def set(self, subject: str, snapshot: dict) -> None:
+        if not self.enabled:
+            return
+        expires_at = time.monotonic() + self.ttl_seconds
+        with self._lock:
+            self._entries[subject] = (expires_at, snapshot)
+            self._entries.move_to_end(subject)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+
+    def invalidate(self, *subjects: str) -> None:
+        with self._lock:
+            for subject in subjects:
+                if subject:
+                    self._entries.pop(subject, None)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self.hits = 0
+            self.misses = 0
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "size": len(self._entries),
+                "max_size": self.max_size,
+                "ttl_seconds": self.ttl_seconds,
+                "hits": self.hits,
+                "misses": self.misses,
+            }
+
+
+principal_cache = PrincipalCache(
+    max_size=settings.PRINCIPAL_CACHE_MAX_SIZE,
+    ttl_seconds=settings.PRINCIPAL_CACHE_TTL_SECONDS,
+)
+
+
+def snapshot_usuario(usuario: Usuario) -> dict:
+    return {field: getattr(usuario, field) for field in CACHED_FIELDS}
+
+
+def attach_snapshot(db: Session, snapshot: dict) -> Usuario:
+    """
+    Reconstrói o `Usuario` a partir do snapshot e o anexa à sessão
+    sem emitir SQL (merge com load=False), de modo que os handlers
+    de `/me` continuem recebendo uma instância persistente.
+    """
+    usuario = Usuario(**snapshot)
+    make_transient_to_detached(usuario)
+    return db.merge(usuario, load=False)
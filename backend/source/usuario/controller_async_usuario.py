@@ -0,0 +1,66 @@
+"""
+Controller assíncrono para Usuários (modo `DB_ASYNC`).
+
+Mesmas regras de `controller_usuario`, sobre `AsyncSession`; o hash da
+senha continua no executor de hashing (`hash_password_async`).
+"""
+from sqlalchemy import delete, select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from source.episodio.model_episodio import Episodio
+from source.gatilho.model_gatilho import Gatilho
+from source.medicacao.model_medicacao import Medicacao
+from .model_usuario import Usuario, usuarios_excluidos
+from .cache_usuario import principal_cache
+from .controller_usuario import registro_exclusao
+from .revogacao_usuario import revocation_filter
+
+
+async def save_usuario(db: AsyncSession, nome: str, email: str,
+                       senha_hash: str):
+    db_user = Usuario(nome=nome, email=email, senha_hash=senha_hash)
+    db.add(db_user)
+    await db.commit()
+    await db.refresh(db_user)
+    return db_user
+
+
+async def get_usuario_by_email(db: AsyncSession, email: str):
+    return await db.scalar(select(Usuario).where(Usuario.email == email))
+
+
+async def update_usuario(
+    db: AsyncSession,
+    usuario: Usuario,
+    nome: str = None,
+    email: str = None,
+):
+    email_antigo = usuario.email
+    if nome:
+        usuario.nome = nome
+    if email:
+        usuario.email = email
+    await db.commit()
+    # Invalida pelo email antigo e pelo novo (ambos podem ser `sub` de tokens)
+    principal_cache.invalidate(email_antigo, usuario.email)
+    await db.refresh(usuario)
+    return usuario
+
+
+async def delete_usuario(db: AsyncSession, usuario: Usuario):
+    """
+    Remove usuário e registros relacionados em ordem segura
+    (mesma estratégia de `controller_usuario.delete_usuario`).
+    """
+    email = usuario.email
+    for model in (Episodio, Gatilho, Medicacao):
+        await db.execute(
+            delete(model).where(model.usuario_id == usuario.id),
+            execution_options={"synchronize_session": False},
+        )
+    await db.execute(usuarios_excluidos.insert(),
+                     [registro_exclusao(usuario.id)])
+    await db.delete(usuario)
+    await db.commit()
+    principal_cache.invalidate(email)
+    revocation_filter.mark_deleted(usuario.id)
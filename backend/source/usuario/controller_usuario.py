@@ -1,13 +1,18 @@
+from datetime import datetime, timedelta
+
 from sqlalchemy.orm import Session
-from passlib.context import CryptContext
+from config.hashing import LazyCryptContext, hashing_executor
+from config.settings import settings
 
 # imports locais usados apenas na função de exclusão para evitar ciclos
 from source.episodio.model_episodio import Episodio
 from source.gatilho.model_gatilho import Gatilho
 from source.medicacao.model_medicacao import Medicacao
-from .model_usuario import Usuario
+from .model_usuario import Usuario, usuarios_excluidos
+from .cache_usuario import principal_cache
+from .revogacao_usuario import revocation_filter
 
-pwd_context = CryptContext(schemes=["argon2"], deprecated="auto")
+pwd_context = LazyCryptContext()
 MAX_PASSWORD_LENGTH = 72
 
 
@@ -17,8 +22,16 @@ def hash_password(senha: str) -> str:
     return pwd_context.hash(senha_truncada)
 
 
+async def hash_password_async(senha: str) -> str:
+    """`hash_password` executado no executor de hashing."""
+    return await hashing_executor.run(hash_password, senha)
+
+
 def create_usuario(db: Session, nome: str, email: str, senha: str):
-    senha_hash = hash_password(senha)
+    return save_usuario(db, nome, email, hash_password(senha))
+
+
+def save_usuario(db: Session, nome: str, email: str, senha_hash: str):
     db_user = Usuario(nome=nome, email=email, senha_hash=senha_hash)
     db.add(db_user)
     db.commit()
@@ -36,15 +49,27 @@ def update_usuario(
     nome: str = None,
     email: str = None,
 ):
+    email_antigo = usuario.email
     if nome:
         usuario.nome = nome
     if email:
         usuario.email = email
     db.commit()
+    # Invalida pelo email antigo e pelo novo (ambos podem ser `sub` de tokens)
+    principal_cache.invalidate(email_antigo, usuario.email)
     db.refresh(usuario)
     return usuario
 
 
+def registro_exclusao(usuario_id: int) -> dict:
+    """Linha de `usuarios_excluidos`: vale enquanto um token emitido agora."""
+    return {
+        "usuario_id": usuario_id,
+        "expira_em": datetime.utcnow()
+        + timedelta(minutes=settings.ACCESS_TOKEN_EXPIRE_MINUTES),
+    }
+
+
 def delete_usuario(db: Session, usuario: Usuario):
     """
     Remove usuário e registros relacionados em ordem segura.
@@ -52,7 +77,12 @@ def delete_usuario(db: Session, usuario: Usuario):
     Estratégia: remover registros dependentes (episódios, gatilhos, medicações)
     antes de deletar o usuário para evitar que o ORM tente atribuir NULL
     a chaves estrangeiras que possuem `nullable=False`.
+
+    A exclusão fica em `usuarios_excluidos` (mesma transação): tokens sem
+    estado do usuário ainda válidos passam a receber 401.
     """
+    email = usuario.email
+
     # Apaga episódios do usuário (remove também entradas nas tabelas auxiliares)
     db.query(Episodio).filter(
         Episodio.usuario_id == usuario.id
@@ -67,5 +97,8 @@ def delete_usuario(db: Session, usuario: Usuario):
     ).delete(synchronize_session=False)
 
     # Por fim, apaga o usuário
+    db.execute(usuarios_excluidos.insert(), [registro_exclusao(usuario.id)])
     db.delete(usuario)
     db.commit()
+    principal_cache.invalidate(email)
+    revocation_filter.mark_deleted(usuario.id)
@@ -1,4 +1,5 @@
-from sqlalchemy import Column, Integer, String, DateTime, text
+from sqlalchemy import (Table, Column, Integer, String, DateTime,
+                        ForeignKey, text)
 from config.database import Base
 
 
@@ -12,3 +13,33 @@ class Usuario(Base):
     email = Column(String(100), unique=True, nullable=False, index=True)
     senha_hash = Column(String(255), nullable=False)
     data_cadastro = Column(DateTime, server_default=text("CURRENT_TIMESTAMP"))
+    token_geracao = Column(Integer, nullable=False, default=0,
+                           server_default=text("0"))
+
+
+# Log de revogações escrito pelo serviço de autenticação (somente leitura
+# aqui): um `jti` revogado (logout) ou uma nova `token_geracao` do usuário.
+tokens_revogados = Table(
+    "tokens_revogados",
+    Base.metadata,
+    Column("id", Integer, primary_key=True, autoincrement=True),
+    Column("usuario_id", Integer,
+           ForeignKey("usuarios.id", ondelete="CASCADE"), nullable=False),
+    Column("jti", String(32), nullable=True, unique=True),
+    Column("token_geracao", Integer, nullable=True),
+    Column("expira_em", DateTime, nullable=False),
+    Column("data_criacao", DateTime,
+           server_default=text("CURRENT_TIMESTAMP")),
+)
+
+
+# Contas excluídas pelo backend (`DELETE /me`). Sem FK para `usuarios`: a
+# linha sobrevive ao DELETE e o filtro de revogação derruba os tokens sem
+# estado do usuário até `expira_em` (validade máxima de um access token).
+usuarios_excluidos = Table(
+    "usuarios_excluidos",
+    Base.metadata,
+    Column("id", Integer, primary_key=True, autoincrement=True),
+    Column("usuario_id", Integer, nullable=False),
+    Column("expira_em", DateTime, nullable=False),
+)
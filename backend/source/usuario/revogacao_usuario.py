@@ -0,0 +1,221 @@
+"""
+Filtro de revogação de tokens mantido em memória.
+
+O serviço de autenticação registra revogações na tabela
+`tokens_revogados`: o `jti` de um access token (logout) ou uma nova
+`token_geracao` do usuário (troca de senha). Aqui elas viram duas
+estruturas compactas consultadas a cada requisição sem ir ao banco:
+
+- um mapa `usuario_id -> geração mínima válida`;
+- um filtro de Bloom com os `jti` revogados;
+- o conjunto de ids de contas excluídas (`usuarios_excluidos`, gravada
+  pelo próprio backend), que derruba os tokens sem estado do usuário.
+
+O filtro é montado a partir do banco no startup e sincronizado a cada
+`REVOCATION_SYNC_SECONDS` lendo as linhas novas. O id autoincremento é
+atribuído no INSERT, não no commit: uma revogação com id menor pode ficar
+visível depois de outra com id maior. Por isso cada sincronização relê as
+últimas `REVOCATION_SYNC_OVERLAP` linhas abaixo do maior id já visto, e o
+filtro é recarregado por inteiro a cada `REVOCATION_RELOAD_SECONDS`, o que
+limita a demora até para um commit muito atrasado. Um positivo do Bloom
+(raro) é confirmado no banco, então falsos positivos não derrubam tokens
+válidos; uma revogação leva no máximo um intervalo de sincronização para
+valer em cada worker.
+"""
+import hashlib
+import logging
+import math
+import threading
+import time
+from datetime import datetime
+
+from sqlalchemy import func, select
+from sqlalchemy.exc import SQLAlchemyError
+from sqlalchemy.orm import Session
+
+from config.settings import settings
+from .model_usuario import Usuario, tokens_revogados, usuarios_excluidos
+
+logger = logging.getLogger("uvicorn")
+
+
+class BloomFilter:
+    """Filtro de Bloom sobre `bytearray` com hashing duplo (blake2b)."""
+
+    def __init__(self, capacity: int, fp_rate: float = 0.01):
+        self.capacity = max(capacity, 1)
+        self.size = math.ceil(
+            -self.capacity * math.log(fp_rate) / (math.log(2) ** 2))
+        self.hashes = max(1, round(self.size / self.capacity * math.log(2)))
+        self.count = 0
+        self._bits = bytearray((self.size + 7) // 8)
+
+    @property
+    def nbytes(self) -> int:
+        return len(self._bits)
+
+    def _positions(self, item: str):
+        digest = hashlib.blake2b(item.encode("utf-8"), digest_size=16).digest()
+        h1 = int.from_bytes(digest[:8], "big")
+        h2 = int.from_bytes(digest[8:], "big") | 1
+        for i in range(self.hashes):
+            yield (h1 + i * h2) % self.size
+
+    def add(self, item: str) -> None:
+        for pos in self._positions(item):
+            self._bits[pos >> 3] |= 1 << (pos & 7)
+        self.count += 1
+
+    def __contains__(self, item: str) -> bool:
+        return all(self._bits[pos >> 3] & (1 << (pos & 7))
+                   for pos in self._positions(item))
+
+
+class RevocationFilter:
+    """Gerações por usuário + Bloom de `jti` + contas excluídas."""
+
+    def __init__(self, sync_seconds: float, capacity: int,
+                 overlap: int = 1000, reload_seconds: float = 600):
+        self.sync_seconds = sync_seconds
+        self.capacity = capacity
+        self.overlap = overlap
+        self.reload_seconds = reload_seconds
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self) -> None:
+        self._generations: dict[int, int] = {}
+        self._bloom = BloomFilter(self.capacity)
+        self._excluidos: set[int] = set()
+        self._last_id = 0
+        self._last_excluido = 0
+        self._loaded = False
+        self._next_sync = 0.0
+        self._reload_at = 0.0
+        self.confirmations = 0
+
+    def load(self, db: Session) -> None:
+        """Reconstrói gerações e Bloom a partir do banco."""
+        geracoes = dict(db.execute(
+            select(Usuario.id, Usuario.token_geracao)
+            .where(Usuario.token_geracao > 0)
+        ).all())
+        for usuario_id, geracao in db.execute(
+            select(tokens_revogados.c.usuario_id,
+                   func.max(tokens_revogados.c.token_geracao))
+            .where(tokens_revogados.c.token_geracao.is_not(None))
+            .group_by(tokens_revogados.c.usuario_id)
+        ).all():
+            geracoes[usuario_id] = max(geracoes.get(usuario_id, 0), geracao)
+        jtis = db.execute(
+            select(tokens_revogados.c.id, tokens_revogados.c.jti)
+            .where(tokens_revogados.c.jti.is_not(None),
+                   tokens_revogados.c.expira_em > datetime.utcnow())
+        ).all()
+        ultimo = db.execute(
+            select(tokens_revogados.c.id)
+            .order_by(tokens_revogados.c.id.desc()).limit(1)
+        ).scalar()
+
+        excluidos = db.execute(
+            select(usuarios_excluidos.c.id, usuarios_excluidos.c.usuario_id)
+            .where(usuarios_excluidos.c.expira_em > datetime.utcnow())
+        ).all()
+
+        bloom = BloomFilter(max(self.capacity, 2 * len(jtis)))
+        for _, jti in jtis:
+            bloom.add(jti)
+        self._generations, self._bloom = geracoes, bloom
+        self._excluidos = {usuario_id for _, usuario_id in excluidos}
+        self._last_id = ultimo or 0
+        self._last_excluido = max((id_ for id_, _ in excluidos), default=0)
+        self._loaded = True
+        self._reload_at = time.monotonic() + self.reload_seconds
+
+    def sync(self, db: Session) -> None:
+        """
+        Aplica as revogações novas e as que fizeram commit fora de ordem
+        (a janela de `overlap` ids abaixo do maior visto). Reaplicar uma
+        linha não muda nada: a geração é um máximo e o `jti` já no Bloom
+        não é contado de novo.
+        """
+        novas = db.execute(
+            select(tokens_revogados.c.id, tokens_revogados.c.usuario_id,
+                   tokens_revogados.c.jti, tokens_revogados.c.token_geracao)
+            .where(tokens_revogados.c.id > self._last_id - self.overlap)
+            .order_by(tokens_revogados.c.id)
+        ).all()
+        for id_, usuario_id, jti, geracao in novas:
+            if jti and jti not in self._bloom:
+                self._bloom.add(jti)
+            if geracao:
+                atual = self._generations.get(usuario_id, 0)
+                self._generations[usuario_id] = max(atual, geracao)
+            self._last_id = max(self._last_id, id_)
+        for id_, usuario_id in db.execute(
+            select(usuarios_excluidos.c.id, usuarios_excluidos.c.usuario_id)
+            .where(usuarios_excluidos.c.id > self._last_excluido - self.overlap)
+        ).all():
+            self._excluidos.add(usuario_id)
+            self._last_excluido = max(self._last_excluido, id_)
+        if self._bloom.count > self._bloom.capacity:
+            # Bloom saturado: reconstrói (descartando expirados) na próxima
+            self._loaded = False
+
+    def maybe_sync(self, db: Session) -> None:
+        agora = time.monotonic()
+        if agora < self._next_sync or not self._lock.acquire(blocking=False):
+            return
+        try:
+            if self._loaded and agora < self._reload_at:
+                self.sync(db)
+            else:
+                self.load(db)
+        except SQLAlchemyError as exc:
+            db.rollback()
+            logger.warning("Falha ao sincronizar revogações: %s", exc)
+        finally:
+            self._next_sync = agora + self.sync_seconds
+            self._lock.release()
+
+    def mark_deleted(self, usuario_id: int) -> None:
+        """Vale já neste worker; os demais veem a linha na sincronização."""
+        self._excluidos.add(usuario_id)
+
+    def is_revoked(self, db: Session, payload: dict) -> bool:
+        """
+        True se o token pertence a uma geração antiga, foi revogado ou é
+        de uma conta excluída.
+        """
+        self.maybe_sync(db)
+        uid, geracao = payload.get("uid"), payload.get("gen")
+        if uid is not None and uid in self._excluidos:
+            return True
+        if uid is not None and geracao is not None:
+            if geracao < self._generations.get(uid, 0):
+                return True
+        jti = payload.get("jti")
+        if not jti or jti not in self._bloom:
+            return False
+        # Possível falso positivo: confirma no banco
+        self.confirmations += 1
+        return db.execute(
+            select(tokens_revogados.c.id).where(tokens_revogados.c.jti == jti)
+        ).first() is not None
+
+    def stats(self) -> dict:
+        return {
+            "users_with_generation": len(self._generations),
+            "revoked_jtis": self._bloom.count,
+            "bloom_bytes": self._bloom.nbytes,
+            "deleted_users": len(self._excluidos),
+            "db_confirmations": self.confirmations,
+        }
+
+
+revocation_filter = RevocationFilter(
+    sync_seconds=settings.REVOCATION_SYNC_SECONDS,
+    capacity=settings.REVOCATION_BLOOM_CAPACITY,
+    overlap=settings.REVOCATION_SYNC_OVERLAP,
+    reload_seconds=settings.REVOCATION_RELOAD_SECONDS,
+)
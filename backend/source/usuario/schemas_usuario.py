@@ -1,7 +1,7 @@
 from typing import Optional
 from datetime import datetime
 
-from pydantic import BaseModel, EmailStr, constr
+from pydantic import BaseModel, ConfigDict, EmailStr, constr
 
 
 # pylint: disable=too-few-public-methods
@@ -30,3 +30,14 @@ class UserUpdate(BaseModel):
     nome: Optional[constr(min_length=3, max_length=100)] = None
     email: Optional[EmailStr] = None
     senha: Optional[constr(min_length=8, max_length=72)] = None
+
+
+# pylint: disable=too-few-public-methods
+class Principal(BaseModel):
+    """Usuário autenticado montado a partir das claims do token."""
+    id: int
+    email: str
+    nome: Optional[str] = None
+    token_geracao: int = 0
+
+    model_config = ConfigDict(frozen=True)
@@ -77,3 +77,147 @@ def test_register_duplicate_email_returns_400(client):
     # Tentativa de registrar novamente com mesmo email
     res2 = client.post("/api/usuarios/", json=payload)
     assert res2.status_code == 400
+
+
+@pytest.mark.integration
+def test_get_current_user_usa_cache(client, auth_header):
+    from source.usuario.cache_usuario import principal_cache
+
+    res = client.get("/api/usuarios/me", headers=auth_header)
+    assert res.status_code == 200
+    res = client.get("/api/gatilhos/", headers=auth_header)
+    assert res.status_code == 200
+    # Segunda requisição é atendida pelo cache, sem consultar `usuarios`
+    assert principal_cache.stats()["misses"] == 1
+    assert principal_cache.stats()["hits"] == 1
+
+    res = client.put("/api/usuarios/me", json={"nome": "Nome Cacheado"},
+                     headers=auth_header)
+    assert res.status_code == 200
+    res = client.get("/api/usuarios/me", headers=auth_header)
+    assert res.json()["nome"] == "Nome Cacheado"
+
+
+@pytest.mark.integration
+def test_stateless_token_dispensa_consulta(client, usuario_teste, monkeypatch):
+    from source.usuario.cache_usuario import principal_cache
+
+    monkeypatch.setattr(settings, "STATELESS_TOKENS", True)
+    token = jwt.encode(
+        {
+            "sub": usuario_teste["email"],
+            "uid": usuario_teste["id"],
+            "gen": 0,
+            "nome": usuario_teste["nome"],
+        },
+        settings.SECRET_KEY,
+        algorithm=settings.ALGORITHM,
+    )
+    headers = {"Authorization": f"Bearer {token}"}
+
+    res = client.post("/api/gatilhos/", json={"nome": "Sono"}, headers=headers)
+    assert res.status_code == 201
+    res = client.get("/api/gatilhos/", headers=headers)
+    assert [g["nome"] for g in res.json()] == ["Sono"]
+    # Nem cache nem banco foram consultados para identificar o usuário
+    assert principal_cache.stats()["misses"] == 0
+
+    # Rotas de /me carregam o Usuario sob demanda
+    res = client.put("/api/usuarios/me", json={"nome": "Sem Estado"},
+                     headers=headers)
+    assert res.status_code == 200
+    assert res.json()["nome"] == "Sem Estado"
+
+
+@pytest.mark.integration
+def test_token_revogado_retorna_401(client, db, usuario_teste):
+    from datetime import datetime, timedelta
+    from source.usuario.model_usuario import tokens_revogados
+    from source.usuario.revogacao_usuario import revocation_filter
+
+    def header(jti):
+        token = jwt.encode(
+            {"sub": usuario_teste["email"], "uid": usuario_teste["id"],
+             "gen": 0, "jti": jti},
+            settings.SECRET_KEY,
+            algorithm=settings.ALGORITHM,
+        )
+        return {"Authorization": f"Bearer {token}"}
+
+    assert client.get("/api/usuarios/me", headers=header("j1")).status_code == 200
+
+    db.execute(tokens_revogados.insert(), [{
+        "usuario_id": usuario_teste["id"],
+        "jti": "j1",
+        "expira_em": datetime.utcnow() + timedelta(minutes=15),
+    }])
+    db.commit()
+    revocation_filter.reset()  # força a sincronização na próxima requisição
+
+    assert client.get("/api/usuarios/me", headers=header("j1")).status_code == 401
+    assert client.get("/api/usuarios/me", headers=header("j2")).status_code == 200
+
+    # Nova geração (troca de senha) invalida todos os tokens anteriores
+    db.execute(tokens_revogados.insert(), [{
+        "usuario_id": usuario_teste["id"],
+        "token_geracao": 1,
+        "expira_em": datetime.utcnow() + timedelta(minutes=15),
+    }])
+    db.commit()
+    revocation_filter.reset()
+    assert client.get("/api/usuarios/me", headers=header("j2")).status_code == 401
+
+
+@pytest.mark.integration
+@pytest.mark.parametrize("modo", ["sync", "async"])
+def test_stateless_token_de_usuario_excluido_retorna_401(request, modo,
+                                                         monkeypatch):
+    from source.usuario.revogacao_usuario import revocation_filter
+
+    client = request.getfixturevalue(
+        "client" if modo == "sync" else "async_client")
+    monkeypatch.setattr(settings, "STATELESS_TOKENS", True)
+    usuario = client.post("/api/usuarios/", json={
+        "nome": "Excluido", "email": "excluido@email.com",
+        "senha": "senha12345",
+    }).json()
+    token = jwt.encode(
+        {"sub": usuario["email"], "uid": usuario["id"], "gen": 0},
+        settings.SECRET_KEY,
+        algorithm=settings.ALGORITHM,
+    )
+    headers = {"Authorization": f"Bearer {token}"}
+
+    res = client.post("/api/gatilhos/", json={"nome": "Sono"}, headers=headers)
+    assert res.status_code == 201
+    assert client.delete("/api/usuarios/me", headers=headers).status_code == 204
+
+    # O token continua assinado e no prazo, mas a conta não existe mais
+    res = client.post("/api/gatilhos/", json={"nome": "Luz"}, headers=headers)
+    assert res.status_code == 401
+    # Outro worker monta o filtro a partir de `usuarios_excluidos`
+    revocation_filter.reset()
+    assert client.get("/api/gatilhos/", headers=headers).status_code == 401
+
+
+@pytest.mark.integration
+def test_usuario_me_async(async_client, async_auth_header):
+    """Rotas `/me` assíncronas (DB_ASYNC): leitura, atualização e exclusão."""
+    headers = async_auth_header
+
+    res = async_client.get("/api/usuarios/me", headers=headers)
+    assert res.status_code == 200
+    assert res.json()["email"] == "usuario_async@email.com"
+
+    res = async_client.put("/api/usuarios/me", json={
+        "nome": "Usuario Async Atualizado",
+        "email": "usuario_async@email.com",
+        "senha": "senha12345",
+    }, headers=headers)
+    assert res.status_code == 200
+    assert res.json()["nome"] == "Usuario Async Atualizado"
+
+    res = async_client.delete("/api/usuarios/me", headers=headers)
+    assert res.status_code == 204
+    res = async_client.get("/api/usuarios/me", headers=headers)
+    assert res.status_code == 401
@@ -99,3 +99,110 @@ def test_update_usuario_parametrized(
     updated = update_usuario(db, base, nome=nome, email=email)
     assert updated.nome == expected_nome
     assert updated.email == expected_email
+
+
+def test_principal_cache_hit_miss_and_ttl(monkeypatch):
+    from source.usuario import cache_usuario
+    from source.usuario.cache_usuario import PrincipalCache
+
+    agora = [1000.0]
+    monkeypatch.setattr(cache_usuario.time, "monotonic", lambda: agora[0])
+
+    cache = PrincipalCache(max_size=2, ttl_seconds=30)
+    assert cache.get("a@x.com") is None
+    cache.set("a@x.com", {"id": 1})
+    assert cache.get("a@x.com") == {"id": 1}
+
+    agora[0] += 31  # expira
+    assert cache.get("a@x.com") is None
+    assert cache.stats()["hits"] == 1
+    assert cache.stats()["misses"] == 2
+
+
+def test_principal_cache_bounded_and_invalidate():
+    from source.usuario.cache_usuario import PrincipalCache
+
+    cache = PrincipalCache(max_size=2, ttl_seconds=30)
+    cache.set("a", {"id": 1})
+    cache.set("b", {"id": 2})
+    cache.get("a")  # "a" passa a ser o mais recente
+    cache.set("c", {"id": 3})  # descarta "b" (LRU)
+    assert cache.get("b") is None
+    assert cache.stats()["size"] == 2
+
+    cache.invalidate("a", None)
+    assert cache.get("a") is None
+    assert cache.get("c") == {"id": 3}
+
+
+def test_update_e_delete_invalidam_cache(db):
+    from source.usuario.cache_usuario import principal_cache, snapshot_usuario
+
+    user = create_usuario(db, "Cache User", "cache@test.local", "Senha123")
+    principal_cache.set("cache@test.local", snapshot_usuario(user))
+
+    update_usuario(db, user, email="cache2@test.local")
+    assert principal_cache.get("cache@test.local") is None
+
+    principal_cache.set("cache2@test.local", snapshot_usuario(user))
+    delete_usuario(db, user)
+    assert principal_cache.get("cache2@test.local") is None
+
+
+def test_bloom_filter_sem_falsos_negativos():
+    from source.usuario.revogacao_usuario import BloomFilter
+
+    bloom = BloomFilter(capacity=1000, fp_rate=0.01)
+    revogados = [f"jti-{i}" for i in range(1000)]
+    for jti in revogados:
+        bloom.add(jti)
+    assert all(jti in bloom for jti in revogados)
+    falsos = sum(f"outro-{i}" in bloom for i in range(10000))
+    assert falsos < 300  # ~1% esperado
+
+
+def test_revocation_filter_geracao_e_jti(db):
+    from datetime import datetime, timedelta
+    from source.usuario.model_usuario import tokens_revogados
+    from source.usuario.revogacao_usuario import RevocationFilter
+
+    user = create_usuario(db, "Revogado", "revogado@test.local", "Senha123")
+    filtro = RevocationFilter(sync_seconds=0, capacity=100)
+    assert not filtro.is_revoked(db, {"uid": user.id, "gen": 0, "jti": "a1"})
+
+    expira = datetime.utcnow() + timedelta(minutes=15)
+    db.execute(tokens_revogados.insert(), [
+        {"usuario_id": user.id, "jti": "a1", "token_geracao": None,
+         "expira_em": expira},
+        {"usuario_id": user.id, "jti": None, "token_geracao": 1,
+         "expira_em": expira},
+    ])
+    db.commit()
+
+    # Sincronização incremental aplica as duas revogações
+    assert filtro.is_revoked(db, {"uid": user.id, "gen": 1, "jti": "a1"})
+    assert filtro.is_revoked(db, {"uid": user.id, "gen": 0, "jti": "b2"})
+    assert not filtro.is_revoked(db, {"uid": user.id, "gen": 1, "jti": "b2"})
+    # Tokens antigos, sem uid/jti, não são afetados
+    assert not filtro.is_revoked(db, {"sub": "revogado@test.local"})
+
+
+def test_revocation_filter_le_commit_fora_de_ordem(db):
+    from datetime import datetime, timedelta
+    from source.usuario.model_usuario import tokens_revogados
+    from source.usuario.revogacao_usuario import RevocationFilter
+
+    user = create_usuario(db, "Atrasado", "atrasado@test.local", "Senha123")
+    filtro = RevocationFilter(sync_seconds=0, capacity=100, overlap=10)
+    expira = datetime.utcnow() + timedelta(minutes=15)
+    # O id 5 já foi visto; o 3 (INSERT anterior) só faz commit depois
+    db.execute(tokens_revogados.insert(), [
+        {"id": 5, "usuario_id": user.id, "jti": "j5", "expira_em": expira}])
+    db.commit()
+    assert filtro.is_revoked(db, {"uid": user.id, "jti": "j5"})
+    db.execute(tokens_revogados.insert(), [
+        {"id": 3, "usuario_id": user.id, "jti": "j3", "expira_em": expira}])
+    db.commit()
+
+    assert filtro.is_revoked(db, {"uid": user.id, "jti": "j3"})
+    assert filtro.stats()["revoked_jtis"] == 2  # j5 relido, não recontado
@@ -0,0 +1,109 @@
+"""
+View (Rotas) assíncronas para Usuários (modo `DB_ASYNC`).
+
+Mesmos endpoints de `view_usuario`, com `AsyncSession`: enquanto a
+consulta espera o MySQL, o worker atende outras requisições em vez de
+prender uma thread do threadpool.
+"""
+from fastapi import APIRouter, Depends, HTTPException, status
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from config.database import get_async_db
+from config.settings import settings
+
+from source.usuario.schemas_usuario import (
+    UserUpdate, UserCreate, UserOut, Principal,
+)
+from .model_usuario import Usuario
+from .controller_usuario import hash_password_async
+from .controller_async_usuario import (
+    update_usuario,
+    delete_usuario,
+    get_usuario_by_email,
+    save_usuario,
+)
+from .cache_usuario import principal_cache, snapshot_usuario, attach_snapshot
+from .revogacao_usuario import revocation_filter
+from .view_usuario import CREDENTIALS_EXCEPTION, decode_token, oauth2_scheme
+
+
+router = APIRouter()
+
+# --- AUTENTICAÇÃO E AUTORIZAÇÃO ---
+
+
+async def get_current_user(db: AsyncSession = Depends(get_async_db),
+                           token: str = Depends(oauth2_scheme)):
+    """Versão assíncrona de `view_usuario.get_current_user`."""
+    payload = decode_token(token)
+    email = payload["sub"]
+
+    # O filtro de revogação é síncrono; run_sync o executa sobre a
+    # conexão assíncrona (só toca o banco ao sincronizar)
+    if await db.run_sync(revocation_filter.is_revoked, payload):
+        raise CREDENTIALS_EXCEPTION
+
+    if settings.STATELESS_TOKENS and payload.get("uid") is not None:
+        return Principal(
+            id=payload["uid"],
+            email=email,
+            nome=payload.get("nome"),
+            token_geracao=payload.get("gen", 0),
+        )
+
+    snapshot = principal_cache.get(email)
+    if snapshot is not None:
+        return await db.run_sync(attach_snapshot, snapshot)
+
+    user = await get_usuario_by_email(db, email)
+    if user is None:
+        raise CREDENTIALS_EXCEPTION
+    principal_cache.set(email, snapshot_usuario(user))
+    return user
+
+
+async def get_current_usuario(db: AsyncSession = Depends(get_async_db),
+                              current_user=Depends(get_current_user)):
+    """Garante a linha ORM `Usuario` (carregada sob demanda)."""
+    if isinstance(current_user, Usuario):
+        return current_user
+    user = await db.get(Usuario, current_user.id)
+    if user is None:
+        raise CREDENTIALS_EXCEPTION
+    return user
+
+# --- ROTAS ---
+
+
+@router.post(
+    "/",
+    response_model=UserOut,
+    status_code=status.HTTP_201_CREATED,
+    tags=["Usuários"],
+)
+async def register_user(user: UserCreate,
+                        db: AsyncSession = Depends(get_async_db)):
+    if await get_usuario_by_email(db, user.email):
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST,
+                            detail="E-mail já cadastrado")
+    senha_hash = await hash_password_async(user.senha)
+    return await save_usuario(db, user.nome, user.email, senha_hash)
+
+
+@router.get("/me", response_model=UserOut, tags=["Usuários"])
+async def read_me(current_user=Depends(get_current_usuario)):
+    return current_user
+
+
+@router.put("/me", response_model=UserOut, tags=["Usuários"])
+async def update_me(data: UserUpdate,
+                    db: AsyncSession = Depends(get_async_db),
+                    current_user=Depends(get_current_usuario)):
+    return await update_usuario(db, current_user,
+                                nome=data.nome, email=data.email)
+
+
+@router.delete("/me", status_code=204, tags=["Usuários"])
+async def delete_me(db: AsyncSession = Depends(get_async_db),
+                    current_user=Depends(get_current_usuario)):
+    await delete_usuario(db, current_user)
@@ -6,17 +6,26 @@ from fastapi import APIRouter, Depends, HTTPException, status
 from fastapi.security import OAuth2PasswordBearer
 from jose import jwt, JWTError
 from sqlalchemy.orm import Session
+from starlette.concurrency import run_in_threadpool
 
 from config.database import get_db
+from config.deadline import bind_deadline
+from config.replicas import replica_router
 from config.settings import settings
 
-from source.usuario.schemas_usuario import UserUpdate, UserCreate, UserOut
+from source.usuario.schemas_usuario import (
+    UserUpdate, UserCreate, UserOut, Principal,
+)
+from .model_usuario import Usuario
 from .controller_usuario import (
     update_usuario,
     delete_usuario,
     get_usuario_by_email,
-    create_usuario,
+    save_usuario,
+    hash_password_async,
 )
+from .cache_usuario import principal_cache, snapshot_usuario, attach_snapshot
+from .revogacao_usuario import revocation_filter
 
 
 router = APIRouter()
@@ -26,32 +35,97 @@ oauth2_scheme = OAuth2PasswordBearer(tokenUrl="/api/auth/login")
 # --- AUTENTICAÇÃO E AUTORIZAÇÃO ---
 
 
-def get_current_user(db: Session = Depends(get_db),
-                     token: str = Depends(oauth2_scheme)):
-    """
-    Dependency para obter usuário autenticado a partir do token JWT.
-    """
-    credentials_exception = HTTPException(
-        status_code=status.HTTP_401_UNAUTHORIZED,
-        detail="Credenciais inválidas ou token expirado",
-        headers={"WWW-Authenticate": "Bearer"},
-    )
+CREDENTIALS_EXCEPTION = HTTPException(
+    status_code=status.HTTP_401_UNAUTHORIZED,
+    detail="Credenciais inválidas ou token expirado",
+    headers={"WWW-Authenticate": "Bearer"},
+)
 
+
+def decode_token(token: str) -> dict:
+    """Valida assinatura e expiração do access token e devolve as claims."""
     try:
         payload = jwt.decode(
             token,
             settings.SECRET_KEY,
             algorithms=[settings.ALGORITHM],
         )
-        email: str = payload.get("sub")
-        if email is None:
-            raise credentials_exception
     except JWTError as exc:
-        raise credentials_exception from exc
+        raise CREDENTIALS_EXCEPTION from exc
+    # Tokens com `type` (ex.: reset de senha) não autenticam a API
+    if payload.get("sub") is None or payload.get("type") is not None:
+        raise CREDENTIALS_EXCEPTION
+    return payload
+
+
+def get_current_user(db: Session = Depends(get_db),
+                     token: str = Depends(oauth2_scheme)):
+    """
+    Dependency para obter usuário autenticado a partir do token JWT.
 
-    user = get_usuario_by_email(db, email)
+    Com `STATELESS_TOKENS` e um token que traga `uid`, devolve um
+    `Principal` sem tocar no banco; caso contrário devolve o `Usuario`
+    (do cache de principais ou da tabela `usuarios`). Em ambos os casos
+    `user.id` está disponível para os handlers.
+
+    O id também vai para `db.info`, para que as escritas da requisição
+    mantenham as leituras seguintes do usuário no primário.
+    """
+    payload = decode_token(token)
+    email = payload["sub"]
+
+    if revocation_filter.is_revoked(db, payload):
+        raise CREDENTIALS_EXCEPTION
+
+    if settings.STATELESS_TOKENS and payload.get("uid") is not None:
+        user = Principal(
+            id=payload["uid"],
+            email=email,
+            nome=payload.get("nome"),
+            token_geracao=payload.get("gen", 0),
+        )
+    elif (snapshot := principal_cache.get(email)) is not None:
+        user = attach_snapshot(db, snapshot)
+    else:
+        user = get_usuario_by_email(db, email)
+        if user is None:
+            raise CREDENTIALS_EXCEPTION
+        principal_cache.set(email, snapshot_usuario(user))
+    db.info["usuario_id"] = user.id
+    return user
+
+
+def get_read_db(db: Session = Depends(get_db),
+                current_user=Depends(get_current_user)):
+    """
+    Dependency de leitura: sessão numa réplica (`DB_REPLICA_URLS`), ou a
+    própria sessão do primário quando não há réplica disponível ou o
+    usuário escreveu há menos de `DB_REPLICA_STICKY_SECONDS`.
+    """
+    replica = replica_router.read_session(current_user.id)
+    if replica is None:
+        yield db
+        return
+    try:
+        bind_deadline(replica)
+        yield replica
+    finally:
+        replica.close()
+
+
+def get_current_usuario(db: Session = Depends(get_db),
+                        current_user=Depends(get_current_user)):
+    """
+    Dependency que garante a linha ORM `Usuario` do usuário autenticado.
+
+    Usada só pelas rotas de `/me`; carrega o registro sob demanda quando
+    `get_current_user` devolveu um `Principal` sem estado.
+    """
+    if isinstance(current_user, Usuario):
+        return current_user
+    user = db.get(Usuario, current_user.id)
     if user is None:
-        raise credentials_exception
+        raise CREDENTIALS_EXCEPTION
     return user
 
 # --- ROTAS ---
@@ -63,30 +137,33 @@ def get_current_user(db: Session = Depends(get_db),
     status_code=status.HTTP_201_CREATED,
     tags=["Usuários"],
 )
-def register_user(user: UserCreate, db: Session = Depends(get_db)):
-    if get_usuario_by_email(db, user.email):
+async def register_user(user: UserCreate, db: Session = Depends(get_db)):
+    # Banco no threadpool e Argon2 no executor de hashing
+    if await run_in_threadpool(get_usuario_by_email, db, user.email):
         raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST,
                             detail="E-mail já cadastrado")
-    return create_usuario(db, user.nome, user.email, user.senha)
+    senha_hash = await hash_password_async(user.senha)
+    return await run_in_threadpool(
+        save_usuario, db, user.nome, user.email, senha_hash)
 
 # --- ROTAS ---
 
 
 @router.get("/me", response_model=UserOut, tags=["Usuários"])
-def read_me(current_user=Depends(get_current_user)):
+def read_me(current_user=Depends(get_current_usuario)):
     return current_user
 
 
 @router.put("/me", response_model=UserOut, tags=["Usuários"])
 def update_me(data: UserUpdate,
               db: Session = Depends(get_db),
-              current_user=Depends(get_current_user)):
+              current_user=Depends(get_current_usuario)):
     user = update_usuario(db, current_user, nome=data.nome, email=data.email)
     return user
 
 
 @router.delete("/me", status_code=204, tags=["Usuários"])
 def delete_me(db: Session = Depends(get_db),
-              current_user=Depends(get_current_user)):
+              current_user=Depends(get_current_usuario)):
     delete_usuario(db, current_user)
     # Retorna 204 No Content quando a exclusão ocorre com sucesso